@@ -0,0 +1,187 @@
+"""Benchmark suite for the westcott g-factor hot paths.
+
+Each benchmark is timed over several repeats (the minimum and median wall
+times are kept) and profiled once under `tracemalloc` for its peak Python
+memory allocation.  Every repeat starts from an empty in-memory array cache
+and the on-disk result store is disabled, so the times measure the actual
+loading, interpolation and integration work; the time of an immediate
+second (warm) call is reported separately and not used for regressions.
+Results are written as JSON together with the current git commit, and a
+previous results file can be compared against to flag regressions.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --output new.json --compare bench.json
+    python benchmarks/run_benchmarks.py --list
+    python benchmarks/run_benchmarks.py -k sigma_ENDF -k gw_Maxwellian
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+# Results reused from the on-disk store would hide the integration cost
+os.environ['WESTCOTT_RESULTS'] = '0'
+
+import numpy as np
+import westcott
+
+BENCHMARKS = {}
+
+def cold_memory(*load):
+    """Setup emptying the in-memory array cache and then calling the
+    functions `load`, whose results are the benchmark arguments.  Inputs
+    are thus loaded outside the timed region while interpolants and
+    kernels are rebuilt inside it."""
+    def setup():
+        westcott.ArrayCache.default().clear()
+        return tuple(f() for f in load)
+    return setup
+
+def benchmark(name, repeat=5, setup=cold_memory()):
+    """Register a benchmark.  `setup` runs before every repeat, outside the
+    timed region, and its return value (a tuple) gives the arguments of the
+    benchmark."""
+    def register(func):
+        BENCHMARKS[name] = (func, repeat, setup)
+        return func
+    return register
+
+gw = westcott.Westcott()
+vn = westcott.DEFAULT_GRID
+
+@benchmark('import_westcott', repeat=3)
+def bench_import():
+    subprocess.run([sys.executable, '-c', 'import westcott'], check=True, cwd=ROOT)
+
+@benchmark('Westcott_construction', repeat=20)
+def bench_construction():
+    westcott.Westcott()
+
+for _target in ['Si30', 'Pt192', 'Pu240']:
+    @benchmark('sigma_ENDF_{0}'.format(_target))
+    def bench_sigma_ENDF(target=_target):
+        # Arrays from the capture cache are lazy memory maps: read them all
+        E, sigma = gw.sigma_ENDF(target)
+        np.asarray(E).sum() + np.asarray(sigma).sum()
+
+    @benchmark('get_MT102_csv_{0}'.format(_target), repeat=3)
+    def bench_get_MT102(target=_target):
+        gw.get_MT102(target)
+
+@benchmark('phi_Maxwellian', repeat=3)
+def bench_phi_Maxwellian():
+    gw.phi_Maxwellian(293, vn)
+
+@benchmark('gw_Maxwellian_Sm149', repeat=3, setup=cold_memory(lambda: gw.sigma_ENDF('Sm149')))
+def bench_gw_Maxwellian(cross_section):
+    gw.gw_Maxwellian(293, *cross_section)
+
+for _i, _name in gw.find_flux():
+    @benchmark('gw_arbitrary_{0}'.format(_name.split('.csv')[0]), repeat=3,
+               setup=cold_memory(lambda i=_i: gw.get_flux(i), lambda: gw.sigma_ENDF('Sm149')))
+    def bench_gw_arbitrary(flux, cross_section):
+        gw.gw_arbitrary(*flux, *cross_section)
+
+@benchmark('gw_irregularity_Au197', repeat=3,
+           setup=cold_memory(lambda: gw.get_res_paras('Au197').to_numpy()))
+def bench_gw_irregularity(res):
+    gw.gw_irregularity(res[:,0], res[:,1] + res[:,2], 293)
+
+@benchmark('library_sweep_293K', repeat=1)
+def bench_library_sweep():
+    gw.gw_Maxwellian_grid(gw.find_targets(), [293])
+
+def run(name):
+    """Time one benchmark from a cold cache, time one warm call right after,
+    and measure its peak traced memory from a cold cache."""
+    func, repeat, setup = BENCHMARKS[name]
+    times = []
+    for _ in range(repeat):
+        args = setup()
+        t0 = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    func(*args)
+    warm = time.perf_counter() - t0
+    args = setup()
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'min': min(times), 'median': statistics.median(times), 'warm': warm,
+            'repeat': repeat, 'peak_bytes': peak}
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(new, old, threshold):
+    """Print a comparison table and return the names of benchmarks whose
+    minimum time or peak memory grew by more than `threshold` (a ratio)."""
+    regressions = []
+    print(f"{'benchmark':40s} {'old [s]':>10s} {'new [s]':>10s} {'ratio':>7s} {'mem ratio':>9s}")
+    for name, result in new['results'].items():
+        if name not in old['results']:
+            continue
+        before = old['results'][name]
+        ratio = result['min'] / before['min'] if before['min'] > 0 else float('inf')
+        mem = result['peak_bytes'] / before['peak_bytes'] if before['peak_bytes'] > 0 else 1.
+        flag = ''
+        if ratio > threshold or mem > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:40s} {before['min']:10.4g} {result['min']:10.4g} {ratio:7.2f} {mem:9.2f}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-o', '--output', default=None, help="Write results to this JSON file.")
+    parser.add_argument('-c', '--compare', default=None, help="Compare against a previous results file.")
+    parser.add_argument('-t', '--threshold', type=float, default=1.25,
+                        help="Slowdown ratio flagged as a regression (default: 1.25).")
+    parser.add_argument('-k', '--select', action='append', default=None,
+                        help="Only run benchmarks whose name contains this string.")
+    parser.add_argument('--list', action='store_true', help="List benchmarks and exit.")
+    args = parser.parse_args(argv)
+
+    names = list(BENCHMARKS)
+    if args.select:
+        names = [n for n in names if any(s in n for s in args.select)]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    results = {}
+    for name in names:
+        results[name] = run(name)
+        r = results[name]
+        print(f"{name:40s} min {r['min']:.4g} s  median {r['median']:.4g} s  warm {r['warm']:.4g} s  "
+              f"peak {r['peak_bytes']/2**20:.1f} MiB")
+    report = {'commit': git_commit(), 'python': platform.python_version(),
+              'numpy': np.__version__, 'machine': platform.machine(),
+              'timestamp': time.time(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        if compare(report, old, args.threshold):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -15,6 +15,15 @@ setuptools.setup(
     packages=setuptools.find_namespace_packages(),
     #install_requires=[],
     install_requires=requirements,
+    entry_points={
+        'console_scripts': [
+            'westcott-cache=westcott.cache:main',
+            'westcott-table=westcott.driver:main',
+            'westcott-catalog=westcott.catalog:main',
+            'westcott-thermal=westcott.lookup:main',
+            'westcott-server=westcott.server:main',
+        ],
+    },
     classifiers=[
         'Development Status :: 5 - Production/Stable',
         'Intended Audience :: Science/Research',
@@ -27,7 +36,7 @@ setuptools.setup(
         'Topic :: Scientific/Engineering :: Physics',
     ],
     include_package_data=True,
-    package_data={'': ['data_capture/*.csv', 'data_spectra/*.csv',
+    package_data={'': ['catalog.csv', 'gfactors.csv', 'data_capture/*.csv', 'data_spectra/*.csv',
                        'data_resonances/BreitWigner/*.csv',
                        'data_resonances/ReichMoore/*.csv']},
 )
@@ -0,0 +1,25 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+def pytest_configure(config):
+    """Point the on-disk caches at a temporary directory for the session.
+    Test modules create `Westcott` instances (and load data) at import time,
+    before any fixture runs, so this is done when pytest starts rather than
+    in a fixture."""
+    config.westcott_cache_dir = tempfile.mkdtemp(prefix='westcott-cache-')
+    os.environ['WESTCOTT_CACHE_DIR'] = config.westcott_cache_dir
+    os.environ.pop('WESTCOTT_RESULTS', None)
+
+def pytest_unconfigure(config):
+    cache_dir = getattr(config, 'westcott_cache_dir', None)
+    if cache_dir is not None:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+@pytest.fixture(autouse=True)
+def isolated_result_store(monkeypatch):
+    """No test shares a default result store opened by another."""
+    from westcott.results import ResultStore
+    monkeypatch.setattr(ResultStore, '_default', {})
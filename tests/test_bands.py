@@ -0,0 +1,47 @@
+import pytest
+import unittest
+import numpy as np
+import pandas as pd
+
+import westcott
+from westcott.bands import IntegralIndex, E_CD
+from westcott.tables import trapezoid
+gw = westcott.Westcott()
+
+class IntegralIndexTests(unittest.TestCase):
+
+    __doc__="""Unit tests for the cumulative-integral index of the 
+    `bands.py` module."""
+
+    vn = np.logspace(0,5,5000)
+
+    def test_bands_sum_to_gw_Maxwellian_and_gw_arbitrary(self):
+        vn = IntegralIndexTests.vn
+        E, sigma = gw.sigma_ENDF('Sm149')
+        index = IntegralIndex.Maxwellian(293, E, sigma, vn)
+        gW = gw.gw_Maxwellian(293, E, sigma, vn)
+        assert index.gw == pytest.approx(gW, rel=1e-12)
+        edges = np.concatenate([[0], np.logspace(-5, 2, 57), [1e9]])
+        assert index.gw_bands(edges).sum() == pytest.approx(gW, rel=1e-12)
+        below, above = index.gw_window([0, E_CD], [E_CD, 1e9])
+        assert below + above == pytest.approx(gW, rel=1e-12)
+
+        spectrum = IntegralIndex.get('Sm149', spectrum=0, vn=vn)
+        assert spectrum.gw == pytest.approx(gw.gw_arbitrary(*gw.get_flux(0), E, sigma, vn), rel=1e-12)
+        assert IntegralIndex.get('Sm149', spectrum=0, vn=vn) is spectrum
+
+    def test_windows_match_direct_trapezoid_and_group_collapse(self):
+        vn = IntegralIndexTests.vn
+        index = IntegralIndex.get('Au197', 300, vn=vn)
+        E_n = 0.5*westcott.Kinematics.m_n * vn**2/westcott.Kinematics.eV
+        for lo, hi in [(100, 900), (2000, 4999), (0, 1)]:
+            direct = trapezoid(index.f[2][lo:hi+1], vn[lo:hi+1])
+            assert index.integral(E_n[lo], E_n[hi]) == pytest.approx(direct, rel=1e-9)
+
+        E, sigma = gw.sigma_ENDF('Au197')
+        groups = index.sigma_groups(E_n[[1000, 1001, 1002]])
+        phi = index.f[1][1000:1003]
+        assert groups[0] == pytest.approx(trapezoid(index.f[2][1000:1002], vn[1000:1002])
+                                          / trapezoid(phi[:2], vn[1000:1002]), rel=1e-9)
+        flat = IntegralIndex.Maxwellian(300, [1e-5, 1e3], [5., 5.], vn)
+        np.testing.assert_allclose(flat.sigma_groups(np.logspace(-4, 1, 9)), 5., rtol=1e-12)
@@ -0,0 +1,55 @@
+import pytest
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+import westcott
+gw = westcott.Westcott()
+
+class CaptureCacheTests(unittest.TestCase):
+
+    __doc__="""Unit tests for the binary capture cross-section cache of the 
+    `cache.py` module."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.src = os.path.join(self.tmp, 'src')
+        os.makedirs(self.src)
+        shutil.copy(gw.capture_cache.source_path('Si30'), self.src)
+        self.cache = westcott.CaptureCache(cache_dir=os.path.join(self.tmp, 'cache'),
+                                           source_dir=self.src)
+        self.cache.enabled = True
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_build_writes_memory_mapped_arrays_matching_csv(self):
+        assert self.cache.build() == ['Si30']
+        En, sigma = self.cache.load('Si30')
+        self.assertIsInstance(En, np.memmap)
+        df = pd.read_csv(self.cache.source_path('Si30'))
+        np.testing.assert_array_equal(En, df.to_numpy()[:,0])
+        np.testing.assert_array_equal(sigma, df.to_numpy()[:,1])
+        assert self.cache.build() == []
+
+    def test_modified_source_invalidates_entry(self):
+        self.cache.build()
+        with open(self.cache.source_path('Si30'), 'a') as f:
+            f.write("2e7,1e-6\n")
+        self.assertIsNone(self.cache.load('Si30'))
+        assert self.cache.verify() == ['Si30']
+
+    def test_touched_but_unchanged_source_stays_fresh(self):
+        self.cache.build()
+        st = os.stat(self.cache.source_path('Si30'))
+        os.utime(self.cache.source_path('Si30'), ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.assertIsNotNone(self.cache.load('Si30'))
+
+    def test_sigma_ENDF_matches_csv(self):
+        En, sigma = gw.sigma_ENDF('Si30')
+        df = gw.get_MT102('Si30')
+        np.testing.assert_array_equal(En, df.to_numpy()[:,0])
+        np.testing.assert_array_equal(sigma, df.to_numpy()[:,1])
@@ -0,0 +1,45 @@
+import pytest
+import unittest
+import os
+import glob
+import numpy as np
+import pandas as pd
+
+import westcott
+from westcott.catalog import Catalog, parse_target
+
+class CatalogTests(unittest.TestCase):
+
+    __doc__="""Unit tests for the package manifest of the `catalog.py` 
+    module."""
+
+    def test_westcott_construction_does_not_load_catalog(self):
+        Catalog._instance = None
+        westcott.Westcott()
+        self.assertIsNone(Catalog._instance)
+
+    def test_manifest_matches_data_directories(self):
+        scanned = Catalog(Catalog.scan(westcott.get_data(''), detail=False))
+        catalog = Catalog.get()
+        assert list(catalog.capture) == list(scanned.capture)
+        assert catalog.resonance_files == scanned.resonance_files
+        assert sorted(catalog.spectrum_files.values()) == sorted(scanned.spectrum_files.values())
+
+    def test_records_hold_row_counts_and_energy_ranges(self):
+        record = Catalog.get().capture['Si30']
+        df = pd.read_csv(Catalog.get().path(record))
+        assert record['rows'] == len(df)
+        assert record['E_min'] == df.iloc[:,0].min()
+        assert record['E_max'] == df.iloc[:,0].max()
+        assert (record['Z'], record['A'], record['isomer']) == (14, 30, 0)
+
+    def test_parse_target_handles_isomers(self):
+        assert parse_target('Ag110_m1') == (47, 110, 1)
+        with self.assertRaises(ValueError):
+            parse_target('110Ag')
+
+    def test_get_res_paras_is_sorted_by_energy(self):
+        gw = westcott.Westcott()
+        for target in ['Au197', 'Al27', 'Kr83']:
+            df = gw.get_res_paras(target)
+            assert df['energy'].is_monotonic_increasing
@@ -0,0 +1,93 @@
+import pytest
+import unittest
+import numpy as np
+import pandas as pd
+
+from concurrent.futures import ThreadPoolExecutor
+
+import westcott
+from westcott import compute
+gw = westcott.Westcott()
+
+class ComputeTests(unittest.TestCase):
+
+    __doc__="""Unit tests for the stateless g-factor functions of the 
+    `compute.py` module."""
+
+    targets = ['Au197', 'Sm149', 'Si30', 'Kr83', 'Cd113', 'Gd157']
+
+    def test_holders_are_immutable_and_keep_cached_arrays(self):
+        E, sigma = gw.sigma_ENDF('Au197')
+        xs = compute.CrossSection.from_target('Au197')
+        assert xs.E is E and xs.sigma is sigma
+        with self.assertRaises(AttributeError):
+            xs.E = np.zeros(3)
+        user = np.array([1e-3, 1e-2, 1.])
+        s = compute.Spectrum(user, np.ones(3))
+        user[0] = 5.
+        assert s.E[0] == 1e-3
+        with self.assertRaises(ValueError):
+            s.dndE[0] = 2.
+
+    def test_functions_match_gfactors_methods(self):
+        vn = compute.grid(np.logspace(0,5,3000))
+        xs = compute.CrossSection.from_target('Sm149')
+        flux = compute.Spectrum.from_flux(0)
+        assert compute.gw_maxwellian(xs, 293, vn) == gw.gw_Maxwellian(293, *xs, vn)
+        np.testing.assert_allclose(compute.gw_maxwellian(xs, [293, 600], vn),
+                                   [gw.gw_Maxwellian(T, *xs, vn) for T in (293, 600)], rtol=1e-14)
+        assert compute.gw_arbitrary(xs, flux, vn) == gw.gw_arbitrary(*flux, *xs, vn)
+        assert compute.gw_irregularity(0.0973, 0.0608, 293, vn) == gw.gw_irregularity(0.0973, 0.0608, 293, vn)
+
+    def test_chunked_integration_matches_full_grid(self):
+        for target in ['Ta181', 'Np237']:
+            xs = compute.CrossSection.from_target(target)
+            for i in range(3):
+                flux = compute.Spectrum.from_flux(i)
+                full = compute.gw_arbitrary(xs, flux)
+                assert compute.gw_arbitrary_chunked(xs, flux, chunk_size=999) == pytest.approx(full, rel=1e-13)
+                assert compute.gw_arbitrary_chunked(xs, flux, westcott.LogGrid(), 2**12) == pytest.approx(full, rel=1e-13)
+        assert gw.gw_arbitrary(*flux, *xs, chunk_size=5000) == pytest.approx(full, rel=1e-13)
+
+    def test_chunked_integration_memory_is_bounded(self):
+        import tracemalloc
+        xs = compute.CrossSection.from_target('Ta181')
+        flux = compute.Spectrum.from_flux(1)
+        tracemalloc.start()
+        try:
+            gW = compute.gw_arbitrary_chunked(xs, flux, westcott.LogGrid(n=2*10**6), 2**14)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        assert peak < 2*10**6*8/4
+        assert gW == pytest.approx(compute.gw_arbitrary(xs, flux), rel=1e-4)
+
+    def test_shared_instance_under_thread_pool(self):
+        vn = np.logspace(0,5,4001)
+        temperatures = [250., 293., 400., 600.]
+        flux = gw.get_flux(0)
+        jobs = [(t, T) for t in ComputeTests.targets for T in temperatures]
+        expected = {(t, T): (gw.gw_Maxwellian(T, *gw.sigma_ENDF(t), np.logspace(0,5,4001)),
+                             gw.gw_arbitrary(*flux, *gw.sigma_ENDF(t), np.logspace(0,5,4001)))
+                    for (t, T) in jobs}
+        state = dict(vars(gw))
+
+        def work(item):
+            # Alternate the two paths within each pass and flip them between
+            # passes, so every job runs both ways, interleaved
+            i, job = item
+            t, T = job
+            if (i + i//len(jobs)) % 2:
+                xs = compute.CrossSection.from_target(t)
+                return job, (compute.gw_maxwellian(xs, T, vn),
+                             compute.gw_arbitrary(xs, compute.Spectrum(*flux), vn))
+            return job, (gw.gw_Maxwellian(T, *gw.sigma_ENDF(t), vn),
+                         gw.gw_arbitrary(*flux, *gw.sigma_ENDF(t), vn))
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(work, enumerate(jobs * 10)))
+        assert len(results) == 10*len(jobs)
+        for job, (gM, gA) in results:
+            assert gM == pytest.approx(expected[job][0], rel=1e-13)
+            assert gA == pytest.approx(expected[job][1], rel=1e-13)
+        assert vars(gw) == state
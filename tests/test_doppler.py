@@ -0,0 +1,93 @@
+import pytest
+import unittest
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+import westcott
+from westcott.doppler import broaden, DopplerCache
+from westcott.tables import trapezoid
+from westcott.memcache import ArrayCache
+from westcott.westcott_gfactors import Kinematics
+gw = westcott.Westcott()
+
+class DopplerTests(unittest.TestCase):
+
+    __doc__="""Unit tests for the `doppler.py` module and the `T_sample` 
+    option of the g-factor methods."""
+
+    def test_one_over_v_is_invariant(self):
+        E = np.logspace(-5, 5, 2000)
+        sigma = 10/np.sqrt(E)
+        broadened = broaden(E, sigma, 300, 100)
+        np.testing.assert_allclose(broadened[E < 1e4], sigma[E < 1e4], rtol=1e-4)
+
+    def test_exact_kernel_matches_direct_integration(self):
+        A, T = 150, 600
+        E = np.linspace(1e-3, 50, 200001)
+        sigma = 1e3/((E - 5)**2 + 0.01) + 1/np.sqrt(E)
+        E_out = np.array([0.1, 1, 4.8, 5, 5.3, 10])
+        alpha = A*Kinematics.u/Kinematics.m_n * Kinematics.eV/(Kinematics.kB*T)
+        x = np.sqrt(alpha*E)
+        for e, b in zip(E_out, broaden(E, sigma, T, A, E_out=E_out)):
+            y = np.sqrt(alpha*e)
+            f = x**2 * sigma * (np.exp(-(x - y)**2) - np.exp(-(x + y)**2))
+            assert b == pytest.approx(trapezoid(f, x)/np.sqrt(np.pi)/y**2, rel=1e-5)
+
+    def test_broadening_preserves_area_and_lowers_peak(self):
+        E = np.linspace(1, 10, 3001)
+        sigma = 1e3/((E - 5)**2 + 0.0004)
+        broadened = broaden(E, sigma, 300, 50, E_max=9)
+        assert broadened.max() < 0.5*sigma.max()
+        assert trapezoid(broadened, E) == pytest.approx(trapezoid(sigma, E), rel=1e-2)
+        np.testing.assert_array_equal(broadened[E > 9], sigma[E > 9])
+
+    def test_sigma_Doppler_cached_on_disk_and_used_by_gfactors(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            gw.doppler_cache = DopplerCache(tmp)
+            E, sigma = gw.sigma_Doppler('Au197', 600)
+            assert len(E) == len(gw.sigma_ENDF('Au197')[0])
+            assert gw.doppler_cache.load('Au197', 600, gw.capture_cache.read_meta('Au197')['sha256']) is not None \
+                or not gw.doppler_cache.enabled
+            gW = gw.gw_Maxwellian(293, *gw.sigma_ENDF('Au197'), T_sample=600)
+            assert gW == pytest.approx(gw.gw_Maxwellian(293, E, sigma), rel=1e-12)
+            assert gW == pytest.approx(gw.gw_Maxwellian(293, *gw.sigma_ENDF('Au197')), rel=1e-3)
+            df = gw.gw_Maxwellian_grid(['Au197'], [293], T_sample=600)
+            assert df.loc['Au197', 293] == pytest.approx(gW, rel=1e-12)
+            assert gw.gw_Maxwellian(293, np.array(E), np.array(sigma), T_sample=600) is None
+        finally:
+            gw.doppler_cache = DopplerCache()
+            shutil.rmtree(tmp)
+
+    def test_cache_entries_keyed_on_exact_temperature_and_source_hash(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            cache = DopplerCache(tmp)
+            E = np.array([1., 2.])
+            assert cache.store('Au197', 293, E, np.array([3., 4.]), 'abc')
+            assert cache.store('Au197', 293.0000001, E, np.array([5., 6.]), 'abc')
+            np.testing.assert_array_equal(cache.load('Au197', 293, 'abc')[1], [3., 4.])
+            np.testing.assert_array_equal(cache.load('Au197', 293.0000001, 'abc')[1], [5., 6.])
+            self.assertIsNone(cache.load('Au197', 293, 'def'))
+            # Without a source hash nothing is written or served
+            assert not cache.store('Au197', 300, E, np.array([3., 4.]))
+            self.assertIsNone(cache.load('Au197', 293))
+        finally:
+            shutil.rmtree(tmp)
+
+    def test_sample_temperature_does_not_depend_on_cache_residency(self):
+        default = ArrayCache._default
+        try:
+            for budget in (0, 2**20):
+                # Disabled cache, and a budget that evicts sigma_ENDF('Au197')
+                ArrayCache._default = ArrayCache(budget)
+                endf_e, endf_cs = gw.sigma_ENDF('Au197')
+                for target in ['Si30', 'Sm149', 'Lu176']:
+                    gw.sigma_ENDF(target)
+                self.assertIsNone(ArrayCache.default().get(('sigma_ENDF', 'Au197')))
+                gW = gw.gw_Maxwellian(293, endf_e, endf_cs, T_sample=600)
+                assert gW == pytest.approx(gw.gw_Maxwellian(293, *gw.sigma_Doppler('Au197', 600)), rel=1e-12)
+        finally:
+            ArrayCache._default = default
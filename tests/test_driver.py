@@ -0,0 +1,57 @@
+import pytest
+import unittest
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+import westcott
+from westcott.driver import gfactor_table
+gw = westcott.Westcott()
+
+class DriverTests(unittest.TestCase):
+
+    __doc__="""Unit tests for the library-wide g-factor table driver of the 
+    `driver.py` module."""
+
+    targets = ['Si30', 'Sm149', 'Kr83']
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.output = os.path.join(self.tmp, 'table.csv')
+
+    def tearDown(self):
+        for f in os.listdir(self.tmp):
+            os.remove(os.path.join(self.tmp, f))
+        os.rmdir(self.tmp)
+
+    def test_table_matches_gw_Maxwellian_and_gw_arbitrary(self):
+        n = gfactor_table(self.output, targets=DriverTests.targets, temperatures=[293],
+                          spectra=[0], workers=2, chunk_size=1)
+        assert n == 3
+        df = pd.read_csv(self.output, index_col='target')
+        E_flux, dndE = gw.get_flux(0)
+        for target in DriverTests.targets:
+            endf_e, endf_cs = gw.sigma_ENDF(target)
+            assert df.loc[target, 'gW_293K'] == pytest.approx(gw.gw_Maxwellian(293, endf_e, endf_cs), rel=1e-10)
+            assert df.iloc[:,-1][target] == pytest.approx(gw.gw_arbitrary(E_flux, dndE, endf_e, endf_cs), rel=1e-10)
+
+    def test_resume_skips_completed_targets(self):
+        assert gfactor_table(self.output, targets=DriverTests.targets[:2], spectra=[], workers=1) == 2
+        assert gfactor_table(self.output, targets=DriverTests.targets, spectra=[], workers=1) == 1
+        df = pd.read_csv(self.output)
+        assert sorted(df['target']) == sorted(DriverTests.targets)
+
+    def test_resume_recomputes_row_cut_short(self):
+        assert gfactor_table(self.output, targets=DriverTests.targets[:2], spectra=[], workers=1) == 2
+        with open(self.output, 'rb+') as f:
+            f.truncate(os.path.getsize(self.output) - 6)
+        assert gfactor_table(self.output, targets=DriverTests.targets, spectra=[], workers=1) == 2
+        df = pd.read_csv(self.output)
+        assert sorted(df['target']) == sorted(DriverTests.targets)
+        endf_e, endf_cs = gw.sigma_ENDF('Sm149')
+        assert df.set_index('target').loc['Sm149', 'gW_293K'] == pytest.approx(gw.gw_Maxwellian(293, endf_e, endf_cs), rel=1e-10)
+
+    def test_unknown_target_is_skipped(self):
+        assert gfactor_table(self.output, targets=['Xx999', 'Si30'], spectra=[], workers=1) == 1
+        assert list(pd.read_csv(self.output)['target']) == ['Si30']
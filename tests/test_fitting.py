@@ -0,0 +1,61 @@
+import pytest
+import unittest
+import numpy as np
+import pandas as pd
+
+import westcott
+from westcott.westcott_gfactors import flux_weights
+gw = westcott.Westcott()
+
+class FoilFitTests(unittest.TestCase):
+
+    __doc__="""Unit tests for the `FoilFit` class of the `fitting.py` 
+    module."""
+
+    foils = ['Au197', 'Lu176', 'Co59', 'Sm149']
+    fit = westcott.FoilFit(foils)
+
+    def test_gfactors_and_derivatives_match_full_calculation(self):
+        g, dg = FoilFitTests.fit.gw(350.)
+        for i, target in enumerate(FoilFitTests.foils):
+            endf_e, endf_cs = gw.sigma_ENDF(target)
+            assert g[i] == pytest.approx(gw.gw_Maxwellian(350, endf_e, endf_cs), rel=1e-12)
+            slope = (gw.gw_Maxwellian(350.01, endf_e, endf_cs) - gw.gw_Maxwellian(349.99, endf_e, endf_cs))/0.02
+            assert dg[i] == pytest.approx(slope, rel=1e-5, abs=1e-12)
+
+    def test_fit_recovers_temperature_and_epithermal_fraction(self):
+        F = FoilFitTests.fit
+        for p in ([2e12, 420.], [2e12, 420., 0.03]):
+            rates = F.model(np.array(p))[0]
+            res = F.fit(rates, 1e-3*rates, epithermal=len(p) == 3)
+            assert res.converged
+            np.testing.assert_allclose(res.values, p, rtol=1e-8)
+            assert res['T'] == pytest.approx(420.)
+            assert res.cov.shape == (len(p), len(p)) and np.all(res.std > 0)
+            assert list(res.summary().index) == res.names
+
+    def test_fit_with_surrogate_and_too_few_foils(self):
+        S = westcott.ChebyshevSurrogate.build(FoilFitTests.foils)
+        F = westcott.FoilFit(FoilFitTests.foils, surrogate=S)
+        rates = F.model(np.array([1e12, 250., 0.01]))[0]
+        res = F.fit(rates, epithermal=True)
+        assert res.params['T'] == pytest.approx(250., rel=1e-6)
+        assert res.params['beta'] == pytest.approx(0.01, rel=1e-5)
+        assert westcott.FoilFit(['Au197', 'Co59']).fit([1., 1.], epithermal=True) is None
+
+    def test_epithermal_term_does_not_depend_on_grid(self):
+        F = FoilFitTests.fit
+        coarse = westcott.FoilFit(FoilFitTests.foils, vn=np.logspace(0,4,20000))
+        np.testing.assert_allclose(coarse.h, F.h, rtol=1e-12)
+        # Cut at the top of the grid, h is the quadrature of the 1/E flux on the grid
+        vn = westcott.DEFAULT_GRID
+        E_n = 0.5*westcott.Kinematics.m_n * vn**2/westcott.Kinematics.eV
+        cut = westcott.FoilFit(FoilFitTests.foils, E_max=E_n[-1])
+        dndE = np.where(E_n >= F.E_cut, E_n**-1.5, 0.)
+        np.testing.assert_allclose(cut.h, F.R @ flux_weights(E_n, dndE, vn), rtol=1e-3)
+        assert F.h[FoilFitTests.foils.index('Co59')] > 2*cut.h[FoilFitTests.foils.index('Co59')]
+
+    def test_unknown_target_is_left_out(self):
+        F = westcott.FoilFit(['Au197', 'Xx999', 'Co59'])
+        assert F.targets == ['Au197', 'Co59'] and len(F.h) == 2
+        self.assertIsNone(F.fit([1., 1., 1.]))
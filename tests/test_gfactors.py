@@ -25,3 +25,18 @@ class gFactorsTests(unittest.TestCase):
             
             
         
+    def test_gw_Maxwellian_grid_matches_gw_Maxwellian(self):
+        temperatures = [20, 293, 600]
+        df = gw.gw_Maxwellian_grid(['Si30', 'Sm149'], temperatures)
+        assert df.shape == (2, 3)
+        for target in ['Si30', 'Sm149']:
+            endf_e, endf_cs = gw.sigma_ENDF(target)
+            for T in temperatures:
+                gW = gw.gw_Maxwellian(T, endf_e, endf_cs)
+                assert df.loc[target, T] == pytest.approx(gW, rel=1e-10)
+
+    def test_gw_Maxwellian_matrix_returns_targets_by_temperatures_array(self):
+        xs = [gw.sigma_ENDF('Si30')] * 3
+        gW = gw.gw_Maxwellian_matrix(range(20, 620, 20), xs, chunk_size=200000)
+        assert gW.shape == (3, 30)
+        np.testing.assert_allclose(gW, 1.0, atol=0.001)
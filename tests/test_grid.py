@@ -0,0 +1,49 @@
+import pytest
+import unittest
+import numpy as np
+import pandas as pd
+
+import westcott
+gw = westcott.Westcott()
+
+class IntegrationGridTests(unittest.TestCase):
+
+    __doc__="""Unit tests for methods belonging to the `IntegrationGrid` class 
+    of the `grid.py` module."""
+
+    grid = westcott.IntegrationGrid()
+
+    def test_gauss_kronrod_integrates_smooth_function_to_tolerance(self):
+        I, err, n = westcott.IntegrationGrid.gauss_kronrod(np.sin, [0, 1, 2, np.pi], rtol=1e-12)
+        assert I == pytest.approx(2.0, rel=1e-12)
+        assert err < 1e-10
+
+    def test_breakpoints_include_resonance_and_endf_velocities(self):
+        v = IntegrationGridTests.grid.breakpoints(E_endf=[0.0253], resonances=([1.0], [0.1]))
+        assert np.all(np.diff(v) > 0)
+        assert np.any(np.isclose(v, westcott.Kinematics.v_0, rtol=1e-3))
+        assert np.any(np.isclose(v, gw.vel(1.0)))
+        assert v[0] >= 1. and v[-1] <= 1e5
+
+    def test_gw_Maxwellian_adaptive_matches_trapezoid_with_fewer_evaluations(self):
+        endf_e, endf_cs = gw.sigma_ENDF('Sm149')
+        for T in [20, 293, 600]:
+            gW, err, info = IntegrationGridTests.grid.gw_Maxwellian_adaptive(T, endf_e, endf_cs, full_output=True)
+            assert gW == pytest.approx(gw.gw_Maxwellian(T, endf_e, endf_cs), rel=1e-6)
+            assert info['evaluations'] < 10000
+
+    def test_gw_arbitrary_adaptive_matches_trapezoid(self):
+        endf_e, endf_cs = gw.sigma_ENDF('Si30')
+        energy, dndE = gw.get_flux(0)
+        gW, err = IntegrationGridTests.grid.gw_arbitrary_adaptive(energy, dndE, endf_e, endf_cs)
+        assert gW == pytest.approx(gw.gw_arbitrary(energy, dndE, endf_e, endf_cs), rel=1e-5)
+
+    def test_log_grid_blocks_match_logspace(self):
+        for n in [2, 1001, 100000]:
+            grid = westcott.LogGrid(1., 1e5, n)
+            v = np.logspace(0, 5, n)
+            assert len(grid) == n
+            np.testing.assert_array_equal(grid.array(), v)
+            out = np.empty(64)
+            for i0 in range(0, n, 50):
+                np.testing.assert_array_equal(grid.block(i0, min(i0 + 50, n), out=out), v[i0:i0+50])
@@ -0,0 +1,62 @@
+import pytest
+import unittest
+import numpy as np
+import pandas as pd
+
+import os
+import sys
+import json
+import subprocess
+
+import westcott
+gw = westcott.Westcott()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(westcott.__file__)))
+
+def run(code):
+    """Run `code` in a fresh interpreter and return its JSON output."""
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                         capture_output=True, text=True).stdout
+    return json.loads(out.splitlines()[-1])
+
+class ImportTests(unittest.TestCase):
+
+    __doc__="""Regression tests for the import footprint and import time of 
+    the package."""
+
+    def test_numeric_path_imports_without_pandas_or_scipy(self):
+        result = run("""
+import sys, json
+import numpy as np
+import westcott
+loaded = {m: m in sys.modules for m in ('pandas', 'scipy', 'asyncio', 'westcott.server')}
+K = westcott.Westcott()
+E = np.logspace(-5, 3, 200)
+gW = K.gw_Maxwellian(293, E, 1/np.sqrt(E), np.logspace(0,5,2000))
+loaded['pandas_after'] = 'pandas' in sys.modules
+print(json.dumps(dict(loaded, gW=gW)))
+""")
+        assert not any(result[m] for m in ('pandas', 'scipy', 'asyncio', 'westcott.server', 'pandas_after'))
+        assert abs(result['gW'] - 1) < 1e-3
+
+    def test_import_time_and_display_options(self):
+        result = run("""
+import time, json
+t0 = time.perf_counter()
+import numpy as np
+t1 = time.perf_counter()
+options = np.get_printoptions()
+import westcott
+t2 = time.perf_counter()
+print(json.dumps({'westcott': t2 - t1, 'options': np.get_printoptions() == options}))
+""")
+        assert result['options']
+        assert result['westcott'] < 0.5
+
+    def test_optional_modules_load_on_access(self):
+        assert 'gw_uncertainty' in dir(westcott)
+        from westcott.server import GFactorServer
+        assert westcott.GFactorServer is GFactorServer
+        assert westcott.pd is pd
+        with self.assertRaises(AttributeError):
+            westcott.NoSuchName
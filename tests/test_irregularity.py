@@ -0,0 +1,39 @@
+import pytest
+import unittest
+import numpy as np
+import pandas as pd
+from scipy.integrate import trapezoid
+
+import westcott
+gw = westcott.Westcott()
+
+class IrregularityTests(unittest.TestCase):
+
+    __doc__="""Unit tests for methods belonging to the `Irregularity` class of 
+    the `westcott_gfactors.py` module."""
+
+    vn = np.logspace(0,5,20000)
+
+    def test_p_integrates_to_unity_and_defaults_to_thermal_temperature(self):
+        p = gw.p(IrregularityTests.vn)
+        assert trapezoid(p, IrregularityTests.vn) == pytest.approx(1.0)
+        np.testing.assert_allclose(p, gw.p(IrregularityTests.vn, westcott.Kinematics.T_0))
+
+    def test_del_0_is_unity_at_thermal_velocity(self):
+        d = gw.del_0(westcott.Kinematics.v_0, np.array([-9.81, 28.05, 1e4]), 0.3)
+        np.testing.assert_allclose(d, 1.0)
+
+    def test_gw_irregularity_array_matches_scalar_calls(self):
+        res = gw.get_res_paras('Au197').to_numpy()
+        E_r, Gamma = res[:5,0], res[:5,1] + res[:5,2]
+        gW = gw.gw_irregularity(E_r, Gamma, 293, vn=IrregularityTests.vn, chunk_size=40000)
+        assert gW.shape == (5,)
+        for i in range(5):
+            g = gw.gw_irregularity(E_r[i], Gamma[i], 293, vn=IrregularityTests.vn)
+            assert gW[i] == pytest.approx(g, rel=1e-12)
+
+    def test_gw_irregularity_matches_direct_trapezoid(self):
+        vn = IrregularityTests.vn
+        d = gw.del_0(vn, 28.05, 0.2672222)
+        expected = trapezoid(d * gw.p(vn, 100), vn)
+        assert gw.gw_irregularity(28.05, 0.2672222, 100, vn=vn) == pytest.approx(expected, rel=1e-12)
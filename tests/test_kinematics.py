@@ -33,3 +33,31 @@ class KinematicsTests(unittest.TestCase):
         
     
     
+
+    def test_phi_Maxwellian_matches_closed_form_and_is_normalized(self):
+        vn = np.logspace(0,5,100000)
+        T = 293
+        vt = np.sqrt(2*westcott.Kinematics.kB*T/westcott.Kinematics.m_n)
+        phi = gw.phi_Maxwellian(T, vn)
+        np.testing.assert_allclose(phi, 2 * np.exp(-vn**2/vt**2) * vn**3/vt**4, rtol=1e-12, atol=1e-300)
+        assert np.sum(phi * westcott.trapezoid_weights(vn)) == pytest.approx(1.0, rel=1e-6)
+
+class MaxwellianKernelTests(unittest.TestCase):
+
+    __doc__="""Unit tests for the `MaxwellianKernel` class of the 
+    `westcott_gfactors.py` module."""
+
+    def test_kernel_is_shared_between_calls(self):
+        k = westcott.MaxwellianKernel.get([100, 293])
+        assert westcott.MaxwellianKernel.get([100, 293]) is k
+        assert k.weights.shape == (2, 100000)
+        np.testing.assert_allclose(k.weights.sum(axis=1), 1.0)
+
+    def test_kernel_gw_matches_gw_Maxwellian_in_float64_and_float32(self):
+        endf_e, endf_cs = gw.sigma_ENDF('Sm149')
+        T = [20, 293, 600]
+        expected = [gw.gw_Maxwellian(t, endf_e, endf_cs) for t in T]
+        np.testing.assert_allclose(westcott.MaxwellianKernel(T).gw(endf_e, endf_cs), expected, rtol=1e-12)
+        k32 = westcott.MaxwellianKernel(T, dtype=np.float32)
+        assert k32.weights.dtype == np.float32
+        np.testing.assert_allclose(k32.gw(endf_e, endf_cs), expected, rtol=1e-4)
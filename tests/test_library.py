@@ -0,0 +1,44 @@
+import pytest
+import unittest
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+import westcott
+gw = westcott.Westcott()
+
+class CrossSectionMatrixTests(unittest.TestCase):
+
+    __doc__="""Unit tests for the `CrossSectionMatrix` class of the 
+    `library.py` module."""
+
+    targets = ['Si30', 'Sm149', 'Au197']
+
+    def test_matrix_gw_matches_single_target_calculations(self):
+        M = westcott.CrossSectionMatrix.build(CrossSectionMatrixTests.targets, dtype=np.float64)
+        df = M.gw_Maxwellian([20, 293])
+        spectra = [gw.get_flux(0), gw.get_flux(1)]
+        G = M.gw_spectra(spectra)
+        assert G.shape == (3, 2)
+        for i, target in enumerate(CrossSectionMatrixTests.targets):
+            endf_e, endf_cs = gw.sigma_ENDF(target)
+            for T in [20, 293]:
+                assert df.loc[target, T] == pytest.approx(gw.gw_Maxwellian(T, endf_e, endf_cs), rel=1e-12)
+            for j, (E, dndE) in enumerate(spectra):
+                assert G[i, j] == pytest.approx(gw.gw_arbitrary(E, dndE, endf_e, endf_cs), rel=1e-12)
+
+    def test_save_and_memory_mapped_load_round_trip(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            M = westcott.CrossSectionMatrix.build(CrossSectionMatrixTests.targets, v_range=(10, 5e4))
+            assert M.vn.min() >= 10 and M.vn.max() <= 5e4
+            M.save(tmp)
+            L = westcott.CrossSectionMatrix.load(tmp)
+            self.assertIsInstance(L.R, np.memmap)
+            assert L.targets == CrossSectionMatrixTests.targets
+            np.testing.assert_array_equal(L.R, M.R)
+            endf_e, endf_cs = gw.sigma_ENDF('Sm149')
+            np.testing.assert_allclose(L.sigma('Sm149'), np.interp(L.vn, gw.vel(endf_e), endf_cs), rtol=1e-6)
+        finally:
+            shutil.rmtree(tmp)
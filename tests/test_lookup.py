@@ -0,0 +1,47 @@
+import pytest
+import unittest
+import numpy as np
+import pandas as pd
+
+import westcott
+gw = westcott.Westcott()
+
+class ThermalTableTests(unittest.TestCase):
+
+    __doc__="""Unit tests for the precomputed g-factor table of the 
+    `lookup.py` module."""
+
+    table = westcott.ThermalTable.get()
+
+    def test_table_covers_all_targets(self):
+        assert sorted(ThermalTableTests.table.targets) == gw.find_targets()
+
+    def test_tabulated_values_match_full_calculation(self):
+        endf_e, endf_cs = gw.sigma_ENDF('Sm149')
+        for T in [20, 293, 600]:
+            assert ThermalTableTests.table.gw('Sm149', T) == pytest.approx(gw.gw_Maxwellian(T, endf_e, endf_cs), rel=1e-10)
+        energy, dndE = gw.get_flux(1)
+        assert ThermalTableTests.table.gw('Sm149', spectrum=1) == pytest.approx(gw.gw_arbitrary(energy, dndE, endf_e, endf_cs), rel=1e-10)
+        assert ThermalTableTests.table.sigma0('Sm149') == pytest.approx(np.interp(westcott.Kinematics.v_0, gw.vel(endf_e), endf_cs))
+
+    def test_off_grid_temperature_interpolates_or_falls_back(self):
+        endf_e, endf_cs = gw.sigma_ENDF('Si30')
+        exact = gw.gw_Maxwellian(250, endf_e, endf_cs)
+        assert ThermalTableTests.table.gw('Si30', 250) == pytest.approx(exact, rel=1e-12)
+        assert ThermalTableTests.table.gw('Si30', 250, interpolate=True) == pytest.approx(exact, rel=1e-5)
+
+    def test_array_of_temperatures(self):
+        table = ThermalTableTests.table
+        endf_e, endf_cs = gw.sigma_ENDF('Si30')
+        T = np.array([[20, 250], [293, 700]])
+        exact = gw.gw_Maxwellian(T.ravel(), endf_e, endf_cs).reshape(T.shape)
+        np.testing.assert_allclose(table.gw('Si30', T), exact, rtol=1e-10)
+        interpolated = table.gw('Si30', T, interpolate=True)
+        assert interpolated.shape == T.shape
+        assert interpolated[0,1] == table.gw('Si30', 250, interpolate=True)
+        assert interpolated[1,1] == pytest.approx(exact[1,1], rel=1e-12)
+        assert np.ndim(table.gw('Si30', 293)) == 0
+
+    def test_unknown_target_raises_KeyError(self):
+        with self.assertRaises(KeyError):
+            ThermalTableTests.table.gw('Xx999')
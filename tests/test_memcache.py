@@ -0,0 +1,76 @@
+import pytest
+import unittest
+import hashlib
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+import westcott
+from westcott.memcache import ArrayCache, grid_key
+gw = westcott.Westcott()
+
+class ArrayCacheTests(unittest.TestCase):
+
+    __doc__="""Unit tests for the in-memory LRU cache of the `memcache.py` 
+    module."""
+
+    def test_least_recently_used_entry_is_evicted_under_budget(self):
+        cache = ArrayCache(max_bytes=3*800)
+        for key in 'abc':
+            cache.put(key, np.zeros(100))
+        self.assertIsNotNone(cache.get('a'))
+        cache.put('d', np.zeros(100))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        stats = cache.stats()
+        assert stats['evictions'] == 1
+        assert stats['bytes'] <= stats['max_bytes']
+        assert (stats['hits'], stats['misses']) == (2, 1)
+
+    def test_cached_arrays_are_read_only_and_registered_as_sources(self):
+        cache = ArrayCache()
+        E, sigma = cache.put('xs', (np.arange(3.), np.ones(3)), source=True)
+        with self.assertRaises(ValueError):
+            sigma[0] = 2.
+        assert cache.source_of(E, sigma) == 'xs'
+        self.assertIsNone(cache.source_of(E, np.ones(3)))
+        # A derived source sharing the energies does not take them over
+        cache.put('broadened', (E, np.zeros(3)), source=True)
+        assert cache.source_of(E, sigma) == 'xs'
+        cache.put('broadened', np.zeros(3))
+        assert cache.source_of(E, sigma) == 'xs'
+
+    def test_grid_key_depends_on_content(self):
+        vn = np.logspace(0,5,1000)
+        assert grid_key(vn) == grid_key(vn.copy())
+        assert grid_key(vn) != grid_key(np.logspace(0,5,1001))
+
+    def test_grid_edited_in_place_is_not_served_from_cache(self):
+        vn = np.logspace(0,5,5000)
+        endf_e, endf_cs = gw.sigma_ENDF('Sm149')
+        key = grid_key(vn)
+        store_key = westcott.ResultStore.key('gw_Maxwellian', grid=vn, T=293.)
+        gw.gw_Maxwellian(293, endf_e, endf_cs, vn)
+        vn[:] = np.logspace(0,4,5000)
+        assert grid_key(vn) != key
+        assert westcott.ResultStore.key('gw_Maxwellian', grid=vn, T=293.) != store_key
+        assert gw.gw_Maxwellian(293, endf_e, endf_cs, vn) == gw.gw_Maxwellian(293, endf_e, endf_cs, vn.copy())
+
+    def test_repeated_gw_Maxwellian_reuses_interpolated_cross_section(self):
+        memory = ArrayCache.default()
+        endf_e, endf_cs = gw.sigma_ENDF('Si30')
+        first = gw.gw_Maxwellian(293, endf_e, endf_cs)
+        hits = memory.stats()['hits']
+        endf_e, endf_cs = gw.sigma_ENDF('Si30')
+        assert gw.gw_Maxwellian(293, endf_e, endf_cs) == first
+        # sigma_ENDF, the MaxwellianKernel at 293 K and the interpolated
+        # cross section are each served from the cache
+        assert memory.stats()['hits'] == hits + 3
+
+    def test_warm_default_grid_call_does_not_rehash(self):
+        assert not westcott.DEFAULT_GRID.flags.writeable
+        endf_e, endf_cs = gw.sigma_ENDF('Si30')
+        first = gw.gw_Maxwellian(293, endf_e, endf_cs)
+        with mock.patch('westcott.memcache.hashlib.blake2b', wraps=hashlib.blake2b) as blake2b:
+            assert gw.gw_Maxwellian(293, endf_e, endf_cs) == first
+        assert blake2b.call_count == 0
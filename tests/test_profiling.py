@@ -0,0 +1,56 @@
+import pytest
+import unittest
+import numpy as np
+import pandas as pd
+
+import os
+import json
+import pstats
+import logging
+import tempfile
+
+import westcott
+from westcott import profiling
+from westcott.log_handlers import LogLevelContext, logger
+gw = westcott.Westcott()
+
+class ProfilingTests(unittest.TestCase):
+
+    __doc__="""Unit tests for the stage timers and counters of the 
+    `profiling.py` module."""
+
+    def test_profile_records_stages_and_counters(self):
+        vn = np.logspace(0,5,1234)
+        E, sigma = gw.sigma_ENDF('Au197')
+        with westcott.profile() as prof:
+            gw.gw_Maxwellian(321.5, E, sigma, vn)
+            gw.gw_arbitrary(*gw.get_flux(0), E, sigma, vn)
+        summary = prof.summary()
+        for name in ('kernel_build', 'interpolation', 'integration'):
+            assert summary['stages'][name]['calls'] >= 1
+            assert summary['stages'][name]['total'] >= 0
+        assert summary['counters']['grid_size']['max'] == 1234
+        assert json.loads(prof.to_json()) == json.loads(json.dumps(summary))
+        self.assertFalse(profiling.enabled())
+
+    def test_csv_rows_are_counted_and_stats_load_with_pstats(self):
+        with westcott.profile() as prof:
+            with profiling.stage('outer'):
+                df = gw.get_MT102('Au197')
+        counters = prof.summary()['counters']
+        assert counters['rows_read']['total'] == len(df)
+        stats = pstats.Stats(prof)
+        key = ('westcott', 0, 'csv_load')
+        assert stats.stats[key][1] == 1
+        assert ('westcott', 0, 'outer') in stats.stats[key][4]
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'westcott.prof')
+            prof.dump_stats(filename)
+            assert key in pstats.Stats(filename).stats
+
+    def test_log_level_context_restores_level(self):
+        level = logger.level
+        with LogLevelContext('critical') as log:
+            assert log is logger
+            assert logger.level == logging.CRITICAL
+        assert logger.level == level
@@ -0,0 +1,49 @@
+import pytest
+import unittest
+import numpy as np
+import pandas as pd
+
+import westcott
+from westcott.resonances import penetrability
+gw = westcott.Westcott()
+
+class ResonanceCrossSectionTests(unittest.TestCase):
+
+    __doc__="""Unit tests for the `ResonanceCrossSection` class of the 
+    `resonances.py` module."""
+
+    def test_penetrability_closed_forms(self):
+        rho = np.linspace(0.01, 3, 50)
+        np.testing.assert_allclose(penetrability(0, rho), rho)
+        np.testing.assert_allclose(penetrability(1, rho), rho**3/(1 + rho**2))
+        np.testing.assert_allclose(penetrability(2, rho), rho**5/(9 + 3*rho**2 + rho**4))
+        assert penetrability(np.array([0, 1, 2]), rho[:,np.newaxis]).shape == (50, 3)
+
+    def test_single_level_breit_wigner_peak(self):
+        # Isolated s-wave level: sigma(E_r) = pi/k^2 g 4 Gn Gg / Gamma^2
+        r = westcott.ResonanceCrossSection([10.], [0.01], [0.1], [0.5], [0], 100)
+        assert r.target_spin == 0
+        peak = np.pi/r.k(10.)**2 * 1 * 4*0.01*0.1/0.11**2
+        assert r.sigma(np.array([10.]))[0] == pytest.approx(peak, rel=1e-12)
+
+    def test_reich_moore_reduces_to_breit_wigner_for_one_level(self):
+        args = ([-5., 20.], [0.5, 0.02], [0.1, 0.1], [1, 2], [0, 0], 150)
+        bw = westcott.ResonanceCrossSection(*args, formalism='BreitWigner')
+        rm = westcott.ResonanceCrossSection(*args, formalism='ReichMoore')
+        E = np.logspace(-3, 2, 500)
+        np.testing.assert_allclose(rm.sigma(E), bw.sigma(E), rtol=1e-10)
+
+    def test_chunked_evaluation_matches_single_block(self):
+        r = westcott.ResonanceCrossSection.from_target('Au197')
+        E = np.logspace(-3, 3, 2000)
+        np.testing.assert_allclose(r.sigma(E, chunk_size=1000), r.sigma(E, chunk_size=2**24), rtol=1e-13)
+
+    def test_reconstruction_against_pointwise_capture(self):
+        for target, formalism in [('Au197', 'ReichMoore'), ('Cd113', 'BreitWigner')]:
+            r = westcott.ResonanceCrossSection.from_target(target)
+            assert r.formalism == formalism
+            E, sigma = gw.sigma_ENDF(target)
+            sigma0 = np.interp(gw.v_0, gw.vel(E), sigma)
+            assert r.sigma_v(np.array([gw.v_0]))[0] == pytest.approx(sigma0, rel=1e-3)
+            assert r.gw_Maxwellian(293) == pytest.approx(gw.gw_Maxwellian(293, E, sigma), rel=1e-3)
+        assert westcott.ResonanceCrossSection.from_target('Xx999') is None
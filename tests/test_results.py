@@ -0,0 +1,84 @@
+import pytest
+import unittest
+import os
+import shutil
+import sqlite3
+import tempfile
+import numpy as np
+import pandas as pd
+
+import westcott
+from westcott.results import ResultStore
+from westcott.driver import gfactor_table
+gw = westcott.Westcott()
+
+class ResultStoreTests(unittest.TestCase):
+
+    __doc__="""Unit tests for the content-addressed g-factor result store of 
+    the `results.py` module."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'results.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_keys_follow_content_and_corrupt_entries_are_dropped(self):
+        store = ResultStore(self.path)
+        E = np.logspace(-3, 2, 50)
+        key = ResultStore.key('gw_Maxwellian', E, 1/np.sqrt(E), T=293)
+        assert key == ResultStore.key('gw_Maxwellian', E.copy(), 1/np.sqrt(E), T=293.)
+        assert key != ResultStore.key('gw_Maxwellian', E, 2/np.sqrt(E), T=293)
+        assert key != ResultStore.key('gw_Maxwellian', E, 1/np.sqrt(E), T=300)
+        store.put(key, 1.25)
+        store.put('array', np.arange(3.))
+        assert store.get(key) == 1.25
+        np.testing.assert_array_equal(store.get('array'), np.arange(3.))
+
+        with sqlite3.connect(self.path) as db:
+            db.execute("UPDATE results SET value = zeroblob(size) WHERE key = 'array'")
+        assert store.verify() == ['array']
+        assert store.get('array') is None
+        assert store.get(key) == 1.25
+
+    def test_least_recently_used_entries_are_evicted(self):
+        store = ResultStore(self.path, max_bytes=3*200)
+        for key in 'abcd':
+            store.put(key, np.zeros(5))
+        stats = store.stats()
+        assert stats['entries'] < 4 and stats['bytes'] <= stats['max_bytes']
+        assert store.get('a') is None
+        assert store.get('d') is not None
+
+    def test_gfactors_are_reused_across_instances(self):
+        E, sigma = gw.sigma_ENDF('Sm149')
+        vn = np.logspace(0,5,2000)
+        first = westcott.Westcott()
+        first.result_store = ResultStore(self.path)
+        gW = first.gw_Maxwellian(293, E, sigma, vn)
+        gI = first.gw_irregularity(0.0973, 0.0608, 293, vn)
+
+        second = westcott.Westcott()
+        second.result_store = ResultStore(self.path)
+        assert second.gw_Maxwellian(293, E, sigma, vn) == gW
+        assert second.gw_irregularity(0.0973, 0.0608, 293, vn) == gI
+        assert second.result_store.hits == 2
+        second.gw_arbitrary(*gw.get_flux(0), E, sigma, vn)
+        assert second.gw_Maxwellian(293, E, 1.01*np.asarray(sigma), vn) == pytest.approx(gW)
+        assert second.result_store.misses == 2
+
+    def test_table_recomputes_only_changed_targets(self):
+        output = os.path.join(self.tmp, 'table.csv')
+        targets = ['Si30', 'Sm149', 'Kr83']
+        vn = np.logspace(0,5,2000)
+        store = ResultStore(self.path)
+        assert gfactor_table(output, targets=targets, spectra=[0], vn=vn, workers=1, store=store) == 3
+        first = pd.read_csv(output, index_col='target')
+        assert store.stats()['entries'] == 3
+        gfactor_table(output, targets=targets, spectra=[0], vn=vn, workers=1, resume=False, store=store)
+        assert store.hits == 3
+        pd.testing.assert_frame_equal(pd.read_csv(output, index_col='target'), first)
+        gfactor_table(output, targets=targets, temperatures=(300,), spectra=[0], vn=vn,
+                      workers=1, resume=False, store=store)
+        assert store.hits == 3 and store.stats()['entries'] == 6
@@ -0,0 +1,57 @@
+import pytest
+import unittest
+import numpy as np
+import pandas as pd
+
+import westcott
+from westcott.screening import level_parameters
+from westcott.resonances import ResonanceCrossSection
+gw = westcott.Westcott()
+
+class ResonanceScreenTests(unittest.TestCase):
+
+    __doc__="""Unit tests for the `ResonanceScreen` class of the 
+    `screening.py` module."""
+
+    screen = westcott.ResonanceScreen()
+
+    def contributions(self, target, T, levels=None):
+        """Exact single-level Breit-Wigner contributions to g_W on the grid."""
+        S = ResonanceScreenTests.screen
+        E_r, Gn, Gg, other, J, L = level_parameters(gw.get_res_paras(target), 'BreitWigner')
+        spin = ResonanceCrossSection.infer_spin(J, L)
+        A = westcott.Catalog.get().resonances[target]['A']
+        w = westcott.MaxwellianKernel.get(T, S.vn).weights[0] * S.vn
+        E = 0.5*westcott.Kinematics.m_n * S.vn**2/westcott.Kinematics.eV
+        norm = S.sigma0(target) * westcott.Kinematics.v_0
+        if levels is None:
+            levels = [[i] for i in range(len(E_r))]
+        return np.array([w @ ResonanceCrossSection(E_r[i], Gn[i], Gg[i], J[i], L[i], A, 'BreitWigner',
+                                                   Gamma=(Gn + Gg + other)[i], target_spin=spin).sigma(E) / norm
+                         for i in levels])
+
+    def test_bounds_exceed_single_level_contributions(self):
+        for target in ['Cd113', 'Sm149']:
+            res = ResonanceScreenTests.screen.screen(target, 293.6)
+            exact = ResonanceScreenTests.contributions(self, target, 293.6)
+            assert np.all(exact <= res.bound * (1 + 1e-12))
+            assert np.max(exact / res.bound) > 0.99
+
+    def test_pruning_error_is_bounded(self):
+        res = ResonanceScreenTests.screen.screen('Cd113', 293.6, tol=1e-3)
+        summary = res.summary()
+        assert summary['kept'] + summary['pruned'] == summary['levels'] == len(res.table)
+        assert 0 < summary['pruned'] and res.error_bound <= 1e-3
+        kept, = np.nonzero(res.kept)
+        every = np.arange(len(res.table))
+        full, part = ResonanceScreenTests.contributions(self, 'Cd113', 293.6, [every, kept])
+        assert 0 <= full - part <= res.error_bound
+        ranking = res.ranking()
+        assert np.all(np.diff(ranking['bound']) <= 0)
+        assert ranking['kept'].sum() == len(res.kept_levels()) == len(res.gw_irregularity(293.6))
+
+    def test_survey_and_missing_target(self):
+        df = ResonanceScreenTests.screen.survey(['Al27', 'Au197'], spectrum=0, tol=1e-4)
+        assert list(df.index) == ['Al27', 'Au197']
+        assert (df['error_bound'] <= 1e-4).all()
+        assert ResonanceScreenTests.screen.screen('Xx999') is None
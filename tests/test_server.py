@@ -0,0 +1,97 @@
+import pytest
+import unittest
+import os
+import asyncio
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+
+import westcott
+from westcott.server import GFactorServer
+from westcott.client import GFactorClient
+gw = westcott.Westcott()
+
+class GFactorServerTests(unittest.TestCase):
+
+    __doc__="""Unit tests for the local g-factor server of the `server.py` 
+    module and its client in `client.py`."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.tmp, 'westcott.sock')
+        cls.server = GFactorServer(batch_window=0.05)
+        ready = threading.Event()
+        cls.thread = threading.Thread(target=asyncio.run, args=(cls.server.serve(cls.path, ready=ready),))
+        cls.thread.start()
+        ready.wait(30)
+
+    @classmethod
+    def tearDownClass(cls):
+        with GFactorClient(cls.path) as client:
+            client.request(op='shutdown')
+        cls.thread.join(30)
+        os.rmdir(cls.tmp)
+
+    def test_evaluate_matches_gfactor_methods(self):
+        replies = GFactorServerTests.server.evaluate([
+            {'id': 1, 'target': 'Au197', 'T': 293},
+            {'id': 2, 'target': 'Sm149', 'spectrum': 0},
+            {'id': 3, 'target': 'Sm149', 'spectrum': 'bnc_cold_spectrum_2002'},
+            {'id': 4, 'target': 'Xx999'},
+            {'id': 5, 'T': 20}])
+        endf_e, endf_cs = gw.sigma_ENDF('Au197')
+        assert replies[0]['gW'] == pytest.approx(gw.gw_Maxwellian(293, endf_e, endf_cs), rel=1e-12)
+        endf_e, endf_cs = gw.sigma_ENDF('Sm149')
+        for reply, i in ((replies[1], 0), (replies[2], 1)):
+            assert reply['gW'] == pytest.approx(gw.gw_arbitrary(*gw.get_flux(i), endf_e, endf_cs), rel=1e-12)
+        assert replies[1]['sigma0'] == pytest.approx(np.interp(gw.v_0, gw.vel(endf_e), endf_cs))
+        assert 'Xx999' in replies[3]['error']
+        assert replies[4]['error'] == "Missing field: target"
+        assert [r.get('code') for r in replies] == [None, None, None, 'not_found', 'invalid']
+        assert [r['id'] for r in replies] == [1, 2, 3, 4, 5]
+
+    def test_invalid_temperatures_and_bounded_memory(self):
+        server = GFactorServer(max_bytes=4*800000)
+        replies = server.evaluate([{'target': 'Si30', 'T': T} for T in (0, -5, float('nan'), float('inf'), 'hot')])
+        assert all('error' in r and 'gW' not in r for r in replies)
+        replies = server.evaluate([{'target': 'Si30', 'T': T} for T in range(100, 120)])
+        assert all(np.isfinite(r['gW']) for r in replies)
+        stats = server.cache.stats()
+        assert stats['bytes'] <= stats['max_bytes'] and stats['evictions'] > 0
+
+    def test_client_requests_are_batched(self):
+        with GFactorClient(GFactorServerTests.path) as client:
+            assert client.request(op='ping')['ok']
+            before = client.request(op='stats')['batches']
+            requests = [{'target': t, 'T': T} for t in ('Au197', 'Gd157', 'Si30') for T in (20, 293, 600)]
+            replies = client.batch(requests)
+            after = client.request(op='stats')['batches']
+            assert after - before < len(requests)
+            for req, reply in zip(requests, replies):
+                expected = gw.gw_Maxwellian(req['T'], *gw.sigma_ENDF(req['target']))
+                assert reply['gW'] == pytest.approx(expected, rel=1e-12)
+            assert client.gw('Gd157', T=293) == pytest.approx(replies[4]['gW'])
+            with pytest.raises(KeyError):
+                client.gw('Xx999')
+            with pytest.raises(RuntimeError):
+                client.gw('Si30', T=0)
+
+    def test_unparsable_line_fails_the_batch(self):
+        with GFactorClient(GFactorServerTests.path, timeout=5.) as client:
+            client.file.write(b'not json\n')
+            with pytest.raises(RuntimeError, match="Invalid request"):
+                client.batch([{'target': 'Si30', 'T': 293}])
+
+    def test_serve_keeps_files_that_are_not_sockets(self):
+        path = os.path.join(GFactorServerTests.tmp, 'not-a-socket')
+        with open(path, 'w') as f:
+            f.write('data')
+        try:
+            with self.assertRaises(OSError):
+                asyncio.run(GFactorServer().serve(path))
+            with open(path) as f:
+                assert f.read() == 'data'
+        finally:
+            os.remove(path)
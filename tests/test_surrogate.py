@@ -0,0 +1,59 @@
+import pytest
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+import westcott
+gw = westcott.Westcott()
+
+class ChebyshevSurrogateTests(unittest.TestCase):
+
+    __doc__="""Unit tests for the `ChebyshevSurrogate` class of the 
+    `surrogate.py` module."""
+
+    targets = ['Si30', 'Sm149', 'Lu176']
+    surrogate = westcott.ChebyshevSurrogate.build(targets, tol=1e-8)
+
+    def test_surrogate_matches_full_calculation(self):
+        S = ChebyshevSurrogateTests.surrogate
+        assert S.max_error < 1e-8
+        for target in ChebyshevSurrogateTests.targets:
+            endf_e, endf_cs = gw.sigma_ENDF(target)
+            for T in [20, 77.3, 293, 600]:
+                assert S.gw(target, T) == pytest.approx(gw.gw_Maxwellian(T, endf_e, endf_cs), rel=1e-8)
+        assert max(S.spot_check(seed=1)) < 1e-8
+
+    def test_vectorized_evaluation(self):
+        S = ChebyshevSurrogateTests.surrogate
+        T = np.linspace(20, 600, 25)
+        G = S.gw_all(T)
+        assert G.shape == (3, 25)
+        for i, target in enumerate(ChebyshevSurrogateTests.targets):
+            np.testing.assert_allclose(G[i], S.gw(target, T), rtol=1e-13)
+        assert isinstance(S.gw('Si30', 293), float)
+        assert S.gw('Si30', 700) is None
+        with self.assertRaises(KeyError):
+            S.gw('Xx999', 293)
+
+    def test_save_and_load(self):
+        S = ChebyshevSurrogateTests.surrogate
+        tmp = tempfile.mkdtemp()
+        try:
+            path = S.save(os.path.join(tmp, 'surrogate.npz'))
+            L = westcott.ChebyshevSurrogate.load(path)
+            assert L.targets == S.targets and L.T_range == S.T_range
+            np.testing.assert_array_equal(L.coefficients, S.coefficients)
+            assert L.degree('Sm149') == S.degree('Sm149') == len(S.coefficients) - S.degree('Si30') - S.degree('Lu176') - 3
+            report = L.error_report()
+            assert list(report.index) == S.targets and (report['spot_error'] < 1e-8).all()
+            assert westcott.ChebyshevSurrogate.load(os.path.join(tmp, 'missing.npz')) is None
+            # Stale after a change of the grid or of the capture data
+            assert L.sha256 == S.sha256 and L.grid == S.grid and L.is_fresh()
+            assert not L.is_fresh(np.logspace(0,5,1000))
+            L.sha256 = ['0'*64] + L.sha256[1:]
+            assert not L.is_fresh()
+        finally:
+            shutil.rmtree(tmp)
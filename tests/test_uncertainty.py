@@ -0,0 +1,63 @@
+import pytest
+import unittest
+import numpy as np
+import pandas as pd
+
+import westcott
+from westcott.uncertainty import gw_uncertainty, knot_basis
+from westcott.westcott_gfactors import interp_dndv
+from westcott.tables import trapezoid
+gw = westcott.Westcott()
+
+class UncertaintyTests(unittest.TestCase):
+
+    __doc__="""Unit tests for the Monte Carlo g-factor uncertainties of the 
+    `uncertainty.py` module."""
+
+    targets = ['Au197', 'Sm149', 'Gd157']
+
+    def test_unperturbed_realizations_reproduce_gfactors(self):
+        r = gw_uncertainty(UncertaintyTests.targets, T=293, n_samples=10, rel_sigma=0, seed=1)
+        E_flux, dndE = gw.get_flux(1)
+        s = gw_uncertainty(UncertaintyTests.targets, spectrum=1, n_samples=10, rel_spectrum=0,
+                           rel_sigma=0, seed=1)
+        for target in UncertaintyTests.targets:
+            endf_e, endf_cs = gw.sigma_ENDF(target)
+            assert r.mean[target] == pytest.approx(gw.gw_Maxwellian(293, endf_e, endf_cs), rel=1e-12)
+            assert s.mean[target] == pytest.approx(gw.gw_arbitrary(E_flux, dndE, endf_e, endf_cs), rel=1e-12)
+            assert s.std[target] < 1e-12
+
+    def test_knot_projection_matches_perturbed_integrals(self):
+        # Replay the draws of the single block and integrate on the grid
+        n, seed, rel = 4, 3, 0.1
+        r = gw_uncertainty('Sm149', spectrum=0, n_samples=n, rel_spectrum=rel, rel_sigma=rel, seed=seed)
+        vn = np.logspace(0,5,100000)
+        lnE = np.log(0.5*gw.m_n*vn**2/gw.eV)
+        knots = np.arange(lnE.min(), lnE.max() + 2, 1.)
+        B = knot_basis(lnE, knots)
+        b0 = knot_basis(np.log(gw.E_0), knots)[0]
+        rng = np.random.default_rng(np.random.SeedSequence(seed).spawn(1)[0])
+        Zs = rng.standard_normal((n, len(knots))) * rel
+        Zx = rng.standard_normal((n, len(knots))) * rel
+        E_flux, dndE = gw.get_flux(0)
+        endf_e, endf_cs = gw.sigma_ENDF('Sm149')
+        dndv = interp_dndv(E_flux, dndE, vn)
+        sigma = np.interp(vn, gw.vel(endf_e), endf_cs)
+        sigma0 = np.interp(gw.v_0, gw.vel(endf_e), endf_cs)
+        for k in range(n):
+            flux = dndv * (1 + B @ Zs[k])
+            num = trapezoid(flux * vn * sigma * (1 + B @ Zx[k]), vn)
+            gW = num / trapezoid(flux, vn) / (sigma0 * (1 + b0 @ Zx[k]) * gw.v_0)
+            assert r.samples.iloc[k, 0] == pytest.approx(gW, rel=1e-12)
+
+    def test_statistics_and_worker_independence(self):
+        kwargs = dict(T=293, sigma_T=20, rel_sigma=0.02, n_samples=200, seed=7, max_bytes=2**24)
+        r = gw_uncertainty(UncertaintyTests.targets, **kwargs)
+        p = gw_uncertainty(UncertaintyTests.targets, workers=2, **kwargs)
+        np.testing.assert_array_equal(r.samples.values, p.samples.values)
+        assert r.samples.shape == (200, 3)
+        assert r.cov.shape == (3, 3)
+        assert list(r.summary().columns) == ['mean', 'std', 'p2.5', 'p50', 'p97.5']
+        assert (r.std > 0).all()
+        assert r.percentiles.loc[2.5, 'Sm149'] < r.mean['Sm149'] < r.percentiles.loc[97.5, 'Sm149']
+        np.testing.assert_allclose(np.diag(r.cov), r.std**2)
@@ -0,0 +1,56 @@
+import pytest
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+import westcott
+gw = westcott.Westcott()
+
+class UserSpectrumTests(unittest.TestCase):
+
+    __doc__="""Unit tests for the spectrum readers of the `user.py` module 
+    and the streaming `gw_stream` g-factor generator."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        E = np.linspace(1e-4, 0.5, 5001)
+        self.E = E
+        self.Y = np.column_stack([E*np.exp(-E/(0.0253*k)) for k in (1, 2, 3)])
+        data = np.column_stack([E, self.Y])
+        self.csv = os.path.join(self.tmp, 'wide.csv')
+        self.npy = os.path.join(self.tmp, 'wide.npy')
+        pd.DataFrame(data, columns=['E (eV)', 'a', 'b', 'c']).to_csv(self.csv, index=False)
+        np.save(self.npy, data)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_import_spectrum_reads_selected_column(self):
+        E, dndE = gw.import_spectrum(self.csv, column=2)
+        np.testing.assert_allclose(E, self.E)
+        np.testing.assert_allclose(dndE, self.Y[:,1])
+        E, dndE = gw.import_spectrum(self.npy, column=3, chunk_rows=1000)
+        np.testing.assert_array_equal(dndE, self.Y[:,2])
+        assert gw.spectrum_columns(self.csv) == ['a', 'b', 'c']
+        assert gw.spectrum_columns(self.npy) == ['1', '2', '3']
+
+    def test_gw_stream_matches_gw_arbitrary(self):
+        endf_e, endf_cs = gw.sigma_ENDF('Sm149')
+        for path in (self.csv, self.npy):
+            results = list(gw.gw_stream(path, endf_e, endf_cs, chunk_rows=333))
+            assert [r[1] for r in results] == gw.spectrum_columns(path)
+            for k, (filename, column, gW) in enumerate(results):
+                assert filename == path
+                assert gW == pytest.approx(gw.gw_arbitrary(self.E, self.Y[:,k], endf_e, endf_cs), rel=1e-12)
+
+    def test_gw_stream_over_bundled_spectra(self):
+        endf_e, endf_cs = gw.sigma_ENDF('Gd157')
+        paths = [gw.catalog.path(r) for r in gw.catalog.spectra.values()]
+        results = list(gw.gw_stream(paths, endf_e, endf_cs, chunk_rows=50))
+        assert len(results) == len(paths)
+        for i, (filename, column, gW) in enumerate(results):
+            E, dndE = gw.get_flux(i)
+            assert gW == pytest.approx(gw.gw_arbitrary(E, dndE, endf_e, endf_cs), rel=1e-12)
@@ -3,6 +3,38 @@ from .log_handlers import *
 from .tables import *
 from .user import *
 from .westcott_gfactors import *
+from .cache import CaptureCache
+from .catalog import Catalog
+from .memcache import ArrayCache
+from .results import ResultStore
+from .profiling import Profiler, profile
+from . import compute
+
+# Optional modules are imported on first attribute access so that
+# `import westcott` only loads the NumPy-based core.
+_LAZY = {'ThermalTable': 'lookup', 'CrossSectionMatrix': 'library',
+         'ResonanceCrossSection': 'resonances', 'gw_uncertainty': 'uncertainty',
+         'GFactorServer': 'server', 'GFactorClient': 'client',
+         'gfactor_table': 'driver', 'IntegrationGrid': 'grid', 'LogGrid': 'grid',
+         'IntegralIndex': 'bands', 'ChebyshevSurrogate': 'surrogate',
+         'FoilFit': 'fitting', 'ResonanceScreen': 'screening'}
+# Modules formerly re-exported by the star imports, kept as aliases
+_COMPAT = {'pd': 'pandas'}
+
+def __getattr__(name):
+    if name in _LAZY:
+        import importlib
+        value = getattr(importlib.import_module('.' + _LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+    if name in _COMPAT:
+        import importlib
+        value = globals()[name] = importlib.import_module(_COMPAT[name])
+        return value
+    raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
 
 __version__='0.1.0'
 __author__='David A. Matters and Aaron M. Hurst'
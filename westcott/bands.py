@@ -0,0 +1,151 @@
+import numpy as np
+import os
+
+from .log_handlers import *
+from .memcache import ArrayCache, grid_key
+from .westcott_gfactors import *
+
+E_CD = 0.5 #eV, conventional cadmium cut-off energy
+
+class IntegralIndex(object):
+    __doc__="""Class to handle the cumulative trapezoidal integrals of a
+    g-factor integrand on the velocity grid `vn`, for one cross section and
+    one neutron density (Maxwellian or spectrum).  Three quantities are
+    indexed:
+        -'density': int n(v) dv;
+        -'flux': int n(v) v dv;
+        -'reaction': int n(v) v sigma(v) dv.
+
+    Integrals over arbitrary energy windows are then a binary search and a
+    difference, with the integrand taken as linear between grid points so
+    that windows spanning the whole grid reproduce `gw_Maxwellian` and
+    `gw_arbitrary` exactly.  Integrals are accumulated from both ends of the
+    grid and each window is differenced from the nearer end, so that
+    windows in the tails keep their relative precision.  All queries accept
+    arrays of energies (eV)."""
+
+    QUANTITIES = ('density', 'flux', 'reaction')
+
+    def __init__(self, vn, dndv, sigma, sigma0):
+        self.vn = np.asarray(vn, dtype=float)
+        self.sigma0 = float(sigma0)
+        n = np.asarray(dndv, dtype=float)
+        self.f = np.vstack([n, n*self.vn, n*self.vn*sigma])
+        I = np.diff(self.vn)*(self.f[:,1:] + self.f[:,:-1])/2
+        self.C = np.zeros_like(self.f)  # from the start of the grid
+        np.cumsum(I, axis=1, out=self.C[:,1:])
+        self.D = np.zeros_like(self.f)  # to the end of the grid
+        np.cumsum(I[:,::-1], axis=1, out=self.D[:,-2::-1])
+        self.norm = self.C[0,-1] * self.sigma0 * Kinematics.v_0
+        for a in (self.f, self.C, self.D):
+            a.flags.writeable = False
+
+    @classmethod
+    def Maxwellian(cls, T, E, sigma, vn=DEFAULT_GRID):
+        """Index for a cross section (E, sigma) in a Maxwellian at `T` (K)."""
+        sigma0, sigma_interp = interp_sigma(E, sigma, vn)
+        return cls(vn, MaxwellianKernel.get(T, vn).phi[0], sigma_interp, sigma0)
+
+    @classmethod
+    def arbitrary(cls, E_spectrum, dndE_spectrum, E, sigma, vn=DEFAULT_GRID):
+        """Index for a cross section (E, sigma) in an arbitrary energy
+        spectrum dN/dE, interpolated as in `gw_arbitrary`."""
+        sigma0, sigma_interp = interp_sigma(E, sigma, vn)
+        return cls(vn, interp_dndv(E_spectrum, dndE_spectrum, vn), sigma_interp, sigma0)
+
+    @classmethod
+    def get(cls, target, T=None, spectrum=None, vn=DEFAULT_GRID):
+        """Shared index for an ENDF target in a Maxwellian at `T` (K, default
+        `Kinematics.T_0`) or, if given, in a bundled spectrum (`find_flux`
+        index) or spectrum file (see `import_spectrum`).  Indexes are kept
+        in the `ArrayCache` per (target, T or spectrum, grid)."""
+        from .westcott import Westcott
+        xs = Westcott()
+        if spectrum is None:
+            T = float(Kinematics.T_0 if T is None else T)
+            key = ('IntegralIndex', target, ('T', T), grid_key(vn))
+        elif isinstance(spectrum, str):
+            st = os.stat(spectrum)
+            key = ('IntegralIndex', target, ('file', os.path.abspath(spectrum), st.st_size, st.st_mtime_ns), grid_key(vn))
+        else:
+            key = ('IntegralIndex', target, ('spectrum', spectrum), grid_key(vn))
+        memory = ArrayCache.default()
+        cached = memory.get(key)
+        if cached is not None:
+            return cached
+        cross_section = CrossSectionData.sigma_ENDF(xs, target)
+        if cross_section is None:
+            return
+        if spectrum is None:
+            index = cls.Maxwellian(T, *cross_section, vn)
+        else:
+            if isinstance(spectrum, str):
+                flux = UserSpectrum.import_spectrum(xs, spectrum)
+            else:
+                flux = NeutronFlux.get_flux(xs, spectrum)
+            index = cls.arbitrary(*flux, *cross_section, vn)
+        return memory.put(key, index)
+
+    @property
+    def nbytes(self):
+        return self.f.nbytes + self.C.nbytes + self.D.nbytes
+
+    @property
+    def gw(self):
+        """Westcott g-factor over the whole grid."""
+        return self.C[2,-1] / self.norm
+
+    def _ends(self, E):
+        """Integrals from the start of the grid to `E` (eV) and from `E` to 
+        the end, each of shape (3, len(E))."""
+        E = np.asarray(E, dtype=float).ravel()
+        v = np.sqrt(2*np.clip(E, 0, None)*Kinematics.eV/Kinematics.m_n)
+        v = np.clip(v, self.vn[0], self.vn[-1])
+        k = np.clip(np.searchsorted(self.vn, v, side='right') - 1, 0, len(self.vn) - 2)
+        t = v - self.vn[k]
+        s = self.vn[k+1] - v
+        f0 = self.f[:,k]
+        f1 = self.f[:,k+1]
+        fv = f0 + (f1 - f0)*(t/(t + s))
+        return self.C[:,k] + t*(f0 + fv)/2, self.D[:,k+1] + s*(fv + f1)/2
+
+    @staticmethod
+    def _window(lower, upper):
+        """Window integrals from the (start, end) integrals at its lower and 
+        upper bounds, differenced from the nearer end of the grid."""
+        return np.where(upper[0] <= lower[1], upper[0] - lower[0], lower[1] - upper[1])
+
+    def cumulative(self, E):
+        """Cumulative integrals from the start of the grid up to the energies
+        `E` (eV), shape (3,) + shape of `E` in the order of `QUANTITIES`."""
+        return IntegralIndex._ends(self, E)[0].reshape((3,) + np.shape(E))
+
+    def integral(self, E1, E2, quantity='reaction'):
+        """Partial integrals of `quantity` over the windows [E1, E2] (eV);
+        `E1` and `E2` broadcast against each other."""
+        E1, E2 = np.broadcast_arrays(np.asarray(E1, dtype=float), np.asarray(E2, dtype=float))
+        i = IntegralIndex.QUANTITIES.index(quantity)
+        lower = [a[i] for a in IntegralIndex._ends(self, E1)]
+        upper = [a[i] for a in IntegralIndex._ends(self, E2)]
+        return IntegralIndex._window(lower, upper).reshape(E1.shape)
+
+    def gw_window(self, E1, E2):
+        """Contributions of the windows [E1, E2] (eV) to the g-factor, e.g.
+        `gw_window(0, E_CD)` for the part below the cadmium cut-off."""
+        return IntegralIndex.integral(self, E1, E2) / self.norm
+
+    def _bands(self, edges):
+        C, D = IntegralIndex._ends(self, edges)
+        return IntegralIndex._window((C[:,:-1], D[:,:-1]), (C[:,1:], D[:,1:]))
+
+    def gw_bands(self, edges):
+        """Contributions of the consecutive energy bands between `edges` (eV,
+        ascending) to the g-factor; edges covering the grid sum to `gw`."""
+        return IntegralIndex._bands(self, edges)[2] / self.norm
+
+    def sigma_groups(self, edges):
+        """Flux-weighted group cross sections (b) of the multigroup structure
+        with the energy boundaries `edges` (eV, ascending).  Groups outside
+        the support of the flux are NaN."""
+        B = IntegralIndex._bands(self, edges)
+        return np.divide(B[2], B[1], out=np.full(B.shape[1], np.nan), where=B[1] > 0)
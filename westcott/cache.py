@@ -0,0 +1,200 @@
+import numpy as np
+import os
+import json
+import hashlib
+import threading
+import argparse
+
+from .log_handlers import *
+
+class CaptureCache(object):
+    __doc__="""Class to handle a binary on-disk cache of the ENDF-B/VIII.1
+    neutron-capture cross sections.  Each target is stored as a `.npy` array
+    of shape (2, n) holding energy (eV) and cross section (b), with a `.json`
+    sidecar recording the size, modification time and SHA-256 hash of the
+    source CSV file.  Cached arrays are loaded as read-only memory maps."""
+
+    VERSION = 1
+
+    def __init__(self, cache_dir=None, source_dir=None):
+        from . import get_data
+        if cache_dir is None:
+            cache_dir = CaptureCache.default_dir()
+        if source_dir is None:
+            source_dir = get_data('data_capture')
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+        self.source_dir = source_dir
+        self.enabled = os.environ.get('WESTCOTT_CACHE', '1') != '0'
+
+    @staticmethod
+    def default_dir():
+        """Cache directory: `$WESTCOTT_CACHE_DIR` if set, otherwise
+        `~/.cache/westcott/capture`."""
+        env = os.environ.get('WESTCOTT_CACHE_DIR')
+        if env:
+            return os.path.join(env, 'capture')
+        return os.path.join(os.path.expanduser('~'), '.cache', 'westcott', 'capture')
+
+    @staticmethod
+    def file_hash(path, blocksize=1<<20):
+        """SHA-256 hex digest of a file, read in blocks."""
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(blocksize), b''):
+                h.update(block)
+        return h.hexdigest()
+
+    def source_path(self, target):
+        return os.path.join(self.source_dir, "n-capture-{0}.csv".format(target))
+
+    def array_path(self, target):
+        return os.path.join(self.cache_dir, "{0}.npy".format(target))
+
+    def meta_path(self, target):
+        return os.path.join(self.cache_dir, "{0}.json".format(target))
+
+    def read_meta(self, target):
+        try:
+            with open(self.meta_path(target), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, target):
+        """Check the cached entry against the source CSV.  Size and mtime are
+        compared first; if only the mtime differs (e.g. after a fresh
+        checkout) the source hash is recomputed and the entry is kept when the
+        content is unchanged."""
+        meta = self.read_meta(target)
+        if meta is None or meta.get('version') != CaptureCache.VERSION:
+            return False
+        if not os.path.exists(self.array_path(target)):
+            return False
+        try:
+            st = os.stat(self.source_path(target))
+        except OSError:
+            return False
+        if st.st_size != meta['size']:
+            return False
+        if st.st_mtime_ns == meta['mtime_ns']:
+            return True
+        if CaptureCache.file_hash(self.source_path(target)) != meta['sha256']:
+            return False
+        meta['mtime_ns'] = st.st_mtime_ns
+        self._write_json(self.meta_path(target), meta)
+        return True
+
+    def load(self, target):
+        """Return memory-mapped (energy, cross section) arrays for a target,
+        or None if the cache is disabled, missing or stale."""
+        if not self.enabled or not self.is_fresh(target):
+            return None
+        try:
+            data = np.load(self.array_path(target), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        return (data[0], data[1])
+
+    def store(self, target, En, sigma):
+        """Write energy and cross-section arrays for a target to the cache.
+        Failures (e.g. read-only cache directory) are logged and ignored."""
+        if not self.enabled:
+            return False
+        source = self.source_path(target)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            st = os.stat(source)
+            meta = {'version': CaptureCache.VERSION,
+                    'target': target,
+                    'rows': int(len(En)),
+                    'size': st.st_size,
+                    'mtime_ns': st.st_mtime_ns,
+                    'sha256': CaptureCache.file_hash(source)}
+            data = np.ascontiguousarray(np.vstack([En, sigma]), dtype=np.float64)
+            tmp = self.array_path(target) + ".{0}.{1}.tmp".format(os.getpid(), threading.get_ident())
+            with open(tmp, 'wb') as f:
+                np.save(f, data)
+            os.replace(tmp, self.array_path(target))
+            self._write_json(self.meta_path(target), meta)
+        except OSError as e:
+            logger.warning("Unable to write capture cache for {0}: {1}".format(target, e))
+            return False
+        return True
+
+    def _write_json(self, path, obj):
+        tmp = path + ".{0}.{1}.tmp".format(os.getpid(), threading.get_ident())
+        with open(tmp, 'w') as f:
+            json.dump(obj, f)
+        os.replace(tmp, path)
+
+    def targets(self):
+        """List of targets available in the source directory."""
+        names = [f for f in os.listdir(self.source_dir)
+                 if f.startswith('n-capture-') and f.endswith('.csv')]
+        return sorted(n.split('n-capture-')[1].split('.csv')[0] for n in names)
+
+    def build(self, targets=None, force=False):
+        """(Re)build cache entries from the source CSV files.  Only stale or
+        missing entries are rewritten unless `force` is set.  Returns the list
+        of targets that were written."""
+        import pandas as pd
+        if targets is None:
+            targets = self.targets()
+        written = []
+        for target in targets:
+            if not force and self.is_fresh(target):
+                continue
+            df = pd.read_csv(self.source_path(target))
+            endf_data = df.to_numpy()
+            if self.store(target, endf_data[:,0], endf_data[:,1]):
+                written.append(target)
+        return written
+
+    def verify(self, targets=None):
+        """Recompute source hashes and return the list of targets whose cache
+        entries are missing or do not match the source content."""
+        if targets is None:
+            targets = self.targets()
+        stale = []
+        for target in targets:
+            meta = self.read_meta(target)
+            if (meta is None or not os.path.exists(self.array_path(target))
+                or CaptureCache.file_hash(self.source_path(target)) != meta.get('sha256')):
+                stale.append(target)
+        return stale
+
+    def clear(self):
+        """Remove all cache entries."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for f in os.listdir(self.cache_dir):
+            if f.endswith('.npy') or f.endswith('.json') or f.endswith('.tmp'):
+                os.remove(os.path.join(self.cache_dir, f))
+
+def main(argv=None):
+    """Command-line interface to build, verify or clear the capture cache."""
+    parser = argparse.ArgumentParser(prog='westcott-cache',
+                                     description="Manage the binary ENDF capture cross-section cache.")
+    parser.add_argument('action', choices=['build', 'verify', 'clear'])
+    parser.add_argument('targets', nargs='*', help="Targets to process (default: all).")
+    parser.add_argument('--cache-dir', default=None)
+    parser.add_argument('--force', action='store_true', help="Rebuild fresh entries too.")
+    args = parser.parse_args(argv)
+
+    cache = CaptureCache(cache_dir=args.cache_dir)
+    cache.enabled = True
+    targets = args.targets or None
+    if args.action == 'build':
+        written = cache.build(targets, force=args.force)
+        print(f"Wrote {len(written)} entries to {cache.cache_dir}")
+    elif args.action == 'verify':
+        stale = cache.verify(targets)
+        print(f"{len(stale)} stale entries" + (": " + " ".join(stale) if stale else ""))
+        return 1 if stale else 0
+    else:
+        cache.clear()
+        print(f"Cleared {cache.cache_dir}")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,172 @@
+import os
+import csv
+import re
+import glob
+import argparse
+
+from .log_handlers import *
+
+ELEMENTS = ('n', 'H', 'He', 'Li', 'Be', 'B', 'C', 'N', 'O', 'F', 'Ne', 'Na', 'Mg',
+            'Al', 'Si', 'P', 'S', 'Cl', 'Ar', 'K', 'Ca', 'Sc', 'Ti', 'V', 'Cr', 'Mn',
+            'Fe', 'Co', 'Ni', 'Cu', 'Zn', 'Ga', 'Ge', 'As', 'Se', 'Br', 'Kr', 'Rb',
+            'Sr', 'Y', 'Zr', 'Nb', 'Mo', 'Tc', 'Ru', 'Rh', 'Pd', 'Ag', 'Cd', 'In',
+            'Sn', 'Sb', 'Te', 'I', 'Xe', 'Cs', 'Ba', 'La', 'Ce', 'Pr', 'Nd', 'Pm',
+            'Sm', 'Eu', 'Gd', 'Tb', 'Dy', 'Ho', 'Er', 'Tm', 'Yb', 'Lu', 'Hf', 'Ta',
+            'W', 'Re', 'Os', 'Ir', 'Pt', 'Au', 'Hg', 'Tl', 'Pb', 'Bi', 'Po', 'At',
+            'Rn', 'Fr', 'Ra', 'Ac', 'Th', 'Pa', 'U', 'Np', 'Pu', 'Am', 'Cm', 'Bk',
+            'Cf', 'Es', 'Fm')
+
+MANIFEST = 'catalog.csv'
+FIELDS = ['kind', 'name', 'Z', 'A', 'isomer', 'formalism', 'index', 'path',
+          'rows', 'E_min', 'E_max', 'sorted']
+
+def parse_target(target):
+    """Split a target name such as 'Ag110_m1' into (Z, A, isomer)."""
+    m = re.match(r'^([A-Z][a-z]?)(\d+)(?:_m(\d+))?$', target)
+    if m is None:
+        raise ValueError("Cannot parse target name: {0}".format(target))
+    return ELEMENTS.index(m.group(1)), int(m.group(2)), int(m.group(3) or 0)
+
+class Catalog(object):
+    __doc__="""Class to handle the package manifest of capture cross sections,
+    resonance parameters and flux spectra.  The manifest is a CSV file shipped
+    with the data and read once, on first use, into dictionaries keyed by
+    target name (or spectrum index); no data directory is scanned at run
+    time."""
+
+    _instance = None
+
+    def __init__(self, records):
+        self.records = records
+        self.capture = {}
+        self.resonances = {}
+        self.spectra = {}
+        for r in records:
+            if r['kind'] == 'capture':
+                self.capture[r['name']] = r
+            elif r['kind'] == 'resonance':
+                self.resonances[r['name']] = r
+            elif r['kind'] == 'spectrum':
+                self.spectra[r['index']] = r
+        self.capture = dict(sorted(self.capture.items()))
+        self.resonances = dict(sorted(self.resonances.items()))
+        self.spectra = dict(sorted(self.spectra.items()))
+        # File-name views in the layout of the historical `*_dict` attributes
+        self.capture_files = {t: os.path.basename(r['path']) for t, r in self.capture.items()}
+        self.resonance_files = {t: [os.path.basename(r['path']), r['formalism']]
+                                for t, r in self.resonances.items()}
+        self.spectrum_files = {i: os.path.basename(r['path']) for i, r in self.spectra.items()}
+
+    @classmethod
+    def get(cls):
+        """Shared catalog, loaded from the manifest on first access (or built
+        by scanning the data directories if the manifest is missing)."""
+        if cls._instance is None:
+            from . import get_data
+            path = get_data(MANIFEST)
+            if os.path.exists(path):
+                cls._instance = Catalog.read(path)
+            else:
+                logger.warning("Catalog manifest not found; scanning data directories.")
+                cls._instance = Catalog(Catalog.scan(get_data(''), detail=False))
+        return cls._instance
+
+    @staticmethod
+    def read(path):
+        """Read a manifest CSV file."""
+        records = []
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                for key in ('Z', 'A', 'isomer', 'index', 'rows'):
+                    row[key] = int(row[key]) if row[key] != '' else None
+                for key in ('E_min', 'E_max'):
+                    row[key] = float(row[key]) if row[key] != '' else None
+                row['sorted'] = row['sorted'] == '1'
+                records.append(row)
+        return Catalog(records)
+
+    @staticmethod
+    def scan(root, detail=True, spectrum_order=()):
+        """Build manifest records by scanning the data directories under
+        `root`.  With `detail` set, each file is read to record its row count,
+        energy range and whether it is sorted by energy.  Spectra named in
+        `spectrum_order` keep that order; new spectra follow it."""
+        def summary(path):
+            if not detail:
+                return {'rows': None, 'E_min': None, 'E_max': None, 'sorted': False}
+            import numpy as np
+            import pandas as pd
+            E = pd.read_csv(path, encoding='utf-8-sig', usecols=[0]).to_numpy()[:,0]
+            return {'rows': len(E), 'E_min': E.min(), 'E_max': E.max(),
+                    'sorted': bool(np.all(np.diff(E) >= 0))}
+
+        records = []
+        for path in sorted(glob.glob(os.path.join(root, 'data_capture', '*.csv'))):
+            target = os.path.basename(path).split('n-capture-')[1].split('.csv')[0]
+            Z, A, isomer = parse_target(target)
+            records.append(dict(kind='capture', name=target, Z=Z, A=A, isomer=isomer,
+                                formalism='', index=None,
+                                path=os.path.relpath(path, root), **summary(path)))
+        for formalism in ('BreitWigner', 'ReichMoore'):
+            for path in sorted(glob.glob(os.path.join(root, 'data_resonances', formalism, '*.csv'))):
+                target = os.path.basename(path).split('n-res-')[1].split('.csv')[0]
+                Z, A, isomer = parse_target(target)
+                records.append(dict(kind='resonance', name=target, Z=Z, A=A, isomer=isomer,
+                                    formalism=formalism, index=None,
+                                    path=os.path.relpath(path, root), **summary(path)))
+        spectra = {os.path.basename(p).split('.csv')[0]: p
+                   for p in glob.glob(os.path.join(root, 'data_spectra', '*.csv'))}
+        order = [n for n in spectrum_order if n in spectra]
+        order += sorted(n for n in spectra if n not in order)
+        for i, name in enumerate(order):
+            path = spectra[name]
+            records.append(dict(kind='spectrum', name=name, Z=None, A=None, isomer=None,
+                                formalism='', index=i,
+                                path=os.path.relpath(path, root), **summary(path)))
+        return records
+
+    def write(self, path):
+        """Write the catalog as a manifest CSV file."""
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS, lineterminator='\n')
+            writer.writeheader()
+            for r in self.records:
+                row = {k: ('' if r[k] is None else r[k]) for k in FIELDS}
+                row['sorted'] = int(bool(r['sorted']))
+                writer.writerow(row)
+
+    def path(self, record):
+        """Absolute path of the data file of a catalog record."""
+        from . import get_data
+        return get_data(record['path'])
+
+def build_catalog(root=None, output=None):
+    """Regenerate the manifest from the data directories of the package (or
+    of `root`) and write it to `output` (default: the shipped manifest)."""
+    from . import get_data
+    if root is None:
+        root = get_data('')
+    if output is None:
+        output = os.path.join(root, MANIFEST)
+    order = ()
+    if os.path.exists(output):
+        previous = Catalog.read(output)
+        order = [r['name'] for r in previous.spectra.values()]
+    catalog = Catalog(Catalog.scan(root, spectrum_order=order))
+    catalog.write(output)
+    Catalog._instance = None
+    return catalog
+
+def main(argv=None):
+    """Command-line interface to regenerate the package manifest."""
+    parser = argparse.ArgumentParser(prog='westcott-catalog',
+                                     description="Regenerate the westcott data manifest.")
+    parser.add_argument('--root', default=None, help="Package data root (default: installed package).")
+    parser.add_argument('--output', default=None, help="Manifest path (default: <root>/catalog.csv).")
+    args = parser.parse_args(argv)
+    catalog = build_catalog(args.root, args.output)
+    print(f"Catalog with {len(catalog.records)} entries written.")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,70 @@
+import os
+import json
+import socket
+
+class GFactorClient(object):
+    __doc__="""Class to handle a thin client of the local g-factor server
+    (`server.py`).  It depends on the standard library only; requests are
+    JSON lines over a Unix socket or a localhost TCP port."""
+
+    def __init__(self, path=None, host='127.0.0.1', port=None, timeout=60.):
+        if port is None:
+            if path is None:
+                from .server import default_socket
+                path = default_socket()
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(path)
+        else:
+            self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.file = self.sock.makefile('rwb')
+        self._next_id = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+    def batch(self, requests):
+        """Send a list of request dictionaries at once and return the replies
+        in the same order.  Pipelined requests are batched by the server.
+        Raises RuntimeError if the server rejects a line it cannot parse,
+        which it answers without an `id`."""
+        ids = []
+        for req in requests:
+            req = {k: v for k, v in req.items() if v is not None}
+            self._next_id += 1
+            req['id'] = self._next_id
+            ids.append(self._next_id)
+            self.file.write((json.dumps(req) + '\n').encode())
+        self.file.flush()
+        replies = {}
+        while len(replies) < len(ids):
+            line = self.file.readline()
+            if not line:
+                raise ConnectionError("Connection closed by the g-factor server.")
+            reply = json.loads(line)
+            if reply.get('id') is None and 'error' in reply:
+                raise RuntimeError(reply['error'])
+            replies[reply.get('id')] = reply
+        return [replies[i] for i in ids]
+
+    def request(self, **req):
+        """Send one request and return the reply dictionary."""
+        return GFactorClient.batch(self, [req])[0]
+
+    def gw(self, target, T=None, spectrum=None):
+        """Westcott g-factor of a target for a Maxwellian at `T` (K) or for a
+        bundled spectrum; raises KeyError for unknown targets or spectra and
+        RuntimeError for any other error reported by the server."""
+        reply = GFactorClient.request(self, target=target, T=T, spectrum=spectrum)
+        if 'error' in reply:
+            if reply.get('code') == 'not_found':
+                raise KeyError(reply['error'])
+            raise RuntimeError(reply['error'])
+        return reply['gW']
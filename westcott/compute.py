@@ -0,0 +1,216 @@
+import numpy as np
+import threading
+
+from .log_handlers import *
+from .westcott_gfactors import *
+
+def frozen(a):
+    """Read-only float array for `a`.  Arrays that are already read-only
+    (e.g. held by the `ArrayCache` or memory-mapped) are returned as they
+    are, so that the cached interpolants keyed on them are still found;
+    anything else is copied."""
+    if isinstance(a, np.ndarray) and a.dtype == np.float64 and not a.flags.writeable:
+        return a
+    a = np.array(a, dtype=float)
+    a.flags.writeable = False
+    return a
+
+class _Frozen(object):
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError("{0} is immutable".format(type(self).__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError("{0} is immutable".format(type(self).__name__))
+
+class CrossSection(_Frozen):
+    __doc__="""Class to hold an immutable pointwise cross section: energies
+    `E` (eV) and cross sections `sigma` (b) as read-only arrays, with the
+    optional ENDF `target` name."""
+
+    __slots__ = ('E', 'sigma', 'target')
+
+    def __init__(self, E, sigma, target=None):
+        object.__setattr__(self, 'E', frozen(E))
+        object.__setattr__(self, 'sigma', frozen(sigma))
+        object.__setattr__(self, 'target', target)
+
+    @classmethod
+    def from_target(cls, target):
+        """Shared ENDF cross section of `target` (see `sigma_ENDF`), or None."""
+        data = CrossSectionData.sigma_ENDF(_shared(), target)
+        if data is None:
+            return
+        return cls(*data, target=target)
+
+    def __iter__(self):
+        return iter((self.E, self.sigma))
+
+class Spectrum(_Frozen):
+    __doc__="""Class to hold an immutable neutron energy spectrum: energies
+    `E` (eV) and dN/dE as read-only arrays, with an optional `name`."""
+
+    __slots__ = ('E', 'dndE', 'name')
+
+    def __init__(self, E, dndE, name=None):
+        object.__setattr__(self, 'E', frozen(E))
+        object.__setattr__(self, 'dndE', frozen(dndE))
+        object.__setattr__(self, 'name', name)
+
+    @classmethod
+    def from_flux(cls, flux):
+        """Shared bundled spectrum (`find_flux` index, see `get_flux`)."""
+        return cls(*NeutronFlux.get_flux(_shared(), flux), name=flux)
+
+    def __iter__(self):
+        return iter((self.E, self.dndE))
+
+_SHARED = {}
+_SHARED_LOCK = threading.Lock()
+
+def _shared():
+    """One `Westcott` instance for data loading, shared by all threads: its
+    data methods keep no per-call state."""
+    with _SHARED_LOCK:
+        if 'xs' not in _SHARED:
+            from .westcott import Westcott
+            _SHARED['xs'] = Westcott()
+        return _SHARED['xs']
+
+def grid(vn):
+    """Read-only velocity grid (m/s) for the functions of this module."""
+    return frozen(vn)
+
+def gw_maxwellian(cross_section, T, grid=DEFAULT_GRID, store=None):
+    """Westcott g-factor of a `CrossSection` in a Maxwellian at `T` (K); an
+    array of temperatures gives an array of g-factors.  With a
+    `ResultStore`, results are reused as in `gFactors.gw_Maxwellian`."""
+    def compute():
+        kernel = MaxwellianKernel.get(T, grid)
+        r = reduced_sigma(cross_section.E, cross_section.sigma, grid)
+        with profiling.stage('integration'):
+            gW = kernel.weights @ r
+        return gW[0] if np.ndim(T) == 0 else gW
+    return stored_result(store, 'gw_Maxwellian', compute, cross_section.E, cross_section.sigma,
+                         grid=grid, target=cross_section.target, T=T)
+
+def gw_arbitrary(cross_section, spectrum, grid=DEFAULT_GRID, store=None):
+    """Westcott g-factor of a `CrossSection` in a `Spectrum`, integrated as
+    in `gFactors.gw_arbitrary`."""
+    def compute():
+        dndv_interp = interp_dndv(spectrum.E, spectrum.dndE, grid)
+        sigma0, sigma_interp = interp_sigma(cross_section.E, cross_section.sigma, grid)
+        with profiling.stage('integration'):
+            return 1/(sigma0 * Kinematics.v_0) * trapezoid(dndv_interp * grid * sigma_interp, grid) / trapezoid(dndv_interp, grid)
+    return stored_result(store, 'gw_arbitrary', compute, spectrum.E, spectrum.dndE,
+                         cross_section.E, cross_section.sigma, grid=grid, target=cross_section.target)
+
+def _bracket(xp, x_first, x_last, lo):
+    """Slice [lo, hi) of the ascending points `xp` bracketing [x_first,
+    x_last], searched forward from the previous `lo`."""
+    lo = max(lo + int(np.searchsorted(xp[lo:], x_first, side='right')) - 1, 0)
+    hi = lo + int(np.searchsorted(xp[lo:], x_last, side='left')) + 1
+    return lo, min(hi, len(xp))
+
+def gw_arbitrary_chunked(cross_section, spectrum, grid=DEFAULT_GRID, chunk_size=2**16, store=None):
+    """Westcott g-factor of a `CrossSection` in a `Spectrum` as in
+    `gw_arbitrary`, integrated block by block over `grid` with running
+    trapezoidal numerator and denominator.  `grid` is an ascending array or
+    a `LogGrid`, generated block by block, so that memory use is a few
+    buffers of `chunk_size` points whatever the grid size.  The ENDF and
+    spectrum points are walked once, each block being interpolated on the
+    slice of points that brackets it; results agree with `gw_arbitrary` to
+    rounding."""
+    def compute():
+        n = len(grid)
+        m = max(2, min(int(chunk_size), n))
+        v_sigma = np.sqrt(2*np.asarray(cross_section.E)*Kinematics.eV/Kinematics.m_n)
+        sigma = cross_section.sigma
+        sigma0 = np.interp(Kinematics.v_0, v_sigma, sigma)  #thermal cross section, barns
+        E_s, dndE_s = spectrum.E, spectrum.dndE
+        v = np.empty(m)
+        E_n = np.empty(m)
+        dndv = np.empty(m)
+        f = np.empty(m)
+        dv = np.empty(m-1)
+        tmp = np.empty(m-1)
+        num = den = 0.
+        js = jf = 0
+        # Blocks share their end points: [0, m-1], [m-1, 2m-2], ...
+        for i0 in range(0, max(n-1, 1), m-1):
+            i1 = min(i0 + m, n)
+            k = i1 - i0
+            if hasattr(grid, 'block'):
+                vb = grid.block(i0, i1, out=v)
+            else:
+                vb = v[:k]
+                vb[:] = grid[i0:i1]
+            with profiling.stage('interpolation'):
+                Eb = E_n[:k]
+                np.square(vb, out=Eb)
+                Eb *= 0.5*Kinematics.m_n
+                Eb /= Kinematics.eV
+                jf, hf = _bracket(E_s, Eb[0], Eb[-1], jf)
+                db = dndv[:k]
+                np.multiply(Eb, 2 * Kinematics.m_n, out=db)
+                np.sqrt(db, out=db)
+                db *= np.interp(Eb, E_s[jf:hf], dndE_s[jf:hf], left=0, right=0)
+                js, hs = _bracket(v_sigma, vb[0], vb[-1], js)
+                fb = f[:k]
+                np.multiply(db, vb, out=fb)
+                fb *= np.interp(vb, v_sigma[js:hs], sigma[js:hs])
+            with profiling.stage('integration'):
+                d, t = dv[:k-1], tmp[:k-1]
+                np.subtract(vb[1:], vb[:-1], out=d)
+                np.add(fb[1:], fb[:-1], out=t)
+                t *= d
+                num += t.sum()/2
+                np.add(db[1:], db[:-1], out=t)
+                t *= d
+                den += t.sum()/2
+        profiling.count('grid_size', n)
+        return 1/(sigma0 * Kinematics.v_0) * num / den
+    if hasattr(grid, 'block'):
+        return stored_result(store, 'gw_arbitrary', compute, spectrum.E, spectrum.dndE,
+                             cross_section.E, cross_section.sigma, target=cross_section.target, **grid.key())
+    return stored_result(store, 'gw_arbitrary', compute, spectrum.E, spectrum.dndE,
+                         cross_section.E, cross_section.sigma, grid=grid, target=cross_section.target)
+
+def irregularity_density(vn, T=None):
+    """Normalized neutron density p(v) of the irregularity method (see
+    `Irregularity.p`)."""
+    T = Kinematics.T_0 if T is None else T
+    vt = np.sqrt(2 * Kinematics.kB * T / Kinematics.m_n)
+    # 2*vt*phi(v)/(sqrt(pi)*v) with phi the Maxwellian of `phi_Maxwellian`
+    p_array = 4 * vn**2 * np.exp(-(vn/vt)**2) / (np.sqrt(np.pi) * vt**3)
+    N = trapezoid(p_array, vn)  # Normalization factor, to ensure integral of p(T,v) integrates to unity (Molnar p. 12)
+    return p_array/N
+
+def gw_irregularity(E_resonance, Gamma, T=None, grid=DEFAULT_GRID, chunk_size=2**22, store=None):
+    """Irregularity-method g-factor(s) of resonances at `E_resonance` (eV)
+    with widths `Gamma` (eV), as in `Irregularity.gw_irregularity`."""
+    def compute():
+        E = 0.5 * Kinematics.m_n * grid**2 / Kinematics.eV
+        # trapezoid(del_0 * p, vn) = A * sum_i(w_i p_i / ((E_r - E_i)^2 + G^2/4))
+        pw = irregularity_density(grid, T) * trapezoid_weights(grid)
+        E_r, G2 = Irregularity._resonance_axes(E_resonance, Gamma, 0)
+        shape = E_r.shape
+        E_r = E_r.ravel()
+        G2 = G2.ravel()
+
+        rows = max(1, min(len(E_r), chunk_size // max(len(grid), 1)))
+        buf = np.empty((rows, len(grid)))
+        S = np.empty(len(E_r))
+        with profiling.stage('integration'):
+            for i in range(0, len(E_r), rows):
+                n = min(rows, len(E_r) - i)
+                b = buf[:n]
+                np.subtract(E_r[i:i+n,np.newaxis], E, out=b)
+                np.square(b, out=b)
+                b += G2[i:i+n,np.newaxis]
+                np.divide(pw, b, out=b)
+                S[i:i+n] = b.sum(axis=1)
+        gW = ((E_r - Kinematics.E_0)**2 + G2) * S
+        return gW.reshape(shape) if shape else gW[0]
+    return stored_result(store, 'gw_irregularity', compute, E_resonance, Gamma, grid=grid, T=T)
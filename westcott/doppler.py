@@ -0,0 +1,170 @@
+import numpy as np
+import os
+import json
+import threading
+
+from .log_handlers import *
+from .cache import CaptureCache
+
+Z_CUT = 6. #kernel cut-off in units of the thermal velocity spread (exp(-36) ~ 2e-16)
+E_MAX = 1e3 #eV, default broadening limit; well above the g-factor velocity grid
+
+def _interval_coefficients(E, sigma, alpha):
+    """Piecewise representation of `sigma` on the reduced-velocity axis
+    x = sqrt(alpha*E): breakpoints X (with 0 and +inf appended), and per
+    interval k the value s_k and slope b_k such that
+    sigma(x) = s_k + b_k*(x^2 - X_k^2), plus the coefficient c_k of a 1/v
+    term c_k/x (nonzero only below the first ENDF point)."""
+    x = np.sqrt(alpha*np.asarray(E, dtype=float))
+    sigma = np.asarray(sigma, dtype=float)
+    X = np.concatenate([[0.], x, [np.inf]])
+    n = len(X) - 1
+    s = np.zeros(n)
+    b = np.zeros(n)
+    c = np.zeros(n)
+    dx2 = x[1:]**2 - x[:-1]**2
+    s[1:-1] = sigma[:-1]
+    b[1:-1] = np.divide(np.diff(sigma), dx2, out=np.zeros_like(dx2), where=dx2 > 0)
+    s[-1] = sigma[-1]  # constant above the last point
+    c[0] = sigma[0] * x[0]  # 1/v below the first point
+    return X, s, b, c
+
+def _gauss_sums(w, X, s, b, c, chunk_size):
+    """S(w) = 1/sqrt(pi) * int_0^inf x^2 sigma(x) exp(-(x-w)^2) dx for each
+    `w`, summed exactly over the piecewise intervals within Z_CUT of `w`."""
+    from scipy.special import erfc
+    out = np.zeros(len(w))
+    k1 = np.clip(np.searchsorted(X, w - Z_CUT, side='right') - 1, 0, len(s) - 1)
+    k2 = np.clip(np.searchsorted(X, w + Z_CUT, side='left') - 1, -1, len(s) - 1)
+    counts = np.where(k2 >= k1, k2 - k1 + 2, 0)  # breakpoints per window
+    ends = np.cumsum(counts)
+    start = 0
+    while start < len(w):
+        base = ends[start] - counts[start]
+        stop = max(start + 1, int(np.searchsorted(ends, base + chunk_size, side='right')))
+        rows = np.arange(start, stop)
+        n = counts[rows]
+        M = int(n.sum())
+        if M == 0:
+            start = stop
+            continue
+        r = np.repeat(rows, n)
+        offsets = np.repeat(np.cumsum(n) - n, n)
+        p = k1[r] + (np.arange(M) - offsets)
+        wr = w[r]
+        z = np.clip(X[p] - wr, -40., 40.)
+        q = erfc(np.abs(z)) / 2
+        g = np.exp(-z*z) / (2*np.sqrt(np.pi))
+
+        # Interval between consecutive breakpoints of the same window
+        z1, z2, q1, q2, g1, g2 = z[:-1], z[1:], q[:-1], q[1:], g[:-1], g[1:]
+        H0 = np.where(z1 >= 0, q1 - q2, np.where(z2 < 0, q2 - q1, 1 - q1 - q2))
+        H1 = g1 - g2
+        H2 = H0/2 + (z1*g1 - z2*g2)
+        H3 = H1 + (z1**2*g1 - z2**2*g2)
+        H4 = 1.5*H2 + (z1**3*g1 - z2**3*g2)
+
+        k = p[:-1]
+        wk = wr[:-1]
+        A2 = b[k]
+        A1 = 2*A2*wk
+        A0 = s[k] + A2*(wk - X[k])*(wk + X[k])
+        ck = c[k]
+        T = ((wk*wk*A0 + ck*wk)*H0 + (2*wk*A0 + wk*wk*A1 + ck)*H1
+             + (A0 + 2*wk*A1 + wk*wk*A2)*H2 + (A1 + 2*wk*A2)*H3 + A2*H4)
+        valid = r[:-1] == r[1:]
+        out[start:stop] = np.bincount(r[:-1][valid] - start, weights=T[valid], minlength=stop - start)
+        start = stop
+    return out
+
+def broaden(E, sigma, T, A, T_base=0., E_out=None, E_max=None, chunk_size=2**16):
+    """Doppler-broaden a pointwise, lin-lin cross section (b) given at the
+    energies `E` (eV) from `T_base` to `T` (K) for a target of mass number
+    `A`, using the exact free-gas (SIGMA1) kernel integrated analytically
+    over every linear interval.  Below the first point the cross section is
+    continued as 1/v and above the last point as a constant.
+
+    The broadened cross section is evaluated at `E_out` (default: `E`);
+    with `E_max`, points above `E_max` are returned unbroadened.  Work is
+    done in blocks of at most `chunk_size` (energy, breakpoint) pairs."""
+    from .westcott_gfactors import Kinematics
+    E = np.asarray(E, dtype=float)
+    sigma = np.asarray(sigma, dtype=float)
+    E_out = E if E_out is None else np.asarray(E_out, dtype=float)
+    if T <= T_base:
+        return np.interp(E_out, E, sigma)
+    alpha = A*Kinematics.u/Kinematics.m_n * Kinematics.eV/(Kinematics.kB*(T - T_base))
+    X, s, b, c = _interval_coefficients(E, sigma, alpha)
+
+    result = np.interp(E_out, E, sigma)
+    mask = np.ones(len(E_out), dtype=bool) if E_max is None else E_out <= E_max
+    y = np.sqrt(alpha*E_out[mask])
+    S = _gauss_sums(y, X, s, b, c, chunk_size)
+    low = y < Z_CUT
+    S[low] -= _gauss_sums(-y[low], X, s, b, c, chunk_size)
+    result[mask] = S / y**2
+    return result
+
+class DopplerCache(object):
+    __doc__="""Class to handle an on-disk cache of Doppler-broadened capture
+    cross sections, one `.npy` array of shape (2, n) per (target, T) with a
+    `.json` sidecar recording the SHA-256 hash of the source data from the
+    binary capture cache.  Entries whose source has changed are rebuilt;
+    without a source hash (capture cache disabled or unwritable) nothing is
+    cached on disk, as a change of the data could not be detected."""
+
+    VERSION = 1
+
+    def __init__(self, cache_dir=None):
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(CaptureCache.default_dir()), 'doppler')
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+        self.enabled = os.environ.get('WESTCOTT_CACHE', '1') != '0'
+
+    def array_path(self, target, T):
+        return os.path.join(self.cache_dir, "{0}_{1!r}K.npy".format(target, float(T)))
+
+    def meta_path(self, target, T):
+        return os.path.join(self.cache_dir, "{0}_{1!r}K.json".format(target, float(T)))
+
+    def load(self, target, T, sha256=None, E_max=E_MAX):
+        """Memory-mapped (energy, cross section) arrays for a target at `T`,
+        or None if missing, disabled or built from different source data."""
+        if not self.enabled or sha256 is None:
+            return None
+        try:
+            with open(self.meta_path(target, T)) as f:
+                meta = json.load(f)
+            if (meta.get('version') != DopplerCache.VERSION or meta.get('sha256') != sha256
+                or meta.get('target') != target or meta.get('T') != float(T) or meta.get('E_max') != E_max):
+                return None
+            data = np.load(self.array_path(target, T), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        return (data[0], data[1])
+
+    def store(self, target, T, En, sigma, sha256=None, E_max=E_MAX):
+        """Write a broadened table; failures are logged and ignored."""
+        if not self.enabled or sha256 is None:
+            return False
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = self.array_path(target, T) + ".{0}.{1}.tmp".format(os.getpid(), threading.get_ident())
+            with open(tmp, 'wb') as f:
+                np.save(f, np.vstack([En, sigma]))
+            os.replace(tmp, self.array_path(target, T))
+            with open(self.meta_path(target, T), 'w') as f:
+                json.dump({'version': DopplerCache.VERSION, 'target': target,
+                           'T': float(T), 'E_max': E_max, 'sha256': sha256}, f)
+        except OSError as e:
+            logger.warning("Unable to write Doppler cache for {0} at {1:g} K: {2}".format(target, T, e))
+            return False
+        return True
+
+    def clear(self):
+        """Remove all cache entries."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for f in os.listdir(self.cache_dir):
+            if f.endswith('.npy') or f.endswith('.json') or f.endswith('.tmp'):
+                os.remove(os.path.join(self.cache_dir, f))
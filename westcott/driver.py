@@ -0,0 +1,192 @@
+import numpy as np
+import os
+import io
+import csv
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .log_handlers import *
+from .tables import *
+from .westcott_gfactors import *
+
+# Per-process state installed once by `_init_worker`; never sent with tasks.
+_WORKER = {}
+
+def _init_worker(vn, weights, store=None, context=None):
+    """Process-pool initializer: keep the read-only velocity grid and the
+    stacked quadrature weights of every spectrum resident in the worker,
+    with the result store and the content key of the weights."""
+    _WORKER['vn'] = vn
+    _WORKER['weights'] = weights
+    _WORKER['xs'] = CrossSectionData()
+    _WORKER['store'] = store
+    _WORKER['context'] = context
+
+def _evaluate(targets):
+    """Evaluate one chunk of targets against all spectra of the worker;
+    targets without capture data are logged and skipped."""
+    vn = _WORKER['vn']
+    W = _WORKER['weights']
+    xs = _WORKER['xs']
+    rows = []
+    for target in targets:
+        cross_section = xs.sigma_ENDF(target)
+        if cross_section is None:
+            continue
+        E, sigma = cross_section
+        def compute():
+            v_sigma = np.sqrt(2*np.asarray(E)*Kinematics.eV/Kinematics.m_n)
+            sigma0 = np.interp(Kinematics.v_0, v_sigma, sigma)  #thermal cross section, barns
+            return np.concatenate([[sigma0], W @ reduced_sigma(E, sigma, vn)])
+        values = stored_result(_WORKER['store'], 'gfactor_table', compute, E, sigma,
+                               target=target, context=_WORKER['context'])
+        rows.append([target] + list(values))
+    return rows
+
+def spectrum_weights(temperatures=(), spectra=None, vn=DEFAULT_GRID):
+    """Stack the normalized quadrature weights of the requested Maxwellian
+    temperatures and experimental spectra into one (columns x grid) matrix.
+    `spectra` defaults to every file in `data_spectra`.  Returns the column
+    names and the matrix."""
+    flux = NeutronFlux()
+    if spectra is None:
+        spectra = [i for (i, f) in flux.find_flux()]
+    names = ["gW_{0:g}K".format(T) for T in temperatures]
+    blocks = []
+    if len(temperatures):
+        blocks.append(maxwellian_weights(temperatures, vn))
+    for i in spectra:
+        E_spectrum, dndE_spectrum = flux.get_flux(i)
+        names.append("gW_{0}".format(flux.flux_data_dict[i].split('.csv')[0]))
+        blocks.append(flux_weights(E_spectrum, dndE_spectrum, vn)[np.newaxis,:])
+    return names, np.vstack(blocks)
+
+def completed_targets(output):
+    """Targets with a complete row in an existing result table: every column
+    filled and the line terminated, so that a row cut short by an
+    interrupted run does not count."""
+    if not os.path.exists(output):
+        return set()
+    with open(output, newline='') as f:
+        text = f.read()
+    reader = csv.reader(io.StringIO(text[:text.rfind('\n') + 1]))
+    header = next(reader, None)
+    if header is None:
+        return set()
+    return {row[0] for row in reader if len(row) == len(header) and all(row)}
+
+def drop_partial_row(output):
+    """Truncate `output` after its last newline, removing the unterminated
+    row an interrupted run may have left, so that appended rows start on a
+    line of their own."""
+    with open(output, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            f.truncate(end)
+
+def gfactor_table(output, targets=None, temperatures=(293,), spectra=None,
+                  vn=DEFAULT_GRID, workers=None, chunk_size=8, resume=True,
+                  store=None):
+    """Compute a library-wide table of thermal cross sections and Westcott
+    g-factors and write it to the CSV file `output`.
+
+    Targets (default: all of `data_capture`) are split into chunks of
+    `chunk_size` and fanned out over a process pool of `workers` processes
+    (default: `os.cpu_count()`; 0 or 1 runs in-process).  The velocity grid
+    and spectrum weights are handed to each worker once through the pool
+    initializer.  Rows are appended and flushed as chunks complete, so with
+    `resume=True` a rerun skips targets with a complete row in `output`
+    (see `completed_targets`); a row cut short by an interrupted run is
+    removed and recomputed.  Targets without capture data are logged and
+    skipped.
+
+    Rows are also kept in a `ResultStore` (`store`: a store, a database 
+    path, None for `ResultStore.default()` or False for none), keyed by the 
+    content of each cross section and of the spectrum weights, so that a 
+    full rerun after the library or a spectrum has changed only recomputes 
+    the targets whose inputs differ.  Returns the number of targets 
+    written."""
+    if targets is None:
+        targets = CrossSectionData().find_targets()
+    names, W = spectrum_weights(temperatures, spectra, vn)
+    header = ['target', 'sigma0'] + names
+    if store is None:
+        store = ResultStore.default()
+    elif store is False:
+        store = None
+    elif isinstance(store, str):
+        store = ResultStore(store)
+    context = None if store is None else ResultStore.key('spectrum_weights', W, grid=vn, columns=','.join(header))
+
+    if resume and os.path.exists(output) and os.path.getsize(output):
+        with open(output, newline='') as f:
+            existing = next(csv.reader(f), None)
+        if existing != header:
+            logger.error("Cannot resume {0}: columns differ from the requested table.".format(output))
+            return 0
+        drop_partial_row(output)
+        done = completed_targets(output)
+        targets = [t for t in targets if t not in done]
+        mode = 'a'
+    else:
+        mode = 'w'
+    chunks = [targets[i:i+chunk_size] for i in range(0, len(targets), chunk_size)]
+
+    n = 0
+    with open(output, mode, newline='') as f:
+        writer = csv.writer(f)
+        if mode == 'w':
+            writer.writerow(header)
+            f.flush()
+        if workers is not None and workers <= 1:
+            _init_worker(vn, W, store, context)
+            for chunk in chunks:
+                rows = _evaluate(chunk)
+                writer.writerows(rows)
+                f.flush()
+                n += len(rows)
+            return n
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(vn, W, store, context)) as pool:
+            futures = [pool.submit(_evaluate, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                rows = future.result()
+                writer.writerows(rows)
+                f.flush()
+                n += len(rows)
+                logger.info("{0}/{1} targets written to {2}".format(n, len(targets), output))
+    return n
+
+def main(argv=None):
+    """Command-line interface to `gfactor_table`."""
+    parser = argparse.ArgumentParser(prog='westcott-table',
+                                     description="Compute Westcott g-factor tables for the ENDF capture library.")
+    parser.add_argument('output', help="Output CSV file.")
+    parser.add_argument('-t', '--targets', nargs='+', default=None,
+                        help="Targets to evaluate (default: all).")
+    parser.add_argument('-T', '--temperatures', nargs='*', type=float, default=[293],
+                        help="Maxwellian temperatures in K (default: 293).")
+    parser.add_argument('-s', '--spectra', nargs='*', type=int, default=None,
+                        help="Indices of bundled spectra from `find_flux` (default: all).")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="Number of worker processes (default: CPU count).")
+    parser.add_argument('-c', '--chunk-size', type=int, default=8,
+                        help="Targets per task (default: 8).")
+    parser.add_argument('-n', '--grid-points', type=int, default=100000,
+                        help="Points of the logarithmic velocity grid (default: 100000).")
+    parser.add_argument('--restart', action='store_true',
+                        help="Overwrite the output instead of resuming.")
+    parser.add_argument('--results', default=None, metavar='PATH',
+                        help="Result store database reused across runs (default: $WESTCOTT_RESULTS, if set).")
+    args = parser.parse_args(argv)
+
+    n = gfactor_table(args.output, targets=args.targets, temperatures=args.temperatures,
+                      spectra=args.spectra, vn=np.logspace(0,5,args.grid_points),
+                      workers=args.workers, chunk_size=args.chunk_size,
+                      resume=not args.restart, store=args.results)
+    print(f"Computed {n} targets; results in {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
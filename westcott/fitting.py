@@ -0,0 +1,215 @@
+import numpy as np
+
+from .log_handlers import *
+from .westcott_gfactors import *
+
+BARN = 1e-24 #cm^2
+E_EPI_MAX = 2e7 #eV, default upper end of the epithermal 1/E flux
+
+def epithermal_integral(E, sigma, E_cut, E_max=E_EPI_MAX):
+    """Integral of sigma(E)/E dE (b) from `E_cut` to `E_max` (eV) of a
+    pointwise cross section, exact for lin-lin interpolation between the
+    points (held constant beyond the last point)."""
+    E = np.asarray(E, dtype=float)
+    inner = (E > E_cut) & (E < E_max)
+    x = np.concatenate([[E_cut], E[inner], [E_max]])
+    y = np.interp(x, E, sigma)
+    b = np.diff(y)/np.diff(x)
+    a = y[:-1] - b*x[:-1]
+    return float(np.sum(a*np.log(x[1:]/x[:-1]) + b*np.diff(x)))
+
+class FitResult(object):
+    __doc__="""Class to hold the result of a `FoilFit`: best-fit parameters
+    with their covariance matrix and standard deviations, the chi-square of
+    the fit and the fitted reaction rates of the foils."""
+
+    def __init__(self, names, values, cov, chi2, dof, targets, rates, residuals, iterations, converged):
+        self.names = list(names)
+        self.values = np.asarray(values, dtype=float)
+        self.cov = np.asarray(cov, dtype=float)
+        self.std = np.sqrt(np.diag(self.cov))
+        self.chi2 = float(chi2)
+        self.dof = int(dof)
+        self.targets = list(targets)
+        self.rates = rates
+        self.residuals = residuals
+        self.iterations = iterations
+        self.converged = converged
+
+    def __getitem__(self, name):
+        return self.values[self.names.index(name)]
+
+    @property
+    def params(self):
+        """Dictionary of the best-fit parameters."""
+        return dict(zip(self.names, self.values.tolist()))
+
+    def corr(self):
+        """Correlation matrix of the parameters."""
+        return self.cov / np.outer(self.std, self.std)
+
+    def summary(self):
+        """Table of value and standard deviation per parameter."""
+        import pandas as pd
+        return pd.DataFrame({'value': self.values, 'std': self.std},
+                            index=pd.Index(self.names, name='parameter'))
+
+class FoilFit(object):
+    __doc__="""Class to infer the neutron temperature, and optionally an
+    epithermal component, from reaction rates measured with several monitor
+    foils.  The rate per target atom of foil i is modelled as
+
+        R_i = phi0 * sigma0_i * (g_i(T) + beta * h_i),
+
+    with phi0 = n*v_0 the conventional Westcott flux (cm^-2 s^-1), g_i(T)
+    the Maxwellian g-factor and h_i the g-factor of a 1/E epithermal flux
+    from `E_cut` to `E_max` (eV), beta being the ratio of epithermal to
+    Maxwellian neutron density.  h_i is integrated over the ENDF points of
+    each foil (see `epithermal_integral`), so it does not depend on the
+    velocity grid, whose default upper end is only about 52 eV.
+
+    The cross sections of the foils are reduced onto the velocity grid once,
+    so an evaluation of all g_i(T) and of their analytic derivatives, from
+    d(phi)/dT = phi*(v^2/v_T^2 - 2)/T, costs one set of Maxwellian weights
+    and two matrix-vector products; with a `ChebyshevSurrogate` covering
+    the foils, it costs a few Chebyshev series.  Fits are made by
+    Levenberg-Marquardt iterations on all foils simultaneously."""
+
+    def __init__(self, targets, vn=DEFAULT_GRID, E_cut=None, surrogate=None, E_max=E_EPI_MAX):
+        from .westcott import Westcott
+        gw = Westcott()
+        self.vn = np.asarray(vn, dtype=float)
+        self.surrogate = surrogate
+        self.E_cut = 5*Kinematics.kB*Kinematics.T_0/Kinematics.eV if E_cut is None else E_cut
+        self.E_max = E_max
+        # Targets without capture data are logged by `sigma_ENDF` and left out
+        cross_sections = {t: CrossSectionData.sigma_ENDF(gw, t) for t in targets}
+        self.targets = [t for t in targets if cross_sections[t] is not None]
+        self.R = np.empty((len(self.targets), len(self.vn)))
+        self.sigma0 = np.empty(len(self.targets))
+        self.h = np.empty(len(self.targets))
+        # 1/E flux, i.e. dN/dE proportional to E^(-3/2), normalized to unit
+        # density: h = sqrt(2/m_n) * int sigma/E dE / (sigma0 * v_0 * int E^(-3/2) dE)
+        density = 2*(self.E_cut**-0.5 - self.E_max**-0.5)
+        for i, target in enumerate(self.targets):
+            cross_section = cross_sections[target]
+            self.sigma0[i] = interp_sigma(*cross_section, self.vn)[0]
+            self.R[i] = reduced_sigma(*cross_section, self.vn)
+            self.h[i] = (np.sqrt(2*Kinematics.eV/Kinematics.m_n) * epithermal_integral(*cross_section, self.E_cut, self.E_max)
+                         / (density * self.sigma0[i] * Kinematics.v_0))
+        self.w = trapezoid_weights(self.vn)
+        self.v2 = self.vn**2
+
+    def gw(self, T):
+        """Maxwellian g-factors of the foils at `T` (K) and their derivatives
+        with respect to T (K^-1)."""
+        if self.surrogate is not None:
+            g = np.array([self.surrogate.gw(t, T) for t in self.targets], dtype=float)
+            dg = np.array([self.surrogate.derivative(t, T) for t in self.targets], dtype=float)
+            return g, dg
+        vt2 = 2*Kinematics.kB*T/Kinematics.m_n
+        with profiling.stage('kernel_build'):
+            W = np.exp(-self.v2/vt2)
+            W *= self.v2 * self.vn * self.w
+            W /= W.sum()
+            d = (self.v2/vt2 - 2)/T
+        with profiling.stage('integration'):
+            g = self.R @ W
+            # Derivative of the normalized weights: W*(d - <d>)
+            dg = self.R @ (W*d) - g*(W @ d)
+        return g, dg
+
+    def model(self, p):
+        """Rates of the foils (s^-1 per atom) for the parameters `p` =
+        (phi0, T[, beta]), and their Jacobian of shape (foils, len(p))."""
+        phi0, T = p[0], p[1]
+        beta = p[2] if len(p) > 2 else 0.
+        g, dg = FoilFit.gw(self, T)
+        s = BARN * self.sigma0
+        J = np.empty((len(self.targets), len(p)))
+        J[:,0] = s*(g + beta*self.h)
+        J[:,1] = phi0*s*dg
+        if len(p) > 2:
+            J[:,2] = phi0*s*self.h
+        return phi0*J[:,0], J
+
+    def _valid(self, p):
+        if p[1] <= 0:
+            return False
+        if self.surrogate is not None:
+            return self.surrogate.T_range[0] <= p[1] <= self.surrogate.T_range[1]
+        return True
+
+    def fit(self, rates, uncertainties=None, T=None, epithermal=False, max_iter=100, tol=1e-10):
+        """Fit phi0 and T (and beta with `epithermal`) to the measured
+        `rates` of the foils (s^-1 per atom) with standard deviations
+        `uncertainties`, starting from the temperature `T` (K, default
+        `Kinematics.T_0`).  Without uncertainties, all foils have equal
+        weight and the covariance is scaled by the reduced chi-square.
+        Returns a `FitResult`, or None with fewer foils than parameters."""
+        y = np.asarray(rates, dtype=float)
+        n_par = 3 if epithermal else 2
+        if len(y) != len(self.targets):
+            logger.error("Expected {0} rates, got {1}.".format(len(self.targets), len(y)))
+            return
+        if len(y) < n_par:
+            logger.error("Fitting {0} parameters needs at least as many foils, got {1}.".format(n_par, len(y)))
+            return
+        u = np.ones_like(y) if uncertainties is None else np.asarray(uncertainties, dtype=float)
+        T = float(Kinematics.T_0 if T is None else T)
+
+        # Rates are linear in phi0 and phi0*beta: solve for them at the
+        # starting temperature
+        g = FoilFit.gw(self, T)[0]
+        D = BARN * self.sigma0[:,np.newaxis] * np.column_stack([g, self.h][:n_par-1])
+        a = np.linalg.lstsq(D/u[:,np.newaxis], y/u, rcond=None)[0]
+        p = np.array([a[0], T] + ([a[1]/a[0]] if epithermal else []))
+
+        m, J = FoilFit.model(self, p)
+        r = (m - y)/u
+        chi2 = r @ r
+        lam = 1e-3
+        converged = False
+        for iteration in range(1, max_iter + 1):
+            Jw = J/u[:,np.newaxis]
+            A = Jw.T @ Jw
+            grad = Jw.T @ r
+            scale = np.sqrt(np.diag(A))
+            scale[scale == 0] = 1
+            As = A/np.outer(scale, scale)
+            accepted = False
+            while lam <= 1e12:
+                step = -np.linalg.solve(As + lam*np.eye(n_par), grad/scale)/scale
+                trial = p + step
+                if FoilFit._valid(self, trial):
+                    m_t, J_t = FoilFit.model(self, trial)
+                    r_t = (m_t - y)/u
+                    chi2_t = r_t @ r_t
+                    if chi2_t <= chi2:
+                        accepted = True
+                        break
+                lam *= 10
+            if not accepted:
+                # No step decreases chi-square: at the minimum to precision
+                converged = True
+                break
+            small = np.all(np.abs(step) <= tol*(np.abs(p) + tol))
+            p, m, J, r = trial, m_t, J_t, r_t
+            chi2_old, chi2 = chi2, chi2_t
+            lam = max(lam/10, 1e-12)
+            if small or chi2_old - chi2 <= tol*chi2:
+                converged = True
+                break
+        if not converged:
+            logger.warning("Foil fit did not converge in {0} iterations.".format(max_iter))
+
+        Jw = J/u[:,np.newaxis]
+        A = Jw.T @ Jw
+        scale = np.sqrt(np.diag(A))
+        scale[scale == 0] = 1
+        cov = np.linalg.pinv(A/np.outer(scale, scale))/np.outer(scale, scale)
+        dof = len(y) - n_par
+        if uncertainties is None and dof > 0:
+            cov *= chi2/dof
+        names = ['phi0', 'T'] + (['beta'] if epithermal else [])
+        return FitResult(names, p, cov, chi2, dof, self.targets, m, r, iteration, converged)
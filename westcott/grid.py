@@ -0,0 +1,205 @@
+import numpy as np
+
+from .westcott_gfactors import *
+
+# Kronrod 15-point nodes/weights with the embedded 7-point Gauss rule (QUADPACK qk15)
+_XGK = np.array([0.991455371120812639206854697526329, 0.949107912342758524526189684047851,
+                 0.864864423359769072789712788640926, 0.741531185599394439863864773280788,
+                 0.586087235467691130294144845693013, 0.405845151377397166906606412076961,
+                 0.207784955007898467600689403773245, 0.000000000000000000000000000000000])
+_WGK = np.array([0.022935322010529224963732008058970, 0.063092092629978553290700663189204,
+                 0.104790010322250183839876322541518, 0.140653259715525918745189590510238,
+                 0.169004726639267902826583426598550, 0.190350578064785409913256402421014,
+                 0.204432940075298892414161999234649, 0.209482141084727828012999174891714])
+_WG = np.array([0.129484966168869693270611432679082, 0.279705391489276667901467263366810,
+                0.381830050505118944950369775488975, 0.417959183673469387755102040816327])
+
+X15 = np.concatenate([-_XGK[:7], [0.], _XGK[6::-1]])
+W15 = np.concatenate([_WGK[:7], [_WGK[7]], _WGK[6::-1]])
+W7 = np.zeros(15)
+W7[[1, 13]] = _WG[0]
+W7[[3, 11]] = _WG[1]
+W7[[5, 9]] = _WG[2]
+W7[7] = _WG[3]
+
+class IntegrationGrid(object):
+    __doc__="""Class to handle construction of velocity grids and adaptive
+    quadrature for the Westcott g-factor integrals.  Grids are built from the
+    union of the ENDF energy points, resonance positions/widths and the
+    support of the neutron flux, so that every sub-interval carries a smooth
+    integrand."""
+
+    def __init__(self, v_min=1., v_max=1e5):
+        self.v_min = v_min
+        self.v_max = v_max
+
+    def breakpoints(self, E_endf=None, resonances=None, E_flux=None, n_base=64):
+        """Sorted unique velocities (m/s) in [v_min, v_max] made of a
+        logarithmic base grid of `n_base` intervals plus:
+            -the ENDF energy points `E_endf` (eV);
+            -`E_r` and `E_r +/- Gamma/2, Gamma, 5*Gamma` for resonances given
+             as an `(E_r, Gamma)` pair of arrays;
+            -the energy points `E_flux` (eV) of a flux spectrum."""
+        E = [np.asarray(E_endf, dtype=float).ravel()] if E_endf is not None else []
+        if resonances is not None:
+            E_r, Gamma = (np.asarray(x, dtype=float).ravel() for x in resonances)
+            offsets = np.array([0., -0.5, 0.5, -1., 1., -5., 5.])
+            E.append((E_r[:,np.newaxis] + offsets*Gamma[:,np.newaxis]).ravel())
+        if E_flux is not None:
+            E.append(np.asarray(E_flux, dtype=float).ravel())
+        v = [np.logspace(np.log10(self.v_min), np.log10(self.v_max), n_base+1)]
+        for e in E:
+            e = e[e > 0]
+            v.append(np.sqrt(2*e*Kinematics.eV/Kinematics.m_n))
+        v = np.unique(np.concatenate(v))
+        return v[(v >= self.v_min) & (v <= self.v_max)]
+
+    def union_grid(self, E_endf=None, resonances=None, E_flux=None, points_per_interval=4, n_base=2000):
+        """Trapezoidal integration grid (usable as `vn` in the `gFactors`
+        methods): the breakpoints subdivided into `points_per_interval`
+        logarithmic steps each."""
+        b = IntegrationGrid.breakpoints(self, E_endf, resonances, E_flux, n_base)
+        if points_per_interval <= 1:
+            return b
+        t = np.arange(points_per_interval) / points_per_interval
+        lb = np.log(b)
+        v = np.exp(lb[:-1,np.newaxis] + np.diff(lb)[:,np.newaxis]*t).ravel()
+        return np.append(v, b[-1])
+
+    @staticmethod
+    def gauss_kronrod(f, edges, rtol=1e-8, atol=0., max_iter=50):
+        """Adaptive Gauss-Kronrod (G7/K15) quadrature of a (possibly
+        vector-valued) integrand over the consecutive intervals of `edges`.
+
+        `f` maps an array of abscissae of shape (m, 15) to values of shape
+        (m, 15) or (k, m, 15).  Intervals whose |K15 - G7| error exceeds
+        their length-proportional share of `max(atol, rtol*|I|)` are bisected
+        and re-evaluated, all at once, until every interval is accepted.
+        Returns (integral, error estimate, number of function evaluations)."""
+        edges = np.asarray(edges, dtype=float)
+        a, b = edges[:-1], edges[1:]
+        L = edges[-1] - edges[0]
+        total = None
+        err_total = None
+        n_eval = 0
+        for it in range(max_iter):
+            mid = 0.5*(a + b)
+            half = 0.5*(b - a)
+            y = np.asarray(f(mid[:,np.newaxis] + half[:,np.newaxis]*X15))
+            n_eval += y.shape[-2]*y.shape[-1]
+            K = half * (y @ W15)
+            err = np.abs(K - half * (y @ W7))
+            if total is None:
+                total = np.zeros(K.shape[:-1])
+                err_total = np.zeros(K.shape[:-1])
+            tol = np.maximum(atol, rtol*np.abs(total + K.sum(axis=-1)))
+            share = (b - a)/L
+            if K.ndim > 1:
+                bad = np.any(err > tol[:,np.newaxis]*share, axis=0)
+            else:
+                bad = err > tol*share
+            if it == max_iter - 1:
+                bad[:] = False
+            good = ~bad
+            total = total + K[...,good].sum(axis=-1)
+            err_total = err_total + err[...,good].sum(axis=-1)
+            if not bad.any():
+                break
+            a, b = a[bad], b[bad]
+            mid = 0.5*(a + b)
+            a, b = np.concatenate([a, mid]), np.concatenate([mid, b])
+        return total, err_total, n_eval
+
+    def gw_Maxwellian_adaptive(self, T, E, sigma, rtol=1e-6, resonances=None, full_output=False):
+        """Westcott g-factor for a Maxwellian at temperature T (K) by adaptive
+        Gauss-Kronrod quadrature on a breakpoint grid, with the integration
+        range cut where the Maxwellian falls below 1e-20 of its peak.  Returns
+        (gW, error estimate), plus a dict with the number of evaluations and
+        intervals if `full_output` is set."""
+        E = np.asarray(E, dtype=float)
+        v_sigma = np.sqrt(2*E*Kinematics.eV/Kinematics.m_n)
+        sigma0 = np.interp(Kinematics.v_0, v_sigma, sigma)  #thermal cross section, barns
+        vt = np.sqrt(2*Kinematics.kB*T/Kinematics.m_n)
+        grid = IntegrationGrid(self.v_min, min(self.v_max, 7.5*vt))
+        edges = grid.breakpoints(E, resonances)
+
+        def integrand(v):
+            phi = 2 * np.exp(-(v/vt)**2) * v**3/vt**4
+            s = np.interp(v.ravel(), v_sigma, sigma).reshape(v.shape)
+            return np.stack([phi * v * s, phi])
+
+        (num, den), (err_num, err_den), n_eval = IntegrationGrid.gauss_kronrod(integrand, edges, rtol=rtol)
+        gW = num / den / (sigma0 * Kinematics.v_0)
+        err = (err_num/abs(num) + err_den/abs(den)) * abs(gW)
+        if full_output:
+            return gW, err, {'evaluations': n_eval, 'intervals': len(edges) - 1}
+        return gW, err
+
+    def gw_arbitrary_adaptive(self, E_spectrum, dndE_spectrum, E_endf, sigma_endf, rtol=1e-6,
+                              resonances=None, full_output=False):
+        """Westcott g-factor for an arbitrary flux spectrum dN/dE by adaptive
+        Gauss-Kronrod quadrature over the flux support, with breakpoints at
+        the spectrum and ENDF energy points.  Returns (gW, error estimate),
+        plus an info dict if `full_output` is set."""
+        E_spectrum = np.asarray(E_spectrum, dtype=float)
+        E_endf = np.asarray(E_endf, dtype=float)
+        v_sigma = np.sqrt(2*E_endf*Kinematics.eV/Kinematics.m_n)
+        sigma0 = np.interp(Kinematics.v_0, v_sigma, sigma_endf)  #thermal cross section, barns
+        v_flux = np.sqrt(2*E_spectrum[E_spectrum > 0]*Kinematics.eV/Kinematics.m_n)
+        grid = IntegrationGrid(max(self.v_min, v_flux.min()), min(self.v_max, v_flux.max()))
+        edges = grid.breakpoints(E_endf, resonances, E_spectrum)
+
+        def integrand(v):
+            E_n = 0.5*Kinematics.m_n * v.ravel()**2/Kinematics.eV
+            dndE = np.interp(E_n, E_spectrum, dndE_spectrum, left=0, right=0)
+            dndv = (np.sqrt(2 * Kinematics.m_n * E_n) * dndE).reshape(v.shape)
+            s = np.interp(v.ravel(), v_sigma, sigma_endf).reshape(v.shape)
+            return np.stack([dndv * v * s, dndv])
+
+        (num, den), (err_num, err_den), n_eval = IntegrationGrid.gauss_kronrod(integrand, edges, rtol=rtol)
+        gW = num / den / (sigma0 * Kinematics.v_0)
+        err = (err_num/abs(num) + err_den/abs(den)) * abs(gW)
+        if full_output:
+            return gW, err, {'evaluations': n_eval, 'intervals': len(edges) - 1}
+        return gW, err
+
+class LogGrid(object):
+    __doc__="""Class to describe a logarithmic velocity grid of `n` points
+    from `v_min` to `v_max` (m/s) without holding it in memory: blocks of
+    the grid are generated on demand, identical to the corresponding slices
+    of `np.logspace(log10(v_min), log10(v_max), n)`.  Usable as the grid of
+    the chunked integration `compute.gw_arbitrary_chunked`, e.g. with
+    10^7-10^8 points to resolve narrow resonances."""
+
+    def __init__(self, v_min=1., v_max=1e5, n=100000):
+        self.v_min = float(v_min)
+        self.v_max = float(v_max)
+        self.n = int(n)
+        self.start = np.log10(self.v_min)
+        self.stop = np.log10(self.v_max)
+        self.step = (self.stop - self.start)/(self.n - 1)
+
+    def __len__(self):
+        return self.n
+
+    def key(self):
+        """Parameters identifying the grid (e.g. for the `ResultStore`)."""
+        return {'v_min': self.v_min, 'v_max': self.v_max, 'n': self.n}
+
+    def block(self, i0, i1, out=None):
+        """Grid points `i0` to `i1` (exclusive), written to `out` if given."""
+        # Same arithmetic as np.linspace followed by np.power in np.logspace
+        if out is None:
+            y = np.arange(i0, i1, dtype=float)
+        else:
+            y = out[:i1-i0]
+            y[:] = np.arange(i0, i1)
+        y *= self.step
+        y += self.start
+        if i1 == self.n and i1 > i0:
+            y[-1] = self.stop
+        return np.power(10., y, out=y)
+
+    def array(self):
+        """The whole grid as an array."""
+        return LogGrid.block(self, 0, self.n)
@@ -0,0 +1,129 @@
+import numpy as np
+import os
+import json
+
+from .log_handlers import *
+from .cache import CaptureCache
+from .westcott_gfactors import *
+
+class CrossSectionMatrix(object):
+    __doc__="""Class to handle the whole capture library on one common
+    velocity grid: a dense (targets x grid points) matrix whose rows hold
+    `v*sigma(v)/(sigma0*v_0)` for each target, built once from `sigma_ENDF`
+    and persisted as `.npy` files.  Westcott g-factors of all targets for a
+    spectrum are then one matrix-vector product with the normalized
+    quadrature weights of the spectrum, and for several spectra one
+    matrix-matrix product."""
+
+    def __init__(self, targets, sigma0, vn, R, path=None):
+        self.targets = list(targets)
+        self.index = {t: i for i, t in enumerate(self.targets)}
+        self.sigma0 = np.asarray(sigma0)
+        self.vn = np.asarray(vn)
+        self.R = R
+        self.path = path
+
+    @staticmethod
+    def default_path():
+        """Default location next to the binary capture cache."""
+        return os.path.join(os.path.dirname(CaptureCache.default_dir()), 'library')
+
+    @classmethod
+    def build(cls, targets=None, vn=DEFAULT_GRID, dtype=np.float32, v_range=None):
+        """Interpolate every target (default: all of `data_capture`) onto the
+        grid `vn`, optionally thinned to the velocity window `v_range`, and
+        stack the reduced cross sections into a matrix of `dtype`."""
+        from .westcott import Westcott
+        gw = Westcott()
+        if targets is None:
+            targets = gw.find_targets()
+        vn = np.asarray(vn, dtype=float)
+        if v_range is not None:
+            vn = vn[(vn >= v_range[0]) & (vn <= v_range[1])]
+        R = np.empty((len(targets), len(vn)), dtype=dtype)
+        sigma0 = np.empty(len(targets))
+        for i, target in enumerate(targets):
+            E, sigma = gw.sigma_ENDF(target)
+            sigma0[i] = interp_sigma(E, sigma, vn)[0]
+            R[i] = reduced_sigma(E, sigma, vn)
+        return cls(targets, sigma0, vn, R)
+
+    def save(self, path=None):
+        """Write the matrix, grid and metadata to the directory `path`."""
+        if path is None:
+            path = CrossSectionMatrix.default_path()
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'R.npy'), self.R)
+        np.save(os.path.join(path, 'vn.npy'), self.vn)
+        cache = CaptureCache()
+        meta = {'targets': self.targets, 'sigma0': self.sigma0.tolist(),
+                'sha256': [(cache.read_meta(t) or {}).get('sha256') for t in self.targets]}
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        self.path = path
+        return path
+
+    @classmethod
+    def load(cls, path=None, mmap=True):
+        """Load a saved matrix; with `mmap` the matrix is memory-mapped
+        read-only.  Returns None if nothing is saved at `path`."""
+        if path is None:
+            path = CrossSectionMatrix.default_path()
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+            R = np.load(os.path.join(path, 'R.npy'), mmap_mode='r' if mmap else None)
+            vn = np.load(os.path.join(path, 'vn.npy'))
+        except (OSError, ValueError):
+            return None
+        matrix = cls(meta['targets'], meta['sigma0'], vn, R, path)
+        matrix.sha256 = meta.get('sha256')
+        return matrix
+
+    def is_fresh(self):
+        """True if every row was built from the capture data currently in
+        the binary capture cache."""
+        cache = CaptureCache()
+        hashes = getattr(self, 'sha256', None) or [None]*len(self.targets)
+        for target, h in zip(self.targets, hashes):
+            if h is None or not cache.is_fresh(target) or (cache.read_meta(target) or {}).get('sha256') != h:
+                return False
+        return True
+
+    @classmethod
+    def default(cls, vn=DEFAULT_GRID):
+        """Saved library matrix for the grid `vn`, rebuilt and saved if it is
+        missing, for a different grid, or out of date."""
+        matrix = cls.load()
+        if matrix is not None and len(matrix.vn) == len(vn) and np.array_equal(matrix.vn, vn) \
+           and matrix.is_fresh():
+            return matrix
+        matrix = cls.build(vn=vn)
+        matrix.save()
+        return cls.load()
+
+    def gw(self, weights):
+        """Westcott g-factors of all targets for normalized quadrature weights
+        on `vn` of shape (len(vn),) or (n_spectra, len(vn)); returns shape
+        (targets,) or (targets, n_spectra)."""
+        weights = np.asarray(weights, dtype=self.R.dtype)
+        return self.R @ weights.T
+
+    def gw_Maxwellian(self, temperatures):
+        """Targets x temperatures DataFrame of Maxwellian g-factors."""
+        import pandas as pd
+        T = list(np.atleast_1d(temperatures))
+        kernel = MaxwellianKernel.get(T, self.vn, self.R.dtype)
+        return pd.DataFrame(CrossSectionMatrix.gw(self, kernel.weights),
+                            index=pd.Index(self.targets, name='target'), columns=T)
+
+    def gw_spectra(self, spectra):
+        """Targets x spectra array of g-factors for a sequence of
+        (E, dN/dE) spectra."""
+        W = np.vstack([flux_weights(E, dndE, self.vn) for (E, dndE) in spectra])
+        return CrossSectionMatrix.gw(self, W)
+
+    def sigma(self, target):
+        """Cross section (b) of a target on the common grid."""
+        i = self.index[target]
+        return np.asarray(self.R[i], dtype=float) * self.sigma0[i] * Kinematics.v_0 / self.vn
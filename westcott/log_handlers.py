@@ -23,13 +23,9 @@ class LogLevelContext:
     specific action or running a block of code.  The level is reverted to its 
     original state after completion of the action."""
 
-    logger = logging.getLogger(__name__)
-    logger.setLevel(logging.DEBUG)
-    
-    #def __init__(self, logger, level):
-    def __init__(self, level):
-        self.logger = logger
-        self.new_level = level
+    def __init__(self, level, logger=None):
+        self.logger = logging.getLogger('westcott.log_handlers') if logger is None else logger
+        self.new_level = logging.getLevelName(level.upper()) if isinstance(level, str) else level
         self.original_level = None
 
     def __enter__(self):
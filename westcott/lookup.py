@@ -0,0 +1,142 @@
+import numpy as np
+import os
+import csv
+import re
+import argparse
+
+from .log_handlers import *
+
+TABLE = 'gfactors.csv'
+STANDARD_TEMPERATURES = tuple(range(20, 620, 20)) + (293,)
+
+class ThermalTable(object):
+    __doc__="""Class to handle the precomputed table of thermal (2200 m/s)
+    cross sections and Westcott g-factors shipped with the package: every
+    ENDF target at the standard Maxwellian temperatures and for each bundled
+    flux spectrum.  The table is read once, on first use; lookups are
+    dictionary and array indexing only."""
+
+    _instance = None
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            rows = [row for row in reader]
+        self.targets = {row[0]: i for i, row in enumerate(rows)}
+        values = np.array([[float(x) for x in row[1:]] for row in rows])
+        self.sigma0_values = values[:,0]
+        columns = header[2:]
+        T_cols = [i for i, c in enumerate(columns) if re.match(r'^gW_[\d.]+K$', c)]
+        T = np.array([float(columns[i][3:-1]) for i in T_cols])
+        order = np.argsort(T)
+        self.temperatures = T[order]
+        self.gw_T = values[:,1:][:,np.array(T_cols, dtype=int)[order]]
+        self.spectra = {c[3:]: i for i, c in enumerate(columns) if i not in T_cols}
+        self.gw_spectra = values[:,1:]
+
+    @classmethod
+    def get(cls):
+        """Shared table, loaded from the package on first access."""
+        if cls._instance is None:
+            from . import get_data
+            cls._instance = ThermalTable(get_data(TABLE))
+        return cls._instance
+
+    def row(self, target):
+        try:
+            return self.targets[target]
+        except KeyError:
+            raise KeyError("No tabulated data for target nucleus: {0}".format(target)) from None
+
+    def sigma0(self, target):
+        """Thermal (2200 m/s) capture cross section (b)."""
+        return self.sigma0_values[ThermalTable.row(self, target)]
+
+    def gw(self, target, T=None, spectrum=None, interpolate=False):
+        """Westcott g-factor of a target for a Maxwellian at temperature `T`
+        (K, default `Kinematics.T_0`) or for a bundled spectrum given by its
+        `find_flux` index or file name.
+
+        `T` may be an array, giving an array of g-factors.  Off-grid
+        temperatures are linearly interpolated between tabulated
+        temperatures if `interpolate` is set; otherwise, and outside the
+        tabulated range, the full `gw_Maxwellian` calculation is run once
+        for all of them."""
+        i = ThermalTable.row(self, target)
+        if spectrum is not None:
+            if not isinstance(spectrum, str):
+                from .catalog import Catalog
+                spectrum = Catalog.get().spectra[spectrum]['name']
+            return self.gw_spectra[i, self.spectra[spectrum.split('.csv')[0]]]
+        if T is None:
+            from .westcott_gfactors import Kinematics
+            T = Kinematics.T_0
+        T = np.asarray(T, dtype=float)
+        t = T.ravel()
+        j = np.minimum(np.searchsorted(self.temperatures, t), len(self.temperatures) - 1)
+        done = self.temperatures[j] == t
+        gW = np.where(done, self.gw_T[i, j], np.nan)
+        if interpolate:
+            inside = ~done & (self.temperatures[0] < t) & (t < self.temperatures[-1])
+            gW[inside] = np.interp(t[inside], self.temperatures, self.gw_T[i])
+            done |= inside
+        if not done.all():
+            from .westcott import Westcott
+            gw = Westcott()
+            gW[~done] = gw.gw_Maxwellian(t[~done], *gw.sigma_ENDF(target))
+        return gW[0] if T.ndim == 0 else gW.reshape(T.shape)
+
+def regenerate(output=None, targets=None, workers=None):
+    """Rebuild the table from `data_capture` with `gfactor_table` at the
+    standard temperatures and all bundled spectra, sorted by target, and
+    write it to `output` (default: the shipped table)."""
+    from . import get_data
+    from .driver import gfactor_table
+    if output is None:
+        output = get_data(TABLE)
+    tmp = output + '.partial'
+    gfactor_table(tmp, targets=targets, temperatures=STANDARD_TEMPERATURES,
+                  workers=workers, resume=True)
+    with open(tmp, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = sorted(reader, key=lambda row: row[0])
+    with open(output, 'w', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(header)
+        writer.writerows(rows)
+    os.remove(tmp)
+    ThermalTable._instance = None
+    return len(rows)
+
+def main(argv=None):
+    """Command-line interface to query or regenerate the precomputed table."""
+    parser = argparse.ArgumentParser(prog='westcott-thermal',
+                                     description="Query or rebuild the precomputed g-factor table.")
+    sub = parser.add_subparsers(dest='action', required=True)
+    q = sub.add_parser('query', help="Print sigma0 and g-factor for a target.")
+    q.add_argument('target')
+    q.add_argument('-T', '--temperature', type=float, default=None)
+    q.add_argument('-s', '--spectrum', default=None, help="Spectrum index or file name.")
+    q.add_argument('--interpolate', action='store_true')
+    r = sub.add_parser('regenerate', help="Rebuild the table from data_capture.")
+    r.add_argument('--output', default=None)
+    r.add_argument('-j', '--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.action == 'query':
+        table = ThermalTable.get()
+        spectrum = args.spectrum
+        if spectrum is not None and spectrum.isdigit():
+            spectrum = int(spectrum)
+        gW = table.gw(args.target, args.temperature, spectrum, args.interpolate)
+        print(f"{args.target}: sigma0 = {table.sigma0(args.target)} b, gW = {gW}")
+    else:
+        n = regenerate(args.output, workers=args.workers)
+        print(f"Tabulated {n} targets.")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,175 @@
+import numpy as np
+import os
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+
+from .log_handlers import *
+
+def nbytes(value):
+    """Approximate memory footprint of a cached value: NumPy arrays and
+    (nested) tuples/lists of them count their buffer sizes."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(nbytes(v) for v in value)
+    return getattr(value, 'nbytes', 64)
+
+def freeze(value):
+    """Mark arrays in a cached value read-only so that callers cannot mutate
+    a shared entry."""
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, (tuple, list)):
+        for v in value:
+            freeze(v)
+    return value
+
+_GRID_KEYS = {}
+
+def grid_key(vn):
+    """Content fingerprint of a velocity grid.  Read-only arrays (e.g. the
+    grids of `compute` or arrays held by the `ArrayCache`) cannot change, so
+    their digest is memoized per array object (and dropped when the array is
+    garbage collected); writable arrays may be edited in place and are
+    hashed on every call."""
+    readonly = isinstance(vn, np.ndarray) and not vn.flags.writeable
+    if readonly:
+        entry = _GRID_KEYS.get(id(vn))
+        if entry is not None and entry[0]() is vn:
+            return entry[1]
+    arr = np.ascontiguousarray(vn, dtype=float)
+    key = ('grid', len(arr), hashlib.blake2b(arr.tobytes(), digest_size=16).hexdigest())
+    if readonly:
+        try:
+            ref = weakref.ref(vn, lambda r, i=id(vn): _GRID_KEYS.pop(i, None))
+            _GRID_KEYS[id(vn)] = (ref, key)
+        except TypeError:
+            pass
+    return key
+
+_SOURCES = {}
+
+def tag_source(key, value):
+    """Record `key` as the source of the arrays of `value` (made read-only)
+    for `source_of`.  The record lives as long as the array, whatever
+    happens to cache entries; an array keeps the first source it is tagged
+    with (e.g. the energies shared by a broadened table)."""
+    freeze(value)
+    for v in (value if isinstance(value, (tuple, list)) else (value,)):
+        if not isinstance(v, np.ndarray):
+            continue
+        entry = _SOURCES.get(id(v))
+        if entry is not None and entry[0]() is v:
+            continue
+        def drop(ref, i=id(v)):
+            if _SOURCES.get(i, (None,))[0] is ref:
+                del _SOURCES[i]
+        _SOURCES[id(v)] = (weakref.ref(v, drop), key)
+    return value
+
+def source_of(*arrays):
+    """Source key shared by all of `arrays`, or None if any of them was not
+    tagged by `tag_source`."""
+    keys = set()
+    for a in arrays:
+        entry = _SOURCES.get(id(a))
+        if entry is None or entry[0]() is not a:
+            return None
+        keys.add(entry[1])
+    return keys.pop() if len(keys) == 1 else None
+
+class ArrayCache(object):
+    __doc__="""Class to handle an in-memory LRU cache of loaded cross
+    sections, spectra and interpolated arrays under a byte budget.
+
+    Values are stored read-only.  Arrays of a source entry (e.g. the output
+    of `sigma_ENDF`) are tagged with its key (see `tag_source`), so that
+    derived quantities such as interpolants can be keyed on (source, grid)
+    without hashing the arrays; the tag outlives the entry."""
+
+    _default = None
+
+    def __init__(self, max_bytes=256*2**20):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+
+    @classmethod
+    def default(cls):
+        """Shared cache used by the data and g-factor classes; the budget is
+        read from `$WESTCOTT_CACHE_BYTES` (default 256 MiB, 0 disables)."""
+        if cls._default is None:
+            cls._default = ArrayCache(int(os.environ.get('WESTCOTT_CACHE_BYTES', 256*2**20)))
+        return cls._default
+
+    def get(self, key):
+        """Return the cached value for `key`, or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, source=False):
+        """Store `value` under `key`, evicting least recently used entries to
+        stay within the budget.  With `source` set, the arrays of the value
+        are tagged so that `source_of` can identify them, even once the entry
+        is evicted or the value is too large to store.  Returns the
+        (read-only) value."""
+        size = nbytes(value)
+        if source:
+            tag_source(key, value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return value
+            freeze(value)
+            while self.bytes + size > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            self._entries[key] = value
+            self._sizes[key] = size
+            self.bytes += size
+        return value
+
+    def get_or_compute(self, key, compute, source=False):
+        """Cached value for `key`, computing and storing it on a miss."""
+        value = ArrayCache.get(self, key)
+        if value is None:
+            value = ArrayCache.put(self, key, compute(), source)
+        return value
+
+    def source_of(self, *arrays):
+        """Key of the source entry that all of `arrays` were stored with, or
+        None (see `tag_source`)."""
+        return source_of(*arrays)
+
+    def _remove(self, key):
+        value = self._entries.pop(key)
+        self.bytes -= self._sizes.pop(key)
+
+    def clear(self):
+        """Drop all entries and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Dictionary of hit/miss/eviction counts and memory use."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'entries': len(self._entries),
+                    'bytes': self.bytes, 'max_bytes': self.max_bytes}
@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import atexit
+import marshal
+import threading
+import contextlib
+
+from .log_handlers import *
+
+# The profiler currently recording, if any.  Instrumented code calls `stage`
+# and `count`, which return immediately while this is None.
+_ACTIVE = None
+_NULL = contextlib.nullcontext()
+
+class _Stage(object):
+    __slots__ = ('profiler', 'name', 'start', 'child')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._stack().append(self)
+        self.child = 0.
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        elapsed = time.perf_counter() - self.start
+        stack = self.profiler._stack()
+        stack.pop()
+        parent = stack[-1] if stack else None
+        if parent is not None:
+            parent.child += elapsed
+        recursive = any(s.name == self.name for s in stack)
+        self.profiler._record(self.name, None if parent is None else parent.name,
+                              elapsed, elapsed - self.child, recursive)
+
+class Profiler(object):
+    __doc__="""Class to collect wall-clock timers per named stage (e.g.
+    `csv_load`, `interpolation`, `kernel_build`, `integration`) and event
+    counters (e.g. `rows_read`, `grid_size`) from instrumented code while
+    active (see `profile`).
+
+    Stage times are inclusive (`total`) and exclusive of nested stages
+    (`self`).  The profiler follows the `cProfile.Profile` interface for
+    `pstats`: `pstats.Stats(profiler)` and `dump_stats` give one entry per
+    stage with its callers, viewable with the usual tools."""
+
+    def __init__(self):
+        self.stages = {}
+        self.callers = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, name, parent, total, own, recursive):
+        with self._lock:
+            entry = self.stages.setdefault(name, [0, 0, 0., 0.])
+            entry[1] += 1
+            entry[3] += own
+            if not recursive:
+                entry[0] += 1
+                entry[2] += total
+            entry = self.callers.setdefault((parent, name), [0, 0, 0., 0.])
+            entry[1] += 1
+            entry[3] += own
+            if not recursive:
+                entry[0] += 1
+                entry[2] += total
+
+    def stage(self, name):
+        """Context manager timing one pass through the stage `name`."""
+        return _Stage(self, name)
+
+    def count(self, name, n=1):
+        """Add `n` to the counter `name`."""
+        with self._lock:
+            entry = self.counters.setdefault(name, [0, 0, n])
+            entry[0] += n
+            entry[1] += 1
+            entry[2] = max(entry[2], n)
+
+    def summary(self):
+        """Timers and counters as a dictionary: per stage the number of
+        calls and the total and self time (s); per counter the sum, the
+        number of events and the largest single increment."""
+        with self._lock:
+            stages = {name: {'calls': nc, 'total': total, 'self': own}
+                      for name, (cc, nc, total, own) in self.stages.items()}
+            counters = {name: {'total': total, 'events': events, 'max': largest}
+                        for name, (total, events, largest) in self.counters.items()}
+        return {'stages': stages, 'counters': counters}
+
+    def to_json(self, filename=None, indent=2):
+        """Summary as a JSON string, also written to `filename` if given."""
+        text = json.dumps(Profiler.summary(self), indent=indent)
+        if filename is not None:
+            with open(filename, 'w') as f:
+                f.write(text)
+        return text
+
+    def report(self):
+        """Summary formatted as a plain-text table."""
+        summary = Profiler.summary(self)
+        lines = ["{0:<24}{1:>10}{2:>14}{3:>14}".format('stage', 'calls', 'total (s)', 'self (s)')]
+        for name, s in sorted(summary['stages'].items(), key=lambda item: -item[1]['total']):
+            lines.append("{0:<24}{1:>10}{2:>14.6f}{3:>14.6f}".format(name, s['calls'], s['total'], s['self']))
+        lines.append("{0:<24}{1:>10}{2:>14}{3:>14}".format('counter', 'events', 'total', 'max'))
+        for name, c in sorted(summary['counters'].items()):
+            lines.append("{0:<24}{1:>10}{2:>14}{3:>14}".format(name, c['events'], c['total'], c['max']))
+        return "\n".join(lines)
+
+    def create_stats(self):
+        """Build `self.stats` in the `pstats` format, keyed by
+        ('westcott', 0, stage)."""
+        def key(name):
+            return ('westcott', 0, name)
+        with self._lock:
+            self.stats = {key(name): (cc, nc, own, total, {})
+                          for name, (cc, nc, total, own) in self.stages.items()}
+            for (parent, name), (cc, nc, total, own) in self.callers.items():
+                if parent is not None:
+                    self.stats[key(name)][4][key(parent)] = (cc, nc, own, total)
+
+    def dump_stats(self, filename):
+        """Write the stage timers to a `pstats`-compatible file."""
+        Profiler.create_stats(self)
+        with open(filename, 'wb') as f:
+            marshal.dump(self.stats, f)
+
+    def write(self, filename):
+        """Write the summary as JSON (`.json`) or `pstats` data (any other
+        extension)."""
+        if filename.endswith('.json'):
+            Profiler.to_json(self, filename)
+        else:
+            Profiler.dump_stats(self, filename)
+
+def stage(name):
+    """Time the enclosed block as stage `name` if a profiler is active."""
+    profiler = _ACTIVE
+    if profiler is None:
+        return _NULL
+    return _Stage(profiler, name)
+
+def count(name, n=1):
+    """Add `n` to the counter `name` if a profiler is active."""
+    profiler = _ACTIVE
+    if profiler is not None:
+        Profiler.count(profiler, name, n)
+
+def enabled():
+    """Whether a profiler is recording."""
+    return _ACTIVE is not None
+
+@contextlib.contextmanager
+def profile(filename=None):
+    """Record the stages and counters of the enclosed block, e.g.
+
+        with westcott.profile() as prof:
+            gw.gw_Maxwellian(293, *gw.sigma_ENDF('Au197'))
+        print(prof.report())
+
+    With `filename`, the result is written on exit (see `Profiler.write`).
+    A profile nested in another one records into the inner profiler only."""
+    global _ACTIVE
+    previous = _ACTIVE
+    profiler = _ACTIVE = Profiler()
+    try:
+        yield profiler
+    finally:
+        _ACTIVE = previous
+        if filename is not None:
+            Profiler.write(profiler, filename)
+
+def _report_at_exit(profiler, target):
+    if target.lower() in ('1', 'true', 'yes', 'on'):
+        logger.info("Westcott profile:\n{0}".format(Profiler.report(profiler)))
+    else:
+        try:
+            Profiler.write(profiler, target)
+        except OSError as e:
+            logger.warning("Unable to write profile to {0}: {1}".format(target, e))
+
+# WESTCOTT_PROFILE=1 profiles the whole process and logs a report at exit;
+# WESTCOTT_PROFILE=<file>.json or <file>.prof writes the summary there.
+if os.environ.get('WESTCOTT_PROFILE', '0').lower() not in ('', '0', 'false', 'no', 'off'):
+    _ACTIVE = Profiler()
+    atexit.register(_report_at_exit, _ACTIVE, os.environ['WESTCOTT_PROFILE'])
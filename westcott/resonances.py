@@ -0,0 +1,159 @@
+import numpy as np
+
+from .log_handlers import *
+from .westcott_gfactors import *
+
+def penetrability(l, rho):
+    """Hard-sphere penetrability P_l(rho), from the recursion
+    P_l = rho^2 P_{l-1} / ((l - S_{l-1})^2 + P_{l-1}^2) with P_0 = rho,
+    S_0 = 0; `l` and `rho` broadcast against each other."""
+    rho, l = np.broadcast_arrays(np.asarray(rho, dtype=float), np.asarray(l))
+    P = rho.copy()
+    S = np.zeros_like(P)
+    for n in range(1, int(l.max(initial=0)) + 1):
+        d = (n - S)**2 + P**2
+        P_n = rho**2 * P / d
+        S_n = rho**2 * (n - S) / d - n
+        P = np.where(l >= n, P_n, P)
+        S = np.where(l >= n, S_n, S)
+    return P
+
+class ResonanceCrossSection(object):
+    __doc__="""Class to handle reconstruction of the capture cross section of
+    a nucleus from its resolved-resonance parameters (`get_res_paras`).
+
+    Breit-Wigner tables are evaluated as a sum of single-level Breit-Wigner
+    terms (for capture, the multi-level interference terms cancel), and
+    Reich-Moore tables through the level matrix reduced to one neutron
+    channel per spin group (J, L), which is exact for capture in the absence
+    of fission.  Neutron widths are energy dependent through the hard-sphere
+    penetrability, referred to |E_r| so that the negative-energy (bound)
+    levels that carry the thermal cross section are handled; shift factors,
+    fission and smooth backgrounds are not included.  The energy grid is
+    evaluated in blocks so that the (energies x levels) intermediate stays
+    within `chunk_size` elements."""
+
+    def __init__(self, E_r, Gamma_n, Gamma_g, J, L, A, formalism='BreitWigner',
+                 Gamma=None, target_spin=None):
+        J = np.abs(np.asarray(J, dtype=float))
+        L = np.asarray(L, dtype=int)
+        # Levels ordered by spin group (J, L) so that groups are contiguous
+        order = np.lexsort((L, J))
+        self.E_r = np.asarray(E_r, dtype=float)[order]
+        self.Gamma_n = np.asarray(Gamma_n, dtype=float)[order]
+        self.Gamma_g = np.asarray(Gamma_g, dtype=float)[order]
+        self.J = J[order]
+        self.L = L[order]
+        self.A = A
+        self.formalism = formalism
+        # Widths other than neutron and capture (e.g. fission) in BW tables
+        if Gamma is None:
+            self.Gamma_other = np.zeros_like(self.E_r)
+        else:
+            self.Gamma_other = np.clip(np.asarray(Gamma, dtype=float)[order] - self.Gamma_n - self.Gamma_g, 0, None)
+        if target_spin is None:
+            target_spin = ResonanceCrossSection.infer_spin(self.J, self.L)
+        self.target_spin = target_spin
+        self.g = (2*self.J + 1) / (2*(2*self.target_spin + 1))
+        self.a = 0.123 * A**(1/3) + 0.08  # channel radius, 10^-12 cm
+        self.P_r = penetrability(self.L, ResonanceCrossSection.k(self, np.abs(self.E_r)) * self.a)
+
+        self._L_max = int(self.L.max(initial=0))
+        new = np.ones(len(self.E_r), dtype=bool)
+        new[1:] = (self.J[1:] != self.J[:-1]) | (self.L[1:] != self.L[:-1])
+        self._starts = np.flatnonzero(new)
+        self._group_g = self.g[self._starts]
+
+    @staticmethod
+    def infer_spin(J, L):
+        """Target spin I from the s-wave resonance spins J = I +/- 1/2; the
+        lower value is assumed when only one spin group is populated."""
+        J = np.asarray(J, dtype=float)
+        Js = np.unique(J[np.asarray(L) == 0]) if np.any(np.asarray(L) == 0) else np.unique(J)
+        if len(Js) >= 2:
+            return float((Js[0] + Js[1]) / 2) if Js[1] - Js[0] == 1 else float(max(Js[0] - 0.5, 0))
+        return float(max(Js[0] - 0.5, 0)) if len(Js) else 0.
+
+    @classmethod
+    def from_target(cls, target, target_spin=None):
+        """Reconstruction for an ENDF target from its resonance table, or
+        None if the target has no resonance parameters."""
+        from .catalog import Catalog
+        from .westcott import Westcott
+        record = Catalog.get().resonances.get(target)
+        if record is None:
+            logger.error("No resonance parameters available for defined target or target does not exist.")
+            return
+        df = Westcott().get_res_paras(target)
+        if record['formalism'] == 'BreitWigner':
+            return cls(df['energy'], df['neutronWidth'], df['captureWidth'], df['J'], df['L'],
+                       record['A'], 'BreitWigner', Gamma=df['totalWidth'], target_spin=target_spin)
+        return cls(df.iloc[:,0], df.iloc[:,2], df.iloc[:,1], df['J'], df['L'],
+                   record['A'], 'ReichMoore', target_spin=target_spin)
+
+    def k(self, E):
+        """Neutron wave number (10^12 cm^-1) in the centre-of-mass system, so
+        that pi/k^2 is in barns."""
+        return 2.196807e-3 * self.A/(self.A + 1) * np.sqrt(E)
+
+    def sigma(self, E, chunk_size=2**16):
+        """Capture cross section (b) at the energies `E` (eV, > 0)."""
+        E = np.asarray(E, dtype=float)
+        flat = E.ravel()
+        out = np.empty(len(flat))
+        n_levels = max(len(self.E_r), 1)
+        rows = max(1, chunk_size // n_levels)
+        for i in range(0, len(flat), rows):
+            out[i:i+rows] = ResonanceCrossSection._sigma_block(self, flat[i:i+rows])
+        return out.reshape(E.shape)
+
+    def _sigma_block(self, E):
+        if len(self.E_r) == 0:
+            return np.zeros_like(E)
+        k = ResonanceCrossSection.k(self, E)
+        # Penetrabilities once per partial wave, then gathered per level
+        P = penetrability(np.arange(self._L_max + 1), k[:,np.newaxis] * self.a)
+        Gn = P[:, self.L]
+        Gn *= self.Gamma_n / self.P_r
+        d = self.E_r - E[:,np.newaxis]
+        if self.formalism == 'BreitWigner':
+            G = Gn + (self.Gamma_g + self.Gamma_other)
+            G *= G
+            G *= 0.25
+            G += d*d
+            Gn *= self.g * self.Gamma_g
+            Gn /= G
+            return np.pi / k**2 * Gn.sum(axis=1)
+        # Reich-Moore: R = a + ib = sum (Gn/2)/(E_r - E - i Gg/2) per spin group
+        h = self.Gamma_g/2
+        D = d*d
+        D += h**2
+        Gn /= D
+        Gn *= 0.5
+        a = np.add.reduceat(Gn * d, self._starts, axis=1)
+        Gn *= h
+        b = np.add.reduceat(Gn, self._starts, axis=1)
+        return np.pi / k**2 * ((4*b / ((1 + b)**2 + a**2)) @ self._group_g)
+
+    def sigma_v(self, vn, chunk_size=2**16):
+        """Capture cross section (b) at the neutron velocities `vn` (m/s)."""
+        vn = np.asarray(vn, dtype=float)
+        return ResonanceCrossSection.sigma(self, 0.5*Kinematics.m_n*vn**2/Kinematics.eV, chunk_size)
+
+    def reduced_sigma(self, vn=DEFAULT_GRID, chunk_size=2**16):
+        """`v*sigma(v)/(sigma0*v_0)` on `vn`, evaluated directly from the
+        resonances rather than interpolated."""
+        vn = np.asarray(vn, dtype=float)
+        sigma0 = ResonanceCrossSection.sigma_v(self, np.array([Kinematics.v_0]))[0]
+        return ResonanceCrossSection.sigma_v(self, vn, chunk_size) * vn / (sigma0 * Kinematics.v_0)
+
+    def gw_Maxwellian(self, T, vn=DEFAULT_GRID, chunk_size=2**16):
+        """Westcott g-factor(s) for Maxwellian temperature(s) `T` (K)."""
+        kernel = MaxwellianKernel.get(T, vn)
+        gW = kernel.average(ResonanceCrossSection.reduced_sigma(self, vn, chunk_size))
+        return gW[0] if np.ndim(T) == 0 else gW
+
+    def gw_arbitrary(self, E_spectrum, dndE_spectrum, vn=DEFAULT_GRID, chunk_size=2**16):
+        """Westcott g-factor for an arbitrary energy spectrum dN/dE."""
+        w = flux_weights(E_spectrum, dndE_spectrum, vn)
+        return w @ ResonanceCrossSection.reduced_sigma(self, vn, chunk_size)
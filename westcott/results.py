@@ -0,0 +1,199 @@
+import numpy as np
+import io
+import os
+import json
+import time
+import hashlib
+import threading
+
+from .log_handlers import *
+from .cache import CaptureCache
+from .memcache import grid_key
+
+def content_key(value):
+    """Fingerprint of a method argument: scalars by value, arrays by content.
+    Read-only arrays (e.g. held by the `ArrayCache` or memory-mapped) cannot
+    change and are fingerprinted once via `grid_key`; writable arrays are
+    hashed on every call."""
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if np.ndim(value) == 0:
+        return float(value)
+    if isinstance(value, np.ndarray) and not value.flags.writeable:
+        return list(grid_key(value))
+    arr = np.ascontiguousarray(value, dtype=float)
+    return ['array', arr.shape, hashlib.blake2b(arr.tobytes(), digest_size=16).hexdigest()]
+
+class ResultStore(object):
+    __doc__="""Class to handle a content-addressed on-disk store of g-factor
+    results in an SQLite database.  Keys are hashes of the method name and
+    the content of its inputs (cross section, spectrum, velocity grid and
+    parameters), so results survive across runs and are recomputed only
+    when an input has changed.
+
+    Each value is kept as a `.npy` blob with its SHA-256 checksum, verified
+    on every read; corrupt entries are dropped.  The total blob size is
+    bounded by `max_bytes`, least recently used entries being evicted
+    first."""
+
+    VERSION = 1
+    _default = {}
+
+    def __init__(self, path=None, max_bytes=64*2**20):
+        if path is None:
+            path = os.path.join(os.path.dirname(CaptureCache.default_dir()), 'results.sqlite')
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = None
+
+    def __getstate__(self):
+        # Sent to worker processes without the connection and lock
+        state = self.__dict__.copy()
+        state['_db'] = None
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls):
+        """Shared store selected by `$WESTCOTT_RESULTS` ('1' for the default
+        location under the cache directory, or a database path), with the
+        budget from `$WESTCOTT_RESULTS_BYTES`; None if unset, '0' or if
+        `$WESTCOTT_CACHE` is '0'."""
+        env = os.environ.get('WESTCOTT_RESULTS', '0')
+        if env in ('', '0') or os.environ.get('WESTCOTT_CACHE', '1') == '0':
+            return None
+        path = None if env == '1' else env
+        store = cls._default.get(path)
+        if store is None:
+            store = cls._default[path] = cls(path, int(os.environ.get('WESTCOTT_RESULTS_BYTES', 64*2**20)))
+        return store
+
+    @staticmethod
+    def key(method, *arrays, grid=None, **params):
+        """Content key of `method` applied to `arrays` on the velocity grid
+        `grid` (fingerprinted with `grid_key`, as for the in-memory caches)
+        with keyword `params`."""
+        spec = {'version': ResultStore.VERSION, 'method': method,
+                'arrays': [content_key(a) for a in arrays],
+                'grid': None if grid is None else list(grid_key(grid)),
+                'params': {k: content_key(v) for k, v in sorted(params.items())}}
+        return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+    def _connect(self):
+        if self._db is None:
+            import sqlite3
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""CREATE TABLE IF NOT EXISTS results (
+                          key TEXT PRIMARY KEY, method TEXT, target TEXT, value BLOB,
+                          sha256 TEXT, size INTEGER, created REAL, accessed REAL)""")
+            db.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+            self._db = db
+        return self._db
+
+    def get(self, key):
+        """Stored value for `key`, or None if missing or corrupt."""
+        with self._lock:
+            try:
+                db = self._connect()
+                row = db.execute("SELECT value, sha256 FROM results WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                blob, sha256 = row
+                if hashlib.sha256(blob).hexdigest() != sha256:
+                    logger.warning("Corrupt result store entry {0}: removed.".format(key))
+                    db.execute("DELETE FROM results WHERE key = ?", (key,))
+                    self.misses += 1
+                    return None
+                db.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+            except Exception as e:
+                logger.warning("Unable to read result store {0}: {1}".format(self.path, e))
+                return None
+            self.hits += 1
+        value = np.load(io.BytesIO(blob), allow_pickle=False)
+        return value[()] if value.ndim == 0 else value
+
+    def put(self, key, value, method=None, target=None):
+        """Store `value` (a number or array) under `key` and evict least
+        recently used entries beyond `max_bytes`.  Failures are logged and
+        ignored.  Returns `value`."""
+        buf = io.BytesIO()
+        np.save(buf, np.asarray(value), allow_pickle=False)
+        blob = buf.getvalue()
+        now = time.time()
+        with self._lock:
+            try:
+                db = self._connect()
+                db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                           (key, method, target, blob, hashlib.sha256(blob).hexdigest(), len(blob), now, now))
+                ResultStore._evict(self, db)
+            except Exception as e:
+                logger.warning("Unable to write result store {0}: {1}".format(self.path, e))
+        return value
+
+    def get_or_compute(self, key, compute, method=None, target=None):
+        """Stored value for `key`, computing and storing it on a miss (None
+        results are not stored)."""
+        value = ResultStore.get(self, key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                ResultStore.put(self, key, value, method, target)
+        return value
+
+    def _evict(self, db):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = db.execute("SELECT key, size FROM results ORDER BY accessed").fetchall()
+        drop = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            drop.append((key,))
+            total -= size
+        db.executemany("DELETE FROM results WHERE key = ?", drop)
+        self.evictions += len(drop)
+
+    def verify(self):
+        """Check the database and every checksum; corrupt entries are
+        removed.  Returns the list of removed keys."""
+        with self._lock:
+            db = self._connect()
+            status = db.execute("PRAGMA integrity_check").fetchone()[0]
+            if status != 'ok':
+                logger.error("Result store {0} failed the integrity check: {1}".format(self.path, status))
+            bad = [(key,) for key, blob, sha256 in db.execute("SELECT key, value, sha256 FROM results")
+                   if hashlib.sha256(blob).hexdigest() != sha256]
+            db.executemany("DELETE FROM results WHERE key = ?", bad)
+        return [key for (key,) in bad]
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._connect().execute("DELETE FROM results")
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self):
+        """Dictionary of hit/miss/eviction counts and stored entries and
+        bytes."""
+        with self._lock:
+            entries, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes}
@@ -0,0 +1,173 @@
+import numpy as np
+
+from .log_handlers import *
+from .westcott_gfactors import *
+from .resonances import ResonanceCrossSection, penetrability
+
+def level_parameters(df, formalism):
+    """Arrays (E_r, Gamma_n, Gamma_g, Gamma_other, J, L) of a resonance
+    table from `get_res_paras`, in table order."""
+    if formalism == 'BreitWigner':
+        E_r, Gn, Gg = (df[c].to_numpy(dtype=float) for c in ('energy', 'neutronWidth', 'captureWidth'))
+        other = np.clip(df['totalWidth'].to_numpy(dtype=float) - Gn - Gg, 0, None)
+    else:
+        E_r, Gg, Gn = (df.iloc[:,i].to_numpy(dtype=float) for i in range(3))
+        other = np.zeros_like(E_r)
+    return E_r, Gn, Gg, other, np.abs(df['J'].to_numpy(dtype=float)), df['L'].to_numpy(dtype=int)
+
+class ScreeningResult(object):
+    __doc__="""Class to hold the screening of the resonances of one target:
+    the upper bound on the contribution of each level to g_W, the levels
+    kept and pruned at the tolerance `tol`, and the bound on the error of
+    pruning (the sum of the pruned bounds)."""
+
+    def __init__(self, target, table, bound, tol, Gamma=None):
+        self.target = target
+        self.table = table
+        self.bound = bound
+        self.tol = tol
+        self.Gamma = Gamma
+        self.order = np.argsort(-bound, kind='stable')
+        # Prune the smallest bounds for as long as their sum stays within tol
+        tail = np.cumsum(bound[self.order[::-1]])
+        n_pruned = int(np.searchsorted(tail, tol, side='right'))
+        self.kept = np.ones(len(bound), dtype=bool)
+        self.kept[self.order[len(bound)-n_pruned:]] = False
+        self.error_bound = float(tail[n_pruned-1]) if n_pruned else 0.
+
+    def ranking(self):
+        """Resonance table sorted by decreasing bound, with the bound, the
+        cumulative bound of all smaller levels and the `kept` flag."""
+        df = self.table.iloc[self.order].copy()
+        df['bound'] = self.bound[self.order]
+        df['tail'] = np.cumsum(self.bound[self.order][::-1])[::-1] - df['bound'].to_numpy()
+        df['kept'] = self.kept[self.order]
+        return df
+
+    def kept_levels(self):
+        """Rows of the resonance table that are kept."""
+        return self.table[self.kept]
+
+    def pruned_levels(self):
+        """Rows of the resonance table that are pruned."""
+        return self.table[~self.kept]
+
+    def gw_irregularity(self, T=None, vn=DEFAULT_GRID):
+        """Irregularity-method g-factors (see `Irregularity.gw_irregularity`)
+        of the kept levels only, in the order of `kept_levels`."""
+        from . import compute
+        E_r = self.table.iloc[:,0].to_numpy(dtype=float)[self.kept]
+        return compute.gw_irregularity(E_r, self.Gamma[self.kept], T, compute.grid(vn))
+
+    def summary(self):
+        """Dictionary of level counts and the pruning error bound."""
+        return {'target': self.target, 'levels': len(self.bound), 'kept': int(self.kept.sum()),
+                'pruned': int((~self.kept).sum()), 'error_bound': self.error_bound,
+                'max_bound': float(self.bound.max(initial=0))}
+
+class ResonanceScreen(object):
+    __doc__="""Class to rank the resolved resonances of a target by an upper
+    bound on their contribution to g_W in a Maxwellian or a spectrum, and
+    to prune those that cannot matter before an irregularity calculation.
+
+    For a single level, v*sigma_r(v) is bounded by a Lorentzian in energy:
+    with pi/k^2 ~ 1/E, v ~ sqrt(E) and the neutron width Gamma_n(E) bounded
+    by kappa*Gamma_n*sqrt(E/|E_r|) (kappa = rho_r/P_l(rho_r), 1 for
+    s-waves), and the total width in the denominator bounded below by the
+    energy-independent widths,
+
+        v*sigma_r <= a_r / ((E - E_r)^2 + (Gamma_g + Gamma_other)^2/4).
+
+    The normalized quadrature weights of the spectrum are summed over
+    `n_bands` bands of the velocity grid once, and the Lorentzian is bounded
+    in each band by its value at the nearest band edge, so the bounds of all
+    levels are one (levels x bands) product.  The bounds are rigorous for
+    the single-level terms on the grid quadrature of `gw_Maxwellian` and
+    `gw_arbitrary`; for Breit-Wigner tables, whose capture terms add, the
+    sum of the pruned bounds bounds the change in g_W.  Reich-Moore
+    interference between levels is not bounded."""
+
+    def __init__(self, vn=DEFAULT_GRID, n_bands=256):
+        from .westcott import Westcott
+        self.gw = Westcott()
+        self.vn = np.asarray(vn, dtype=float)
+        self.starts = np.unique(np.linspace(0, len(self.vn), n_bands + 1).astype(int)[:-1])
+        E = 0.5*Kinematics.m_n * self.vn**2/Kinematics.eV
+        self.E_lo = E[self.starts]
+        self.E_hi = E[np.append(self.starts[1:], len(self.vn)) - 1]
+
+    def band_weights(self, T=None, spectrum=None):
+        """Normalized quadrature weights summed per band, for a Maxwellian
+        at `T` (K, default `Kinematics.T_0`) or a bundled spectrum
+        (`find_flux` index) or (E, dN/dE) pair."""
+        if spectrum is None:
+            w = MaxwellianKernel.get(Kinematics.T_0 if T is None else T, self.vn).weights[0]
+        else:
+            if not isinstance(spectrum, (tuple, list)):
+                spectrum = NeutronFlux.get_flux(self.gw, spectrum)
+            w = flux_weights(*spectrum, self.vn)
+        return np.add.reduceat(w, self.starts)
+
+    @staticmethod
+    def amplitudes(E_r, Gamma_n, Gamma_g, J, L, A, target_spin=None):
+        """Numerators a_r (b m/s eV^2) of the Lorentzian bounds of the
+        levels."""
+        if target_spin is None:
+            target_spin = ResonanceCrossSection.infer_spin(J, L)
+        g = (2*J + 1) / (2*(2*target_spin + 1))
+        k0 = 2.196807e-3 * A/(A + 1)  # k/sqrt(E), 10^12 cm^-1 eV^-1/2
+        E_abs = np.maximum(np.abs(E_r), 1e-300)
+        rho = k0*np.sqrt(E_abs) * (0.123 * A**(1/3) + 0.08)
+        kappa = rho / penetrability(L, rho)
+        # Widths enter by magnitude (a few tables carry signed widths)
+        G = np.abs(Gamma_n*Gamma_g)
+        return np.pi/k0**2 * np.sqrt(2*Kinematics.eV/Kinematics.m_n) * g*G*kappa/np.sqrt(E_abs)
+
+    def bounds(self, E_r, Gamma_n, Gamma_g, Gamma_other, J, L, A, sigma0, W, target_spin=None):
+        """Upper bounds on the contributions to g_W of levels with the given
+        parameters, for band weights `W` (see `band_weights`) and thermal
+        cross section `sigma0` (b)."""
+        a = ResonanceScreen.amplitudes(E_r, Gamma_n, Gamma_g, J, L, A, target_spin)
+        d = np.maximum(self.E_lo - E_r[:,np.newaxis], 0) + np.maximum(E_r[:,np.newaxis] - self.E_hi, 0)
+        G2 = ((np.abs(Gamma_g) + Gamma_other)**2/4)[:,np.newaxis]
+        with np.errstate(divide='ignore'):
+            S = (1/(d**2 + G2)) @ W
+        return np.where(a > 0, a*S, 0.) / (sigma0 * Kinematics.v_0)
+
+    def sigma0(self, target, resonances=None):
+        """Thermal capture cross section (b) of a target: from `sigma_ENDF`
+        or, without capture data, from the resonance reconstruction."""
+        from .catalog import Catalog
+        if target in Catalog.get().capture:
+            return interp_sigma(*self.gw.sigma_ENDF(target), self.vn)[0]
+        if resonances is None:
+            resonances = ResonanceCrossSection.from_target(target)
+        return float(resonances.sigma(Kinematics.E_0))
+
+    def screen(self, target, T=None, spectrum=None, tol=1e-4, W=None):
+        """Bound, rank and prune the resonances of a target (see
+        `ScreeningResult`), pruning levels whose summed bounds stay within
+        `tol` (absolute, in units of g_W).  None if the target has no
+        resonance parameters."""
+        from .catalog import Catalog
+        record = Catalog.get().resonances.get(target)
+        if record is None:
+            logger.error("No resonance parameters available for defined target or target does not exist.")
+            return
+        df = self.gw.get_res_paras(target)
+        E_r, Gn, Gg, other, J, L = level_parameters(df, record['formalism'])
+        if W is None:
+            W = ResonanceScreen.band_weights(self, T, spectrum)
+        sigma0 = ResonanceScreen.sigma0(self, target)
+        bound = ResonanceScreen.bounds(self, E_r, Gn, Gg, other, J, L, record['A'], sigma0, W)
+        return ScreeningResult(target, df, bound, tol, Gamma=np.abs(Gn) + np.abs(Gg) + other)
+
+    def survey(self, targets=None, T=None, spectrum=None, tol=1e-4):
+        """DataFrame of the screening summaries of `targets` (default: all
+        targets with resonance parameters)."""
+        import pandas as pd
+        if targets is None:
+            targets = self.gw.find_resonances()
+        W = ResonanceScreen.band_weights(self, T, spectrum)
+        rows = [ResonanceScreen.screen(self, t, tol=tol, W=W).summary() for t in targets]
+        return pd.DataFrame(rows).set_index('target')
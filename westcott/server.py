@@ -0,0 +1,275 @@
+import numpy as np
+import os
+import stat
+import json
+import asyncio
+import argparse
+
+from .log_handlers import *
+from .memcache import ArrayCache
+from .westcott_gfactors import *
+
+class GFactorServer(object):
+    __doc__="""Class to handle a long-running local g-factor server.  Cross
+    sections (reduced onto the velocity grid), Maxwellian kernels and
+    spectrum weights stay resident between requests, so a warm request costs
+    one dot product.
+
+    Requests are JSON objects, one per line, e.g. `{"id": 1, "target":
+    "Au197", "T": 293}` or `{"target": "Au197", "spectrum": 0}` (a
+    `find_flux` index or file name); replies carry the same `id` with
+    `sigma0` and `gW`, or an `error` with a `code`: 'not_found' for unknown
+    targets or spectra, 'invalid' for malformed requests (a line that is not
+    a JSON object gets `"id": null`) and 'internal' for failures of the
+    server.  Concurrent requests arriving within
+    `batch_window` seconds are evaluated together as one (targets x grid) @
+    (grid x spectra) product.  Resident arrays are kept in an `ArrayCache`
+    of `max_bytes`, least recently used ones being dropped first."""
+
+    def __init__(self, vn=DEFAULT_GRID, batch_window=0.002, max_batch=1024, max_bytes=256*2**20):
+        from .westcott import Westcott
+        self.gw = Westcott()
+        self.vn = np.asarray(vn, dtype=float)
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.cache = ArrayCache(max_bytes)
+        self.requests = 0
+        self.batches = 0
+        self._server = None
+
+    def preload(self, targets=None):
+        """Make cross sections of `targets` (default: all) resident, as far
+        as the memory budget allows."""
+        if targets is None:
+            targets = self.gw.find_targets()
+        for target in targets:
+            GFactorServer.reduced(self, target)
+        return len(targets)
+
+    def reduced(self, target):
+        """Resident (sigma0, v*sigma/(sigma0*v_0) on the grid) of a target."""
+        key = ('reduced', target)
+        entry = self.cache.get(key)
+        if entry is None:
+            if target not in self.gw.catalog.capture:
+                raise KeyError("No capture-gamma cross section data for target nucleus: {0}".format(target))
+            E, sigma = self.gw.sigma_ENDF(target)
+            sigma0 = interp_sigma(E, sigma, self.vn)[0]
+            entry = self.cache.put(key, (float(sigma0), reduced_sigma(E, sigma, self.vn)))
+        return entry
+
+    def weight(self, T=None, spectrum=None):
+        """Resident normalized quadrature weights of a Maxwellian at `T` (K)
+        or of a bundled spectrum."""
+        if spectrum is not None:
+            if isinstance(spectrum, str):
+                names = {f.split('.csv')[0]: i for i, f in self.gw.find_flux()}
+                if spectrum.split('.csv')[0] not in names:
+                    raise KeyError("Unknown spectrum: {0}".format(spectrum))
+                spectrum = names[spectrum.split('.csv')[0]]
+            key = ('spectrum', int(spectrum))
+        else:
+            T = float(Kinematics.T_0 if T is None else T)
+            if not (np.isfinite(T) and T > 0):
+                raise ValueError("Invalid temperature: {0} (must be finite and > 0 K)".format(T))
+            key = ('T', T)
+        w = self.cache.get(key)
+        if w is None:
+            if key[0] == 'T':
+                w = MaxwellianKernel(key[1], self.vn).weights[0]
+            else:
+                if key[1] not in self.gw.flux_data_dict:
+                    raise KeyError("Unknown spectrum: {0}".format(key[1]))
+                w = flux_weights(*self.gw.get_flux(key[1]), self.vn)
+            w = self.cache.put(key, w)
+        return key, w
+
+    def evaluate(self, requests):
+        """Answer a batch of request dictionaries.  Distinct targets and
+        distinct spectra/temperatures of the batch are stacked and evaluated
+        with a single matrix product."""
+        replies = [None] * len(requests)
+        rows, cols, jobs = {}, {}, []
+        for i, req in enumerate(requests):
+            reply = {'id': req.get('id')}
+            replies[i] = reply
+            target = req.get('target')
+            if target is None:
+                reply.update(error="Missing field: target", code='invalid')
+                continue
+            try:
+                sigma0, r = GFactorServer.reduced(self, target)
+                key, w = GFactorServer.weight(self, req.get('T'), req.get('spectrum'))
+            except KeyError as e:
+                reply.update(error=e.args[0], code='not_found')
+                continue
+            except (TypeError, ValueError) as e:
+                reply.update(error=str(e), code='invalid')
+                continue
+            reply['sigma0'] = sigma0
+            rows.setdefault(target, (len(rows), r))
+            cols.setdefault(key, (len(cols), w))
+            jobs.append((i, rows[target][0], cols[key][0]))
+        if jobs:
+            R = np.vstack([r for (_, r) in rows.values()])
+            W = np.vstack([w for (_, w) in cols.values()])
+            G = R @ W.T
+            for i, j, k in jobs:
+                if np.isfinite(G[j, k]):
+                    replies[i]['gW'] = float(G[j, k])
+                else:
+                    del replies[i]['sigma0']
+                    replies[i].update(error="Non-finite g-factor", code='internal')
+        self.requests += len(requests)
+        self.batches += 1
+        return replies
+
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                replies = await loop.run_in_executor(None, GFactorServer.evaluate, self,
+                                                     [req for (req, _) in batch])
+            except Exception as e:
+                logger.error("Batch evaluation failed: {0}".format(e))
+                replies = [{'id': req.get('id'), 'error': str(e), 'code': 'internal'} for (req, _) in batch]
+            for (_, future), reply in zip(batch, replies):
+                if not future.done():
+                    future.set_result(reply)
+
+    async def _answer(self, req, writer, lock):
+        op = req.get('op', 'gw')
+        if op == 'ping':
+            reply = {'id': req.get('id'), 'ok': True}
+        elif op == 'stats':
+            reply = {'id': req.get('id'), 'requests': self.requests, 'batches': self.batches}
+            reply.update(self.cache.stats())
+        elif op == 'shutdown':
+            reply = {'id': req.get('id'), 'ok': True}
+            self._server.close()
+        else:
+            future = asyncio.get_running_loop().create_future()
+            await self._queue.put((req, future))
+            reply = await future
+        async with lock:
+            writer.write((json.dumps(reply) + '\n').encode())
+            await writer.drain()
+
+    async def _handle(self, reader, writer):
+        lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    req = json.loads(line)
+                    if not isinstance(req, dict):
+                        raise ValueError("request must be a JSON object")
+                except ValueError as e:
+                    async with lock:
+                        writer.write((json.dumps({'id': None, 'error': "Invalid request: {0}".format(e),
+                                                  'code': 'invalid'}) + '\n').encode())
+                        await writer.drain()
+                    continue
+                task = asyncio.ensure_future(GFactorServer._answer(self, req, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def serve(self, path=None, host='127.0.0.1', port=8727, ready=None):
+        """Serve on the Unix socket `path`, or on `host:port` if `path` is
+        None, until a `shutdown` request arrives.  `ready`, if given, is a
+        `threading.Event` set once the server is listening.  A stale socket
+        left at `path` is replaced; any other file there is left alone and
+        the server fails to start."""
+        self._queue = asyncio.Queue()
+        batcher = asyncio.ensure_future(GFactorServer._batcher(self))
+        if path is not None:
+            remove_socket(path)
+            self._server = await asyncio.start_unix_server(self._handle, path=path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host=host, port=port)
+        logger.info("Westcott g-factor server listening on {0}".format(path or "{0}:{1}".format(host, port)))
+        if ready is not None:
+            ready.set()
+        try:
+            await self._server.wait_closed()
+        finally:
+            batcher.cancel()
+            if path is not None:
+                remove_socket(path)
+
+def remove_socket(path):
+    """Remove `path` if it is a Unix socket; other files are kept."""
+    try:
+        if stat.S_ISSOCK(os.lstat(path).st_mode):
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def default_socket():
+    """Default Unix socket path: `$WESTCOTT_SOCKET` or a per-user file in
+    the temporary directory."""
+    import tempfile
+    return os.environ.get('WESTCOTT_SOCKET',
+                          os.path.join(tempfile.gettempdir(), 'westcott-{0}.sock'.format(os.getuid())))
+
+def main(argv=None):
+    """Command-line interface to run the server or query a running one."""
+    from .client import GFactorClient
+    parser = argparse.ArgumentParser(prog='westcott-server',
+                                     description="Run or query a local Westcott g-factor server.")
+    parser.add_argument('--socket', default=None, help="Unix socket path (default: $WESTCOTT_SOCKET or a per-user temp file).")
+    parser.add_argument('--port', type=int, default=None, help="Listen on/connect to localhost:PORT instead of a Unix socket.")
+    sub = parser.add_subparsers(dest='action', required=True)
+    s = sub.add_parser('serve', help="Run the server in the foreground.")
+    s.add_argument('--preload', action='store_true', help="Load all cross sections at start-up.")
+    s.add_argument('--batch-window', type=float, default=0.002, help="Seconds to collect a batch (default: 0.002).")
+    s.add_argument('--max-bytes', type=int, default=256*2**20, help="Memory budget for resident arrays (default: 256 MiB).")
+    q = sub.add_parser('query', help="Query a running server.")
+    q.add_argument('target')
+    q.add_argument('-T', '--temperature', type=float, default=None)
+    q.add_argument('-s', '--spectrum', default=None, help="Spectrum index or file name.")
+    sub.add_parser('stop', help="Shut a running server down.")
+    args = parser.parse_args(argv)
+
+    path = None if args.port is not None else (args.socket or default_socket())
+    if args.action == 'serve':
+        server = GFactorServer(batch_window=args.batch_window, max_bytes=args.max_bytes)
+        if args.preload:
+            server.preload()
+        asyncio.run(server.serve(path=path, port=args.port))
+        return 0
+    with GFactorClient(path=path, port=args.port) as client:
+        if args.action == 'stop':
+            client.request(op='shutdown')
+            return 0
+        spectrum = args.spectrum
+        if spectrum is not None and spectrum.isdigit():
+            spectrum = int(spectrum)
+        reply = client.request(target=args.target, T=args.temperature, spectrum=spectrum)
+    if 'error' in reply:
+        print(reply['error'])
+        return 1
+    print(f"{args.target}: sigma0 = {reply['sigma0']} b, gW = {reply['gW']}")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,264 @@
+import numpy as np
+import os
+
+from .log_handlers import *
+from .cache import CaptureCache
+from .catalog import Catalog
+from .westcott_gfactors import *
+
+class ChebyshevSurrogate(object):
+    __doc__="""Class to handle per-target Chebyshev expansions of the
+    Maxwellian g-factor g_W(T) over a temperature range [T_min, T_max] (K),
+    in the variable x = 2*log(T/T_min)/log(T_max/T_min) - 1.
+
+    Each target is sampled at nested Chebyshev-Lobatto temperatures (17,
+    33, 65, ... points) until the upper half of its coefficients sums to
+    less than `tol` relative to g_W, and the expansion is truncated at the
+    lowest degree meeting `tol`.  The coefficients of all targets are kept
+    in one flat array with per-target offsets, so the whole library is a
+    few tens of kB; evaluation is a Chebyshev series in x, vectorized over
+    arrays of temperatures and, with `gw_all`, over targets."""
+
+    def __init__(self, targets, coefficients, offsets, T_range=(20., 600.), tol=1e-8, spot_error=None,
+                 sha256=None, grid=None):
+        self.targets = list(targets)
+        self.index = {t: i for i, t in enumerate(self.targets)}
+        self.coefficients = np.asarray(coefficients, dtype=float)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.T_range = (float(T_range[0]), float(T_range[1]))
+        self.tol = float(tol)
+        self.spot_error = None if spot_error is None else np.asarray(spot_error, dtype=float)
+        self.sha256 = sha256
+        self.grid = grid
+        self._padded = None
+
+    @staticmethod
+    def default_path():
+        """Default file next to the binary capture cache."""
+        return os.path.join(os.path.dirname(CaptureCache.default_dir()), 'surrogate.npz')
+
+    @staticmethod
+    def nodes(n, T_range):
+        """The n+1 Chebyshev-Lobatto points x (ascending) and their
+        temperatures (K)."""
+        x = -np.cos(np.pi*np.arange(n+1)/n)
+        return x, ChebyshevSurrogate._temperature(x, T_range)
+
+    @staticmethod
+    def _temperature(x, T_range):
+        return T_range[0] * (T_range[1]/T_range[0])**((x + 1)/2)
+
+    def x(self, T):
+        """Expansion variable of the temperatures `T` (K)."""
+        a, b = self.T_range
+        return 2*np.log(np.asarray(T, dtype=float)/a)/np.log(b/a) - 1
+
+    @classmethod
+    def build(cls, targets=None, T_range=(20., 600.), tol=1e-8, max_degree=128, spot_checks=8,
+              seed=0, vn=DEFAULT_GRID):
+        """Fit every target (default: all of `data_capture`) over `T_range`
+        to the relative tolerance `tol`, doubling the degree up to
+        `max_degree`.  Each fit is then compared with the exact
+        `gw_Maxwellian` at `spot_checks` random temperatures in the range
+        (see `error_report`).  The capture-data hashes of the targets and
+        the key of the grid `vn` are recorded for `is_fresh`."""
+        from numpy.polynomial import chebyshev
+        from .westcott import Westcott
+        gw = Westcott()
+        if targets is None:
+            targets = gw.find_targets()
+        vn = np.asarray(vn, dtype=float)
+        T_range = (float(T_range[0]), float(T_range[1]))
+        if not 0 < T_range[0] < T_range[1]:
+            logger.error("Invalid temperature range: {0}".format(T_range))
+            return
+
+        # Kernels of the points added at each level (the even points of a
+        # level are the points of the one before), built once for all targets
+        degrees = [16]
+        while degrees[-1] < max_degree:
+            degrees.append(2*degrees[-1])
+        kernels = {}
+        def weights(level):
+            if level not in kernels:
+                n = degrees[level]
+                T = ChebyshevSurrogate.nodes(n, T_range)[1]
+                T = T if level == 0 else T[1::2]
+                kernels[level] = MaxwellianKernel(T, vn).weights
+            return kernels[level]
+        rng = np.random.default_rng(seed)
+        x_spot = rng.uniform(-1, 1, spot_checks)
+        W_spot = MaxwellianKernel(ChebyshevSurrogate._temperature(x_spot, T_range), vn).weights
+
+        coefficients, offsets, spot_error, sha256 = [], [0], [], []
+        for target in targets:
+            cross_section = CrossSectionData.sigma_ENDF(gw, target)
+            if cross_section is None:
+                return
+            sha256.append((gw.capture_cache.read_meta(target) or {}).get('sha256'))
+            r = reduced_sigma(*cross_section, vn)
+            g = weights(0) @ r
+            for level, n in enumerate(degrees):
+                if level > 0:
+                    values = np.empty(n+1)
+                    values[::2] = g
+                    values[1::2] = weights(level) @ r
+                    g = values
+                c = chebyshev.chebfit(ChebyshevSurrogate.nodes(n, T_range)[0], g, n)
+                # tail[m] bounds the error of truncating after degree m; the
+                # margin of 4 covers the aliasing of the neglected terms
+                tail = np.append(np.cumsum(np.abs(c[::-1]))[::-1][1:], 0)
+                m = int(np.argmax(tail <= tol*abs(c[0])/4))
+                if 2*m <= n:
+                    break
+            else:
+                logger.warning("{0}: tolerance {1} not reached at degree {2} (truncation bound {3:.2e}).".format(
+                               target, tol, n, tail[n//2]/abs(c[0])))
+            coefficients.append(c[:m+1])
+            offsets.append(offsets[-1] + m + 1)
+            spot_error.append(np.max(np.abs(chebyshev.chebval(x_spot, c[:m+1]) / (W_spot @ r) - 1)))
+        surrogate = cls(targets, np.concatenate(coefficients), offsets, T_range, tol, spot_error,
+                        sha256, grid_key(vn)[2])
+        logger.info("Chebyshev surrogate of {0} targets: {1} coefficients, max spot-check error {2:.2e}.".format(
+                    len(targets), len(surrogate.coefficients), surrogate.max_error))
+        return surrogate
+
+    def save(self, path=None):
+        """Write the coefficients and metadata to the `.npz` file `path`."""
+        if path is None:
+            path = ChebyshevSurrogate.default_path()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        arrays = {'targets': np.array(self.targets), 'coefficients': self.coefficients,
+                  'offsets': self.offsets, 'T_range': np.array(self.T_range), 'tol': np.array(self.tol)}
+        if self.spot_error is not None:
+            arrays['spot_error'] = self.spot_error
+        if self.sha256 is not None:
+            arrays['sha256'] = np.array([h or '' for h in self.sha256])
+        if self.grid is not None:
+            arrays['grid'] = np.array(self.grid)
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path=None):
+        """Load a saved surrogate; None if nothing is saved at `path`."""
+        if path is None:
+            path = ChebyshevSurrogate.default_path()
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                sha256 = [h or None for h in data['sha256'].tolist()] if 'sha256' in data else None
+                return cls(data['targets'].tolist(), data['coefficients'], data['offsets'],
+                           tuple(data['T_range']), float(data['tol']),
+                           data['spot_error'] if 'spot_error' in data else None,
+                           sha256, str(data['grid']) if 'grid' in data else None)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def is_fresh(self, vn=DEFAULT_GRID):
+        """True if the expansions were built on the grid `vn` from the
+        capture data currently in the binary capture cache."""
+        if self.grid is None or self.grid != grid_key(vn)[2]:
+            return False
+        cache = CaptureCache()
+        hashes = self.sha256 or [None]*len(self.targets)
+        for target, h in zip(self.targets, hashes):
+            if h is None or not cache.is_fresh(target) or (cache.read_meta(target) or {}).get('sha256') != h:
+                return False
+        return True
+
+    @classmethod
+    def default(cls, T_range=(20., 600.), tol=1e-8, vn=DEFAULT_GRID):
+        """Saved surrogate of all targets for `T_range` and `tol`, rebuilt
+        and saved if it is missing, was built with other settings or on
+        another grid, or is out of date."""
+        surrogate = cls.load()
+        if surrogate is not None and surrogate.T_range == tuple(map(float, T_range)) \
+           and surrogate.tol <= tol and sorted(surrogate.targets) == sorted(Catalog.get().capture) \
+           and surrogate.is_fresh(vn):
+            return surrogate
+        surrogate = cls.build(T_range=T_range, tol=tol, vn=vn)
+        surrogate.save()
+        return surrogate
+
+    @property
+    def nbytes(self):
+        return self.coefficients.nbytes + self.offsets.nbytes
+
+    @property
+    def max_error(self):
+        """Largest relative spot-check error over all targets."""
+        return None if self.spot_error is None else float(np.max(self.spot_error, initial=0))
+
+    def degree(self, target):
+        """Degree of the expansion of a target."""
+        i = self.index[target]
+        return int(self.offsets[i+1] - self.offsets[i]) - 1
+
+    def _in_range(self, T):
+        if np.any(T < self.T_range[0]) or np.any(T > self.T_range[1]):
+            logger.error("Temperatures outside the surrogate range {0}-{1} K.".format(*self.T_range))
+            return False
+        return True
+
+    def gw(self, target, T):
+        """Westcott g-factor of a target at the temperature(s) `T` (K) within
+        `T_range`; None outside the range.  Raises KeyError for targets not
+        in the surrogate."""
+        from numpy.polynomial import chebyshev
+        i = self.index[target]
+        T = np.asarray(T, dtype=float)
+        if not ChebyshevSurrogate._in_range(self, T):
+            return
+        gW = chebyshev.chebval(ChebyshevSurrogate.x(self, T), self.coefficients[self.offsets[i]:self.offsets[i+1]])
+        return float(gW) if gW.ndim == 0 else gW
+
+    def derivative(self, target, T):
+        """Temperature derivative dg_W/dT (K^-1) of a target at `T` (K)
+        within `T_range`; None outside the range."""
+        from numpy.polynomial import chebyshev
+        i = self.index[target]
+        T = np.asarray(T, dtype=float)
+        if not ChebyshevSurrogate._in_range(self, T):
+            return
+        c = chebyshev.chebder(self.coefficients[self.offsets[i]:self.offsets[i+1]])
+        dg = chebyshev.chebval(ChebyshevSurrogate.x(self, T), c) * 2/(T*np.log(self.T_range[1]/self.T_range[0]))
+        return float(dg) if dg.ndim == 0 else dg
+
+    def gw_all(self, T):
+        """Targets x temperatures array of g-factors at the temperatures `T`
+        (K) within `T_range`; None outside the range."""
+        from numpy.polynomial import chebyshev
+        T = np.atleast_1d(np.asarray(T, dtype=float))
+        if not ChebyshevSurrogate._in_range(self, T):
+            return
+        if self._padded is None:
+            # Zero-padded (targets x max degree + 1) copy for matrix evaluation
+            lengths = np.diff(self.offsets)
+            padded = np.zeros((len(self.targets), int(lengths.max(initial=0))))
+            padded[np.arange(padded.shape[1]) < lengths[:,np.newaxis]] = self.coefficients
+            self._padded = padded
+        return self._padded @ chebyshev.chebvander(ChebyshevSurrogate.x(self, T), self._padded.shape[1]-1).T
+
+    def spot_check(self, targets=None, n=8, seed=None, vn=DEFAULT_GRID):
+        """Largest relative errors of `targets` (default: all) against the
+        exact `gw_Maxwellian` at `n` random temperatures in the range."""
+        from .westcott import Westcott
+        gw = Westcott()
+        if targets is None:
+            targets = self.targets
+        rng = np.random.default_rng(seed)
+        T = ChebyshevSurrogate._temperature(rng.uniform(-1, 1, n), self.T_range)
+        W = MaxwellianKernel(T, vn).weights
+        errors = np.empty(len(targets))
+        for k, target in enumerate(targets):
+            exact = W @ reduced_sigma(*gw.sigma_ENDF(target), vn)
+            errors[k] = np.max(np.abs(ChebyshevSurrogate.gw(self, target, T) / exact - 1))
+        return errors
+
+    def error_report(self):
+        """DataFrame of the degree and largest relative spot-check error of
+        each target, from the checks made by `build`."""
+        import pandas as pd
+        return pd.DataFrame({'degree': np.diff(self.offsets) - 1, 'spot_error': self.spot_error},
+                            index=pd.Index(self.targets, name='target'))
@@ -1,13 +1,19 @@
 import numpy as np
-np.set_printoptions(legacy='1.25')
-from scipy.integrate import trapezoid
-import pandas as pd
-pd.set_option('display.max_rows', None)
+try:
+    from numpy import trapezoid
+except ImportError:  # NumPy < 2.0
+    from numpy import trapz as trapezoid
 import os, glob
 import re
 import csv
 
 from .log_handlers import *
+from .cache import CaptureCache
+from .catalog import Catalog
+from .memcache import ArrayCache
+from .doppler import DopplerCache, E_MAX
+from .results import ResultStore
+from . import profiling
 
 class CrossSectionData(object):
     __doc__="""Class to handle neutron-capture cross section data tables from 
@@ -18,43 +24,95 @@ class CrossSectionData(object):
     def __init__(self):
         from . import get_data
         self.capture_data_path = get_data('data_capture')
-        capture_data_list = [x for x in glob.glob("{0}/*.csv".format(self.capture_data_path))]
-        self.capture_data_dict = {}
-        for c in capture_data_list:
-            c_file = c.split('data_capture/')[1]
-            target = c_file.split('n-capture-')[1].split('.csv')[0]
-            self.capture_data_dict.update({target: c_file})
-        self.capture_data_dict = dict(sorted(self.capture_data_dict.items()))
+        self.capture_cache = CaptureCache(source_dir=self.capture_data_path)
+        self.doppler_cache = DopplerCache()
+        self.result_store = ResultStore.default()
+
+    @property
+    def catalog(self):
+        """Package catalog, loaded from the manifest on first access."""
+        return Catalog.get()
+
+    @property
+    def capture_data_dict(self):
+        return Catalog.get().capture_files
 
     def find_targets(self):
-        return [target for (target, value) in self.capture_data_dict.items()]
+        return list(Catalog.get().capture)
 
     def get_MT102(self, target):
         """Retrieve point-wise cross section data for defined target as 
         DataFrame object."""
-        self.target = target
-        df = None
-        for k,v in self.capture_data_dict.items():
-            if k==self.target:
-                df = pd.read_csv("{0}/{1}".format(self.capture_data_path, v))
-        if df is None:
+        import pandas as pd
+        record = Catalog.get().capture.get(target)
+        if record is None:
             logger.error("No capture-gamma cross section data for target nucleus: {0}".format(target))
             return
         else:
+            with profiling.stage('csv_load'):
+                df = pd.read_csv(Catalog.get().path(record))
+            profiling.count('rows_read', len(df))
             return df
 
     def sigma_ENDF(self, target):
         """Convert ENDF energy and cross section DataFrame to numpy arrays 
-        for interpolation and integration."""
-        self.target = target
+        for interpolation and integration.
+
+        Arrays are served as read-only memory maps from the binary capture 
+        cache when it is up to date; otherwise the CSV file is parsed and the 
+        cache entry is (re)written.  Loaded arrays are kept in the shared 
+        in-memory `ArrayCache`."""
+        if target not in Catalog.get().capture:
+            df = CrossSectionData.get_MT102(self,target)
+            return df
+
+        memory = ArrayCache.default()
+        cached = memory.get(('sigma_ENDF', target))
+        if cached is not None:
+            return cached
+
+        with profiling.stage('cache_load'):
+            cached = self.capture_cache.load(target)
+        if cached is None:
+            df = CrossSectionData.get_MT102(self,target)
+
+            endf_data = df.to_numpy()
+            En = endf_data[:,0]
+            sigma = endf_data[:,1]
+            self.capture_cache.store(target, En, sigma)
+            cached = (En, sigma)
+
+        return memory.put(('sigma_ENDF', target), cached, source=True)
+
+    def sigma_Doppler(self, target, T, E_max=E_MAX):
+        """ENDF cross section of a target Doppler-broadened from 0 K to the 
+        sample temperature T (K) up to `E_max` (eV), as energy and cross 
+        section arrays on the ENDF energy points.
+
+        Broadened tables are kept in the on-disk `DopplerCache` per 
+        (target, T) and in the shared `ArrayCache`."""
+        from .doppler import broaden
+        if target not in Catalog.get().capture:
+            logger.error("No capture-gamma cross section data for target nucleus: {0}".format(target))
+            return
 
-        df = CrossSectionData.get_MT102(self,self.target)
+        memory = ArrayCache.default()
+        key = ('sigma_Doppler', target, float(T), E_max)
+        cached = memory.get(key)
+        if cached is not None:
+            return cached
 
-        endf_data = df.to_numpy()
-        En = endf_data[:,0]
-        sigma = endf_data[:,1]
+        En, sigma = CrossSectionData.sigma_ENDF(self, target)
+        sha256 = (self.capture_cache.read_meta(target) or {}).get('sha256')
+        cached = self.doppler_cache.load(target, T, sha256, E_max)
+        if cached is None:
+            A = Catalog.get().capture[target]['A']
+            with profiling.stage('doppler_broadening'):
+                sigma_T = broaden(En, sigma, T, A, E_max=E_max)
+            self.doppler_cache.store(target, T, En, sigma_T, sha256, E_max)
+            cached = (np.asarray(En), sigma_T)
 
-        return (En, sigma)
+        return memory.put(key, cached, source=True)
 
 class NeutronFlux(CrossSectionData):
     __doc__="""Class to handle experimental neutron-flux spectra from the 
@@ -65,41 +123,42 @@ class NeutronFlux(CrossSectionData):
     def __init__(self):
         from . import get_data
         self.flux_data_path = get_data('data_spectra')
-        flux_data_list = [x for x in glob.glob("{0}/*.csv".format(self.flux_data_path))]
-        self.flux_data_dict = {}
-        for i,f in enumerate(flux_data_list):
-            f_file = f.split('data_spectra/')[1]
-            self.flux_data_dict.update({i: f_file})
-        self.flux_data_dict = dict(sorted(self.flux_data_dict.items()))
+
+    @property
+    def flux_data_dict(self):
+        return Catalog.get().spectrum_files
 
     def find_flux(self):
         return [(i,f) for (i, f) in self.flux_data_dict.items()]
 
     def get_flux_df(self,flux):
         """Retrive experimental neutron-flux spectrum as DataFrame object."""
-        self.flux = flux
-        df = None
-        for k,v in self.flux_data_dict.items():
-            if k==self.flux:
-                df = pd.read_csv("{0}/{1}".format(self.flux_data_path, v))
-        if df is None:
-            logger.warning("Spectrum not defined for argument:".format(self.flux))
+        import pandas as pd
+        record = Catalog.get().spectra.get(flux)
+        if record is None:
+            logger.warning("Spectrum not defined for argument:".format(flux))
             return
         else:
+            with profiling.stage('csv_load'):
+                df = pd.read_csv(Catalog.get().path(record))
+            profiling.count('rows_read', len(df))
             return df
 
     def get_flux(self, flux):
         """Convert experimental flux DataFrame into numpy arrays for interpolation 
         and integration."""
-        self.flux = flux
+        memory = ArrayCache.default()
+        cached = memory.get(('get_flux', flux))
+        if cached is not None:
+            return cached
 
-        df = NeutronFlux.get_flux_df(self, self.flux)
+        df = NeutronFlux.get_flux_df(self, flux)
 
         flux_spectrum = df.to_numpy()
         En = flux_spectrum[:,0]
         sigma = flux_spectrum[:,1]
 
-        return (En, sigma)
+        return memory.put(('get_flux', flux), (En, sigma), source=True)
 
 class ResonanceData(NeutronFlux):
     __doc__="""Class to handle the Breit-Wigner and Reich-Moore resonances of 
@@ -111,29 +170,9 @@ class ResonanceData(NeutronFlux):
         from . import get_data
         self.res_data_path = get_data('data_resonances')
 
-        # Load Breit-Wigner resonances
-        breit_wigner_list = [x for x in glob.glob("{0}/BreitWigner/*.csv".format(self.res_data_path))]
-        breit_wigner_dict = {}
-        for bw in breit_wigner_list:
-            bw_file = bw.split('BreitWigner/')[1]
-            target = bw_file.split('n-res-')[1].split('.csv')[0]
-            breit_wigner_dict.update({target: [bw_file, 'BreitWigner']})
-        #Sort dictionary by key
-        bw_sorted_dict = dict(sorted(breit_wigner_dict.items()))
-
-        # Load Reich-Moore resonances
-        reich_moore_list = [x for x in glob.glob("{0}/ReichMoore/*.csv".format(self.res_data_path))]
-        reich_moore_dict = {}
-        for rm in reich_moore_list:
-            rm_file = rm.split('ReichMoore/')[1]
-            target = rm_file.split('n-res-')[1].split('.csv')[0]
-            reich_moore_dict.update({target: [rm_file, 'ReichMoore']})
-        #Sort dictionary by key
-        rm_sorted_dict = dict(sorted(reich_moore_dict.items()))
-
-        # Concatenate and sort the Breit-Wigner and Reich-Moore dictionaries
-        merged_res_dict = {**bw_sorted_dict, **rm_sorted_dict}
-        self.res_sorted_dict = dict(sorted(merged_res_dict.items()))
+    @property
+    def res_sorted_dict(self):
+        return Catalog.get().resonance_files
 
     def find_resonances(self,**kwargs):
         """Find list of all 'target+n' systems with resonance parameters in 
@@ -153,13 +192,11 @@ class ResonanceData(NeutronFlux):
             Find Reich-Moore resonances only:
             >find_resonances(res='RM')
 """
-        self.kwargs = kwargs
-
-        if self.kwargs == {} or self.kwargs is None:
+        if kwargs == {} or kwargs is None:
             # return all targets
             return [target for (target, value) in self.res_sorted_dict.items()]
         else:
-            for key in self.kwargs.keys():
+            for key in kwargs.keys():
                 if key == 'res':
                     for res in kwargs.values():
                         if res.upper() == 'BW':
@@ -176,20 +213,17 @@ class ResonanceData(NeutronFlux):
     def get_res_paras(self, target):
         """Extract resonance parameters for a defined target nucleus and return 
         DataFrame object."""
-        self.target = target
-        df = None
-        PARAS_EXIST = False
-        for nucleus, csv_object in self.res_sorted_dict.items():
-            if target == nucleus and csv_object[1] == 'BreitWigner':
-                PARAS_EXIST = True
-                df = pd.read_csv("{0}/BreitWigner/{1}".format(self.res_data_path, csv_object[0]))
-            elif target == nucleus and csv_object[1] == 'ReichMoore':
-                PARAS_EXIST = True
-                df = pd.read_csv("{0}/ReichMoore/{1}".format(self.res_data_path, csv_object[0]))
-        if PARAS_EXIST == False:
+        import pandas as pd
+        record = Catalog.get().resonances.get(target)
+        if record is None:
             logger.error("No resonance parameters available for defined target or target does not exist.")
             return
-                
+
+        with profiling.stage('csv_load'):
+            df = pd.read_csv(Catalog.get().path(record))
+        profiling.count('rows_read', len(df))
+        if record['sorted']:
+            return df
         df_sorted = df.sort_values(by='energy')
         return df_sorted
     
@@ -0,0 +1,161 @@
+import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .log_handlers import *
+from .tables import *
+from .westcott_gfactors import *
+
+# Per-process state installed once by `_init_worker`; never sent with tasks.
+_WORKER = {}
+
+def knot_basis(x, knots):
+    """Piecewise-linear interpolation matrix of shape (len(x), len(knots)).
+    Independent standard normals at knots spaced a correlation length
+    apart, interpolated to `x`, form a smooth Gaussian random field."""
+    x = np.atleast_1d(np.asarray(x, dtype=float))
+    j = np.clip(np.searchsorted(knots, x, side='right') - 1, 0, len(knots) - 2)
+    t = (x - knots[j]) / (knots[j+1] - knots[j])
+    B = np.zeros((len(x), len(knots)))
+    B[np.arange(len(x)), j] = 1 - t
+    B[np.arange(len(x)), j+1] = t
+    return B
+
+def _init_worker(model):
+    """Process-pool initializer: keep the sampling model resident."""
+    _WORKER['model'] = model
+
+def _evaluate(n, seed):
+    """Draw and evaluate `n` realizations with the worker's model."""
+    return _sample(_WORKER['model'], n, seed)
+
+def _sample(model, n, seed):
+    """g-factors of `n` perturbed realizations, shape (n, targets)."""
+    rng = np.random.default_rng(seed)
+    K = model['knots']
+    gW = np.empty((n, len(model['targets'])))
+    if model['T'] is None:
+        # Perturbations are linear in the knot values: every sum over the
+        # grid has been projected onto the knots once, in `gw_uncertainty`.
+        Zs = rng.standard_normal((n, K)) * model['rel_spectrum']
+        den = model['d0'] + Zs @ model['d']
+        for i, (a0, c, M) in enumerate(model['targets']):
+            Zx = rng.standard_normal((n, K)) * model['rel_sigma']
+            num = a0 + (Zs + Zx) @ c + ((Zs @ M) * Zx).sum(axis=1)
+            gW[:,i] = num / (den * (1 + Zx @ model['b0']))
+        return gW
+
+    # Maxwellian with a sampled temperature: one (n x grid) weight matrix
+    vn = model['vn']
+    T = np.clip(model['T'] + model['sigma_T'] * rng.standard_normal(n), 1e-3, None)
+    vt2 = 2*Kinematics.kB*T/Kinematics.m_n
+    W = np.exp(-vn**2/vt2[:,np.newaxis])
+    W *= vn**3 * model['w']
+    W /= W.sum(axis=1, keepdims=True)
+    for i, r in enumerate(model['targets']):
+        Zx = rng.standard_normal((n, K)) * model['rel_sigma']
+        Wr = W * r
+        gW[:,i] = (Wr.sum(axis=1) + ((Wr @ model['B']) * Zx).sum(axis=1)) / (1 + Zx @ model['b0'])
+    return gW
+
+class MonteCarloResult(object):
+    __doc__="""Class to hold the g-factor realizations of a Monte Carlo
+    uncertainty propagation (`gw_uncertainty`) and their statistics across
+    targets."""
+
+    def __init__(self, samples, targets, percentiles=(2.5, 50, 97.5)):
+        import pandas as pd
+        self.samples = pd.DataFrame(samples, columns=pd.Index(targets, name='target'))
+        self.mean = self.samples.mean()
+        self.std = self.samples.std(ddof=1)
+        self.percentiles = pd.DataFrame(np.percentile(samples, percentiles, axis=0),
+                                        index=pd.Index(percentiles, name='percentile'),
+                                        columns=self.samples.columns)
+        self.cov = self.samples.cov()
+
+    def corr(self):
+        """Correlation matrix of the g-factors across targets."""
+        return self.samples.corr()
+
+    def summary(self):
+        """Table of mean, standard deviation and percentiles per target."""
+        import pandas as pd
+        df = pd.DataFrame({'mean': self.mean, 'std': self.std})
+        for p, row in self.percentiles.iterrows():
+            df['p{0:g}'.format(p)] = row
+        return df
+
+def gw_uncertainty(targets, spectrum=None, T=None, n_samples=1000, rel_spectrum=0.05,
+                   rel_sigma=0.05, sigma_T=0., corr_length=1., percentiles=(2.5, 50, 97.5),
+                   vn=DEFAULT_GRID, max_bytes=2**27, workers=None, seed=None):
+    """Monte Carlo propagation of flux-spectrum and cross-section
+    uncertainties to Westcott g-factors of one or more ENDF targets.
+
+    The flux is a bundled spectrum (`find_flux` index), a user spectrum file
+    (see `import_spectrum`), an (E, dN/dE) pair, or, if `spectrum` is None,
+    a Maxwellian at `T` (K, default `Kinematics.T_0`) whose temperature is
+    drawn with standard deviation `sigma_T`.  Spectra and cross sections
+    are multiplied by 1 + rel*field, with field a Gaussian random field in
+    ln(E) of correlation length `corr_length` (e-folds); cross sections are
+    perturbed independently per target, the spectrum is shared by all
+    targets of a realization.  Fields are not truncated, which is harmless
+    for relative uncertainties of up to ~10 %.
+
+    For a fixed spectrum the g-factor is a ratio of quadratic forms in the
+    knot values, so the sums over the grid are projected onto the knots
+    once and a realization costs O(knots^2) per target.  Temperature draws
+    need a (realizations x grid) matrix of Maxwellian weights.  Either way
+    realizations are evaluated in blocks of about `max_bytes`, in-process
+    or over `workers` processes (default: in-process); the result for a
+    given `seed` does not depend on `workers`.  Returns a
+    `MonteCarloResult`."""
+    if isinstance(targets, str):
+        targets = [targets]
+    targets = list(targets)
+    vn = np.asarray(vn, dtype=float)
+    E_n = 0.5*Kinematics.m_n * vn**2/Kinematics.eV
+    lnE = np.log(E_n)
+    from .westcott import Westcott
+    xs = Westcott()
+
+    knots = np.arange(lnE.min(), lnE.max() + 2*corr_length, corr_length)
+    B = knot_basis(lnE, knots)
+    model = {'vn': vn, 'w': trapezoid_weights(vn), 'T': None, 'sigma_T': sigma_T,
+             'rel_spectrum': rel_spectrum, 'rel_sigma': rel_sigma, 'knots': B.shape[1],
+             'b0': knot_basis(np.log(Kinematics.E_0), knots)[0], 'B': B}
+    if spectrum is None:
+        model['T'] = Kinematics.T_0 if T is None else T
+    else:
+        if isinstance(spectrum, str):
+            E_spectrum, dndE_spectrum = UserSpectrum.import_spectrum(xs, spectrum)
+        elif isinstance(spectrum, (tuple, list)):
+            E_spectrum, dndE_spectrum = spectrum
+        else:
+            E_spectrum, dndE_spectrum = NeutronFlux.get_flux(xs, spectrum)
+        f = model['w'] * interp_dndv(E_spectrum, dndE_spectrum, vn)
+        model['d0'] = f.sum()
+        model['d'] = f @ B
+
+    model['targets'] = []
+    for target in targets:
+        cross_section = CrossSectionData.sigma_ENDF(xs, target)
+        if cross_section is None:
+            return
+        r = reduced_sigma(*cross_section, vn)
+        if model['T'] is None:
+            a = f * r
+            model['targets'].append((a.sum(), a @ B, (B * a[:,np.newaxis]).T @ B))
+        else:
+            model['targets'].append(r)
+
+    per_sample = 8 * (2*len(vn) if model['T'] is not None else 4*B.shape[1])
+    block = max(1, min(n_samples, max_bytes // per_sample))
+    sizes = [min(block, n_samples - i) for i in range(0, n_samples, block)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if workers is None or workers <= 1:
+        results = [_sample(model, n, s) for n, s in zip(sizes, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model,)) as pool:
+            results = list(pool.map(_evaluate, sizes, seeds))
+    return MonteCarloResult(np.vstack(results), targets, percentiles)
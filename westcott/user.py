@@ -1,23 +1,61 @@
 from .tables import *
 
 class UserSpectrum(ResonanceData):
-    __doc__="""Class to handle an arbitrary two-column CSV format neutron 
-    flux spectrum."""
+    __doc__="""Class to handle arbitrary neutron flux spectra in CSV format:
+    two-column files (energy, dN/dE) or wide files with one dN/dE column per
+    spectrum, read in chunks of rows.  NumPy `.npy` arrays of shape
+    (rows, 1 + spectra) are read as memory maps."""
 
     def __init__(self,*args,**kwargs):
         super().__init__(*args,**kwargs)
 
-    def import_spectrum(self,csv_filename):
-        """Import arbitrary neutron flux spectrum as a function of energy in 
-        CSV format."""
-        self.csv_filename = csv_filename
-        with open(self.csv_filename, mode='r', encoding='utf-8-sig') as file:
-            csvFile = csv.reader(file)
-            next(csvFile, None)  # Skip header line
-            En = []
-            dndE = []
-            for lines in csvFile:
-                En.append(float(lines[0]))
-                dndE.append(float(lines[1])) 
-            return(np.array(En), np.array(dndE))
+    def spectrum_columns(self, filename):
+        """Names of the dN/dE columns of a spectrum file (for `.npy` files,
+        the column numbers as strings)."""
+        if filename.endswith('.npy'):
+            data = np.load(filename, mmap_mode='r')
+            return [str(i) for i in range(1, data.shape[1])]
+        with open(filename, mode='r', encoding='utf-8-sig') as file:
+            header = next(csv.reader(file))
+        return [name.strip() for name in header[1:]]
 
+    def iter_spectrum(self, filename, chunk_rows=2**16):
+        """Iterate over a spectrum file in blocks of at most `chunk_rows`
+        rows, yielding (E, dNdE) with dNdE of shape (rows, spectra).  Only
+        one block is held in memory at a time."""
+        if filename.endswith('.npy'):
+            data = np.load(filename, mmap_mode='r')
+            for i in range(0, data.shape[0], chunk_rows):
+                with profiling.stage('csv_load'):
+                    block = np.asarray(data[i:i+chunk_rows], dtype=float)
+                profiling.count('rows_read', len(block))
+                yield block[:,0], block[:,1:]
+            return
+        import pandas as pd
+        with pd.read_csv(filename, encoding='utf-8-sig', chunksize=chunk_rows, dtype=float) as reader:
+            while True:
+                with profiling.stage('csv_load'):
+                    df = next(reader, None)
+                if df is None:
+                    return
+                block = df.to_numpy()
+                profiling.count('rows_read', len(block))
+                yield block[:,0], block[:,1:]
+
+    def import_spectrum(self, csv_filename, column=1, chunk_rows=2**16):
+        """Import arbitrary neutron flux spectrum as a function of energy in
+        CSV format (or as a `.npy` array); `column` selects the dN/dE column
+        of a wide file.  Parsed spectra are kept in the shared `ArrayCache`,
+        keyed by path, size, modification time and column."""
+        st = os.stat(csv_filename)
+        key = ('import_spectrum', os.path.abspath(csv_filename), st.st_size, st.st_mtime_ns, column)
+        memory = ArrayCache.default()
+        cached = memory.get(key)
+        if cached is not None:
+            return cached
+        En = []
+        dndE = []
+        for E, Y in UserSpectrum.iter_spectrum(self, csv_filename, chunk_rows):
+            En.append(E)
+            dndE.append(Y[:,column-1])
+        return memory.put(key, (np.concatenate(En), np.concatenate(dndE)), source=True)
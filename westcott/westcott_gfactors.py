@@ -1,4 +1,9 @@
 from .user import *
+from .memcache import ArrayCache, grid_key
+
+# Default velocity grid (m/s); read-only, so its `grid_key` is computed once
+DEFAULT_GRID = np.logspace(0,5,100000)
+DEFAULT_GRID.flags.writeable = False
 
 class Kinematics(UserSpectrum):
     __doc__="""Class to handle quantities related to neutron-beam kinematics."""
@@ -6,7 +11,8 @@ class Kinematics(UserSpectrum):
     # Constants
     eV = 1.602189e-19 #J
     kB = 1.38066e-23 #Boltzmann's constant, J/K
-    m_n = 1.00866501 *1.660566e-27 #neutron mass, kg
+    u = 1.660566e-27 #atomic mass unit, kg
+    m_n = 1.00866501 *u #neutron mass, kg
     kB_eVK = 8.6117343 #Boltzmann's constant, eV/K
     h = 6.626183e-34 #Planck's constant, J*s
     h_eVs = 4.13567e-15 #Planck's constant, eV*s
@@ -43,21 +49,16 @@ class Kinematics(UserSpectrum):
         
     def vel(self,E):
         """Convert neutron energy (eV) to velocity (m/s)"""
-        self.E = E
-        
-        E_joules = self.E*Kinematics.eV
+        E_joules = E*Kinematics.eV
         return np.sqrt(2*E_joules/Kinematics.m_n)
 
     def phi_Maxwellian(self, T, v_array):
         """Maxwellian velocity distribution at a given temperature T (K)"""
-        self.T = T
-        self.v_array = np.array(v_array)
+        v_array = np.array(v_array)
         
-        phi = []
-        vt = np.sqrt(2*Kinematics.kB*self.T/Kinematics.m_n)
-        for v in self.v_array:
-            phi.append(2 * np.exp(-v**2/vt**2) * v**3/vt**4)
-        return np.array(phi)
+        vt = np.sqrt(2*Kinematics.kB*T/Kinematics.m_n)
+        x2 = (v_array/vt)**2
+        return 2 * np.exp(-x2) * x2 * v_array/vt**2
 
 
 class Irregularity(Kinematics):
@@ -69,48 +70,91 @@ class Irregularity(Kinematics):
 
     def del_0(self, v, E_resonance, Gamma):
         """Lorentzian lineshape for the irregularity function, per Molnar 
-        Eqs. 1-3."""
-        self.v = v
-        self.E_resonance = E_resonance
-        self.Gamma = Gamma
-        
-        K = Kinematics()
-        E = 0.5 * K.m_n * self.v**2 / K.eV
-        return ((self.E_resonance - K.E_0)**2 + (self.Gamma**2)/4) / ((self.E_resonance - E)**2 + (self.Gamma**2)/4)
+        Eqs. 1-3.
+
+        `v` may be a scalar or an array of velocities; `E_resonance` and 
+        `Gamma` may be scalars or broadcast-compatible arrays of resonances, 
+        in which case the result has shape `E_resonance.shape + v.shape`."""
+        E = 0.5 * Kinematics.m_n * np.asarray(v, dtype=float)**2 / Kinematics.eV
+        E_r, G2 = Irregularity._resonance_axes(E_resonance, Gamma, np.ndim(E))
+        return ((E_r - Kinematics.E_0)**2 + G2) / ((E_r - E)**2 + G2)
+
+    @staticmethod
+    def _resonance_axes(E_resonance, Gamma, ndim):
+        """Broadcast resonance energies and widths together and append `ndim` 
+        trailing axes so they broadcast against a velocity grid.  Returns the 
+        energies and the squared half-widths."""
+        E_r, G = np.broadcast_arrays(np.asarray(E_resonance, dtype=float),
+                                     np.asarray(Gamma, dtype=float))
+        shape = E_r.shape + (1,)*ndim
+        return E_r.reshape(shape), (G.reshape(shape)**2)/4
 
     def p(self, vn, T=None):
-        """Neutron density function (Molnar Ch. 1, Table 1)."""
-        self.vn = vn
-        self.T = T
-
-        K = Kinematics()
-        phi = None
-        if T is None:
-            phi = K.phi_Maxwellian(K.T_0, np.logspace(0,5,100000))
-        else:
-            phi = K.phi_Maxwellian(self.T, self.vn)
-
-        p_array = []
-        for i in range(len(self.vn)):
-            vt = np.sqrt(2 * K.kB * self.T / K.m_n)
-            p_array.append(2 * vt * phi[i] / (np.sqrt(np.pi) * self.vn[i]))
-        N = trapezoid(np.array(p_array), self.vn)  # Normalization factor, to ensure integral of p(T,v) integrates to unity (Molnar p. 12)
-        return np.array(p_array)/N
-
-    def gw_irregularity(self, E_resonance, Gamma, T=None, vn=np.logspace(0,5,100000)):
+        """Neutron density function (Molnar Ch. 1, Table 1).  Defaults to the 
+        thermal temperature `T_0` when `T` is None."""
+        from .compute import irregularity_density
+        return irregularity_density(np.asarray(vn, dtype=float), T)
+
+    def gw_irregularity(self, E_resonance, Gamma, T=None, vn=DEFAULT_GRID, chunk_size=2**22):
         """Evaluate g-factor using irregularity function method described by 
-        Molnar et al. (Eqs. 1-5)."""
-        self.E_resonance = E_resonance
-        self.Gamma = Gamma
-        self.T = T
-        self.vn = vn
-
-        d = []
-        for i in range(len(self.vn)):
-            d.append(Irregularity.del_0(self, self.vn[i], self.E_resonance, self.Gamma))
-        d = np.array(d)
-        return trapezoid(d * Irregularity.p(self, self.vn, self.T), self.vn)
-    
+        Molnar et al. (Eqs. 1-5).
+
+        `E_resonance` and `Gamma` may be arrays (e.g. all resonances of a 
+        nucleus from `get_res_paras`); one g-factor is then returned per 
+        resonance.  Resonances are evaluated in blocks of at most 
+        `chunk_size` grid elements using a single reusable work buffer."""
+        from . import compute
+        return compute.gw_irregularity(E_resonance, Gamma, T, np.asarray(vn, dtype=float), chunk_size,
+                                       getattr(self, 'result_store', None))
+
+class MaxwellianKernel(object):
+    __doc__="""Class to handle a precomputed Maxwellian kernel: the 
+    normalized velocity distributions phi(v,T) of `phi_Maxwellian` for a set 
+    of temperatures on a fixed velocity grid, together with their 
+    trapezoidal integration weights.  Instances obtained through `get` are 
+    shared via the `ArrayCache`, so repeated g-factor calls at the same 
+    temperatures reuse one set of exponentials."""
+
+    def __init__(self, temperatures, vn=DEFAULT_GRID, dtype=np.float64):
+        self.temperatures = np.atleast_1d(np.asarray(temperatures, dtype=float))
+        self.vn = np.asarray(vn, dtype=float)
+        self.dtype = np.dtype(dtype)
+
+        with profiling.stage('kernel_build'):
+            vt = np.sqrt(2*Kinematics.kB*self.temperatures/Kinematics.m_n)[:,np.newaxis]
+            x2 = (self.vn/vt)**2
+            phi = np.exp(-x2)
+            phi *= x2
+            phi *= 2 * self.vn/vt**2
+            w = phi * trapezoid_weights(self.vn)
+            norm = w.sum(axis=1, keepdims=True)
+            self.phi = (phi / norm).astype(self.dtype, copy=False)  # unit trapezoidal integral
+            self.weights = (w / norm).astype(self.dtype, copy=False)
+        profiling.count('kernel_temperatures', len(self.temperatures))
+        self.phi.flags.writeable = False
+        self.weights.flags.writeable = False
+
+    @classmethod
+    def get(cls, temperatures, vn=DEFAULT_GRID, dtype=np.float64):
+        """Shared kernel for the given temperatures, grid and dtype."""
+        T = tuple(float(t) for t in np.atleast_1d(temperatures))
+        key = ('MaxwellianKernel', T, grid_key(vn), np.dtype(dtype).str)
+        return ArrayCache.default().get_or_compute(key, lambda: cls(T, vn, dtype))
+
+    @property
+    def nbytes(self):
+        return self.phi.nbytes + self.weights.nbytes
+
+    def average(self, f):
+        """Maxwellian averages of `f` sampled on `vn` (shape (..., len(vn))), 
+        one per temperature."""
+        return np.asarray(f, dtype=self.dtype) @ self.weights.T
+
+    def gw(self, E, sigma):
+        """Westcott g-factors of one cross section at every kernel 
+        temperature."""
+        return MaxwellianKernel.average(self, reduced_sigma(E, sigma, self.vn))
+
 class gFactors(Irregularity):
     __doc__="""Class to handle numerical integration of complete cross-section 
     spectrum for the determination of Westcott g-factors."""
@@ -118,37 +162,230 @@ class gFactors(Irregularity):
     def __init__(self,*args,**kwargs):
         super().__init__(*args,**kwargs)
 
-    def gw_Maxwellian(self, T, E, sigma, vn=np.logspace(0,5,100000)):
-        """Westcott g-factor according to assumed theoretical Maxwellian 
-        distribution at a given neutron temperature."""
-        self.T = T
-        self.E = E
-        self.sigma = sigma
-
-        K = Kinematics()
-        v_sigma = K.vel(self.E)  #convert neutron energy to velocity
-        dndv = K.phi_Maxwellian(self.T, vn)
-        sigma0 = np.interp(K.v_0, v_sigma, self.sigma)  #thermal cross section, barns
-        sigma_interp = np.interp(vn, v_sigma, self.sigma)
+    def sample_sigma(self, E, sigma, T_sample, target=None):
+        """Cross section (E, sigma) replaced by the ENDF cross section of its 
+        target Doppler-broadened to the sample temperature `T_sample` (K) via 
+        `sigma_Doppler`.  The target is `target` or, for arrays returned by 
+        `sigma_ENDF`, read from their source tag (see `memcache.tag_source`), 
+        which does not depend on the arrays still being cached."""
+        if target is None:
+            source = ArrayCache.default().source_of(E, sigma)
+            if source is not None and source[0] == 'sigma_ENDF':
+                target = source[1]
+        if target is None:
+            logger.error("Cannot identify the target of the cross section: pass `target` to use a sample temperature.")
+            return
+        return CrossSectionData.sigma_Doppler(self, target, T_sample)
 
-        return 1/(sigma0 * K.v_0) * trapezoid(dndv * vn * sigma_interp, vn) / trapezoid(dndv, vn)
+    def gw_Maxwellian(self, T, E, sigma, vn=DEFAULT_GRID, T_sample=None, target=None):
+        """Westcott g-factor according to assumed theoretical Maxwellian 
+        distribution at a given neutron temperature.  With `T_sample`, the 
+        cross section is Doppler-broadened to that sample temperature (see 
+        `sample_sigma`)."""
+        if T_sample is not None:
+            broadened = gFactors.sample_sigma(self, E, sigma, T_sample, target)
+            if broadened is None:
+                return
+            E, sigma = broadened
+        from . import compute
+        return compute.gw_maxwellian(compute.CrossSection(E, sigma, target), T, vn,
+                                     getattr(self, 'result_store', None))
 
-    def gw_arbitrary(self, E_spectrum, dndE_spectrum, E_endf, sigma_endf, vn=np.logspace(0,5,100000)):
+    def gw_arbitrary(self, E_spectrum, dndE_spectrum, E_endf, sigma_endf, vn=DEFAULT_GRID,
+                     T_sample=None, target=None, chunk_size=None):
         """Integrate to evaluate Westcott g-factor for an arbitrary neutron 
-        flux distribution."""
-        self.E_spectrum = E_spectrum
-        self.dndE_spectrum = dndE_spectrum
-        self.E_endf = E_endf
-        self.sigma_endf = sigma_endf
-
-        K = Kinematics()
-        E_n = 0.5*K.m_n * vn**2/K.eV  #energy space, eV
-        dndE_interp = np.interp(E_n, self.E_spectrum, self.dndE_spectrum, left=0, right=0)
-        dndv_interp = np.sqrt(2 * K.m_n * E_n) * dndE_interp
-        v_sigma = K.vel(self.E_endf)
-        sigma_interp = np.interp(vn, v_sigma, self.sigma_endf)
-        sigma0 = np.interp(K.v_0, v_sigma, self.sigma_endf)  #thermal cross section, barns
-    
-        return 1/(sigma0 * K.v_0) * trapezoid(dndv_interp * vn * sigma_interp, vn) / trapezoid(dndv_interp, vn)
+        flux distribution, optionally with the cross section broadened to 
+        `T_sample` as in `gw_Maxwellian`.  With `chunk_size`, or if `vn` is a 
+        `LogGrid`, the grid is integrated in blocks of that many points (see 
+        `compute.gw_arbitrary_chunked`) for bounded memory on very fine 
+        grids."""
+        if T_sample is not None:
+            broadened = gFactors.sample_sigma(self, E_endf, sigma_endf, T_sample, target)
+            if broadened is None:
+                return
+            E_endf, sigma_endf = broadened
+        from . import compute
+        cross_section = compute.CrossSection(E_endf, sigma_endf, target)
+        spectrum = compute.Spectrum(E_spectrum, dndE_spectrum)
+        if chunk_size is not None or hasattr(vn, 'block'):
+            return compute.gw_arbitrary_chunked(cross_section, spectrum, vn, chunk_size or 2**16,
+                                                getattr(self, 'result_store', None))
+        return compute.gw_arbitrary(cross_section, spectrum, vn, getattr(self, 'result_store', None))
 
     
+
+    def gw_stream(self, filenames, E_endf, sigma_endf, vn=DEFAULT_GRID, chunk_rows=2**16):
+        """Generator of Westcott g-factors for spectrum files too large (or too 
+        many) to load: every dN/dE column of each file (see `iter_spectrum`) 
+        is interpolated onto `vn` block by block and integrated with running 
+        trapezoidal accumulators, as in `gw_arbitrary`, so memory use is set 
+        by `chunk_rows` and `vn`, not by the file length.  Spectrum energies 
+        must be ascending.  Yields (filename, column, gW) per spectrum."""
+        if isinstance(filenames, str):
+            filenames = [filenames]
+        vn = np.asarray(vn, dtype=float)
+        E_n = 0.5*Kinematics.m_n * vn**2/Kinematics.eV
+        w = trapezoid_weights(vn) * np.sqrt(2 * Kinematics.m_n * E_n)  # dN/dE -> dN/dv
+        wr = w * reduced_sigma(E_endf, sigma_endf, vn)
+
+        for filename in filenames:
+            columns = UserSpectrum.spectrum_columns(self, filename)
+            num = np.zeros(len(columns))
+            den = np.zeros(len(columns))
+            last = None
+            for E, Y in UserSpectrum.iter_spectrum(self, filename, chunk_rows):
+                if last is not None:
+                    E = np.concatenate([last[0], E])
+                    Y = np.concatenate([last[1], Y])
+                if np.any(np.diff(E) < 0):
+                    logger.error("Spectrum energies must be ascending: {0}".format(filename))
+                    return
+                if len(E) < 2:
+                    last = (E, Y)
+                    continue
+                # grid points in [E[0], E[-1]) are interpolated in this block
+                i0, i1 = np.searchsorted(E_n, [E[0], E[-1]], side='left')
+                j = np.clip(np.searchsorted(E, E_n[i0:i1], side='right') - 1, 0, len(E) - 2)
+                with profiling.stage('interpolation'):
+                    dE = E[j+1] - E[j]
+                    t = np.divide(E_n[i0:i1] - E[j], dE, out=np.ones_like(dE), where=dE > 0)[:,np.newaxis]
+                    Y_interp = (1 - t)*Y[j] + t*Y[j+1]
+                with profiling.stage('integration'):
+                    num += wr[i0:i1] @ Y_interp
+                    den += w[i0:i1] @ Y_interp
+                last = (E[-1:], Y[-1:])
+            if last is not None:
+                i = np.flatnonzero(E_n == last[0][0])
+                num += wr[i] @ np.repeat(last[1], len(i), axis=0)
+                den += w[i] @ np.repeat(last[1], len(i), axis=0)
+            for name, n, d in zip(columns, num, den):
+                yield filename, name, n/d
+
+    def gw_Maxwellian_matrix(self, temperatures, cross_sections, vn=DEFAULT_GRID, chunk_size=2**23):
+        """Westcott g-factors for many cross sections at many Maxwellian 
+        temperatures.
+
+        `cross_sections` is a sequence of (E, sigma) array pairs as returned 
+        by `sigma_ENDF`.  The normalized Maxwellian quadrature weights are 
+        built once for all temperatures and each cross section is 
+        interpolated onto `vn` once; the integrals then reduce to a single 
+        matrix product per block of at most `chunk_size` grid elements.  
+        Returns an array of shape (len(cross_sections), len(temperatures))."""
+        vn = np.asarray(vn, dtype=float)
+        W = maxwellian_weights(temperatures, vn)
+
+        n = len(cross_sections)
+        gW = np.empty((n, W.shape[0]))
+        rows = max(1, min(n, chunk_size // max(len(vn), 1)))
+        S = np.empty((rows, len(vn)))
+        for i in range(0, n, rows):
+            m = min(rows, n - i)
+            for j in range(m):
+                S[j] = reduced_sigma(*cross_sections[i+j], vn)
+            with profiling.stage('integration'):
+                gW[i:i+m] = S[:m] @ W.T
+        return gW
+
+    def gw_Maxwellian_grid(self, targets, temperatures, vn=DEFAULT_GRID, chunk_size=2**23,
+                           T_sample=None):
+        """Westcott g-factors for a list of ENDF targets over a list of 
+        Maxwellian temperatures, returned as a DataFrame indexed by target 
+        with one column per temperature (K).  With `T_sample`, cross sections 
+        are Doppler-broadened to that sample temperature."""
+        import pandas as pd
+        if isinstance(targets, str):
+            targets = [targets]
+        targets = list(targets)
+        temperatures = list(np.atleast_1d(temperatures))
+
+        gW = np.empty((len(targets), len(temperatures)))
+        rows = max(1, chunk_size // max(len(vn), 1))
+        for i in range(0, len(targets), rows):
+            block = targets[i:i+rows]
+            if T_sample is None:
+                cross_sections = [CrossSectionData.sigma_ENDF(self, t) for t in block]
+            else:
+                cross_sections = [CrossSectionData.sigma_Doppler(self, t, T_sample) for t in block]
+            gW[i:i+len(block)] = gFactors.gw_Maxwellian_matrix(self, temperatures, cross_sections, vn, chunk_size)
+        return pd.DataFrame(gW, index=pd.Index(targets, name='target'), columns=temperatures)
+
+def trapezoid_weights(x):
+    """Quadrature weights `w` such that `np.sum(w*y)` equals 
+    `trapezoid(y, x)` for any `y` sampled on the grid `x`."""
+    x = np.asarray(x, dtype=float)
+    w = np.zeros_like(x)
+    if len(x) < 2:
+        return w
+    dx = np.diff(x)
+    w[:-1] += dx/2
+    w[1:] += dx/2
+    return w
+
+def maxwellian_weights(temperatures, vn):
+    """Normalized quadrature weights of shape (len(temperatures), len(vn)): 
+    row `i` dotted with `f(vn)` gives the trapezoidal average of `f` over 
+    the Maxwellian `phi_Maxwellian` at `temperatures[i]`."""
+    return MaxwellianKernel.get(temperatures, vn).weights
+
+def interp_sigma(E, sigma, vn):
+    """Thermal cross section and cross section interpolated (in velocity) 
+    onto `vn`.  When `E` and `sigma` are arrays held by the shared 
+    `ArrayCache` (e.g. returned by `sigma_ENDF`), the result is cached under 
+    (source, grid)."""
+    memory = ArrayCache.default()
+    source = memory.source_of(E, sigma)
+    if source is not None:
+        key = ('interp_sigma', source, grid_key(vn))
+        cached = memory.get(key)
+        if cached is not None:
+            return cached
+    with profiling.stage('interpolation'):
+        v_sigma = np.sqrt(2*np.asarray(E)*Kinematics.eV/Kinematics.m_n)
+        sigma0 = np.interp(Kinematics.v_0, v_sigma, sigma)  #thermal cross section, barns
+        sigma_interp = np.interp(vn, v_sigma, sigma)
+    profiling.count('grid_size', len(sigma_interp))
+    if source is not None:
+        memory.put(key, (sigma0, sigma_interp))
+    return sigma0, sigma_interp
+
+def interp_dndv(E_spectrum, dndE_spectrum, vn):
+    """Energy spectrum dN/dE interpolated onto `vn` and converted to dN/dv, 
+    cached like `interp_sigma` for spectra held by the `ArrayCache`."""
+    memory = ArrayCache.default()
+    source = memory.source_of(E_spectrum, dndE_spectrum)
+    if source is not None:
+        key = ('interp_dndv', source, grid_key(vn))
+        cached = memory.get(key)
+        if cached is not None:
+            return cached
+    vn = np.asarray(vn, dtype=float)
+    with profiling.stage('interpolation'):
+        E_n = 0.5*Kinematics.m_n * vn**2/Kinematics.eV  #energy space, eV
+        dndE_interp = np.interp(E_n, E_spectrum, dndE_spectrum, left=0, right=0)
+        dndv_interp = np.sqrt(2 * Kinematics.m_n * E_n) * dndE_interp
+    profiling.count('grid_size', len(vn))
+    if source is not None:
+        memory.put(key, dndv_interp)
+    return dndv_interp
+
+def flux_weights(E_spectrum, dndE_spectrum, vn):
+    """Normalized quadrature weights over `vn` for an energy spectrum dN/dE, 
+    interpolated as in `gFactors.gw_arbitrary`."""
+    w = interp_dndv(E_spectrum, dndE_spectrum, vn) * trapezoid_weights(vn)
+    return w / w.sum()
+
+def stored_result(store, method, compute, *arrays, grid=None, target=None, **params):
+    """Result of `compute()`, reused from the `ResultStore` `store` (if not 
+    None) when `method` was already evaluated for inputs of the same 
+    content."""
+    if store is None:
+        return compute()
+    key = ResultStore.key(method, *arrays, grid=grid, **params)
+    return store.get_or_compute(key, compute, method, target)
+
+def reduced_sigma(E, sigma, vn):
+    """Cross section interpolated onto `vn` and scaled to `v*sigma(v)/(sigma0*v_0)`, 
+    so that a g-factor is its dot product with normalized weights."""
+    vn = np.asarray(vn, dtype=float)
+    sigma0, sigma_interp = interp_sigma(E, sigma, vn)
+    return sigma_interp * vn / (sigma0 * Kinematics.v_0)